@@ -0,0 +1,241 @@
+"""
+基准测试用例
+每个用例的 setup 在计时外准备输入，返回只包含被测代码的无参函数
+"""
+
+import os
+import shutil
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from synthetic import make_ohlcv, synthetic_csv
+
+
+class SkipCase(Exception):
+    """
+    当前环境无法运行该用例（缺少依赖等）
+    """
+
+
+class BenchContext:
+    """
+    用例共享的输入数据，按bar数缓存
+    """
+    def __init__(self, work_dir: str, seed: int = 0):
+        """
+        Parameters:
+        -----------
+        work_dir : str
+            合成数据和临时输出目录
+        seed : int
+            随机种子
+        """
+        self.work_dir = work_dir
+        self.seed = seed
+        self._frames = {}
+
+    def csv(self, n: int) -> str:
+        """合成CSV路径"""
+        return synthetic_csv(n, os.path.join(self.work_dir, 'data'), self.seed)
+
+    def frame(self, n: int) -> pd.DataFrame:
+        """合成OHLCV，调用方需自行拷贝后再修改"""
+        if n not in self._frames:
+            self._frames.clear()
+            self._frames[n] = make_ohlcv(n, self.seed)
+        return self._frames[n]
+
+    def path(self, name: str) -> str:
+        """临时输出路径"""
+        out_dir = os.path.join(self.work_dir, 'out')
+        os.makedirs(out_dir, exist_ok=True)
+        return os.path.join(out_dir, name)
+
+
+class Case:
+    """
+    基准测试用例
+    """
+    def __init__(self, name: str, setup: Callable, max_bars: Optional[int] = None):
+        """
+        Parameters:
+        -----------
+        name : str
+            用例名称
+        setup : Callable
+            setup(n, ctx) -> run，run 为被计时的无参函数
+        max_bars : int, optional
+            该用例运行的最大bar数，超过时跳过（逐bar回测和绘图在千万级数据上不可行）
+        """
+        self.name = name
+        self.setup = setup
+        self.max_bars = max_bars
+
+
+def _loader(ctx: BenchContext, n: int, mode: str):
+    from data.data_cache import ColumnarCache
+    from data.data_loader import DataLoader
+
+    csv_path = ctx.csv(n)
+    loader = DataLoader(use_cache=(mode != 'nocache'))
+    loader.data_path = csv_path
+    if loader.cache is not None:
+        loader.cache = ColumnarCache(ctx.path('cache'))
+        if mode == 'warm':
+            loader.load_data()
+
+    def run():
+        if mode == 'cold':
+            loader.cache.clear()
+        loader.load_data()
+    return run
+
+
+def _stream(ctx: BenchContext, n: int, dtype: str):
+    from data.stream_loader import StreamingCSVLoader
+
+    csv_path = ctx.csv(n)
+
+    def run():
+        for _ in StreamingCSVLoader(csv_path, chunksize=1_000_000, dtype=dtype).iter_chunks():
+            pass
+    return run
+
+
+def _indicator(method: str, **kwargs):
+    def setup(n: int, ctx: BenchContext):
+        from utils.technical_indicators import TechnicalIndicators
+
+        df = ctx.frame(n).copy()
+        func = getattr(TechnicalIndicators, method)
+
+        def run():
+            # 关闭指标缓存，测量实际计算耗时
+            cache, TechnicalIndicators.cache = TechnicalIndicators.cache, None
+            try:
+                func(df, **kwargs)
+            finally:
+                TechnicalIndicators.cache = cache
+        return run
+    return setup
+
+
+def _main(n: int, ctx: BenchContext):
+    from src.main import main
+
+    csv_path = ctx.csv(n)
+    # 缓存写到临时目录，不在 src/data/.cache 中留下合成数据
+    cache_dir = ctx.path('cache')
+
+    def run():
+        # main 内部捕获所有异常，出错时返回 None，不能记为一次成功的计时
+        if main(csv_path, plot=False, cache_dir=cache_dir) is None:
+            raise RuntimeError("main() 回测失败，详见上方输出")
+    return run
+
+
+def _buy_and_hold(n: int, ctx: BenchContext):
+    import backtrader as bt
+    from analysis.backtest_analyzer import BacktestAnalyzer
+    from data.data_loader import DataLoader
+    from strategies.ema_crossover_strategy import EMACrossoverStrategy
+
+    loader = DataLoader(use_cache=False)
+    loader.data_path = ctx.csv(n)
+    data = loader.load_data()
+    cerebro = bt.Cerebro()
+    cerebro.broker.setcash(1000000.0)
+    cerebro.broker.setcommission(commission=0.001)
+    cerebro.adddata(data)
+    cerebro.addstrategy(EMACrossoverStrategy)
+    results = cerebro.run()
+
+    def run():
+        BacktestAnalyzer(cerebro, results, data).run_buy_and_hold(1000000.0)
+    return run
+
+
+def _ema_rsi(mode: str):
+    def setup(n: int, ctx: BenchContext):
+        import backtrader as bt
+        from data.indicator_feed import strategy_feed
+        from utils.indicator_cache import IndicatorCache
+        from strategies.ema_rsi_strategy import EmaRsiStrategy
+
+        df = ctx.frame(n)
+
+        def run():
+            cerebro = bt.Cerebro()
+            cerebro.broker.setcash(1000000.0)
+            cerebro.broker.setcommission(commission=0.001)
+            if mode == 'feed':
+                # 使用空缓存，指标计算计入耗时
+                cerebro.adddata(strategy_feed(df, EmaRsiStrategy, cache=IndicatorCache()))
+                cerebro.addstrategy(EmaRsiStrategy, use_feed_indicators=True)
+            else:
+                cerebro.adddata(bt.feeds.PandasData(dataname=df, datetime=None, openinterest=-1))
+                cerebro.addstrategy(EmaRsiStrategy)
+            cerebro.run()
+        return run
+    return setup
+
+
+def _visualization(method: str):
+    def setup(n: int, ctx: BenchContext):
+        try:
+            from utils.visualization import DataVisualizer
+        except ImportError as e:
+            raise SkipCase(f"缺少依赖: {e.name}")
+        from utils.technical_indicators import TechnicalIndicators
+
+        df = ctx.frame(n).copy()
+        save_path = ctx.path(f'{method}.html')
+        if method == 'plot_price_and_volume':
+            return lambda: DataVisualizer.plot_price_and_volume(df, save_path=save_path)
+
+        for add in (TechnicalIndicators.add_sma, TechnicalIndicators.add_rsi,
+                    TechnicalIndicators.add_macd, TechnicalIndicators.add_bollinger_bands):
+            add(df)
+        indicators = ['sma_20', 'sma_50', 'rsi', 'macd', 'bollinger_bands']
+        return lambda: DataVisualizer.plot_technical_indicators(df, indicators, save_path=save_path)
+    return setup
+
+
+CASES: List[Case] = [
+    Case('loader.load_data.nocache', lambda n, ctx: _loader(ctx, n, 'nocache')),
+    Case('loader.load_data.cold', lambda n, ctx: _loader(ctx, n, 'cold')),
+    Case('loader.load_data.warm', lambda n, ctx: _loader(ctx, n, 'warm')),
+    Case('loader.stream.float64', lambda n, ctx: _stream(ctx, n, 'float64')),
+    Case('loader.stream.float32', lambda n, ctx: _stream(ctx, n, 'float32')),
+    Case('indicators.add_sma', _indicator('add_sma')),
+    Case('indicators.add_ema', _indicator('add_ema')),
+    Case('indicators.add_rsi', _indicator('add_rsi')),
+    Case('indicators.add_macd', _indicator('add_macd')),
+    Case('indicators.add_bollinger_bands', _indicator('add_bollinger_bands')),
+    Case('indicators.add_atr', _indicator('add_atr')),
+    Case('main.ema_crossover', _main, max_bars=100_000),
+    Case('backtest.ema_rsi.line_indicators', _ema_rsi('lines'), max_bars=100_000),
+    Case('backtest.ema_rsi.feed_indicators', _ema_rsi('feed'), max_bars=100_000),
+    Case('analyzer.run_buy_and_hold', _buy_and_hold, max_bars=100_000),
+    Case('visualization.plot_price_and_volume', _visualization('plot_price_and_volume'),
+         max_bars=100_000),
+    Case('visualization.plot_technical_indicators', _visualization('plot_technical_indicators'),
+         max_bars=100_000),
+]
+
+
+def select_cases(patterns: Optional[List[str]] = None) -> List[Case]:
+    """
+    按名称前缀筛选用例
+    """
+    if not patterns:
+        return list(CASES)
+    return [case for case in CASES if any(case.name.startswith(p) for p in patterns)]
+
+
+def clear_work_dir(ctx: BenchContext):
+    """
+    删除临时输出（保留合成数据以便复用）
+    """
+    shutil.rmtree(os.path.join(ctx.work_dir, 'out'), ignore_errors=True)
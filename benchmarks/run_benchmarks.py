@@ -0,0 +1,203 @@
+"""
+性能基准测试
+覆盖数据加载、技术指标、完整回测、Buy&Hold对比和可视化等热点路径，
+结果写入JSON文件，并与已保存的基线比较，发现性能退化时以非零状态退出
+
+用法：
+    python benchmarks/run_benchmarks.py                       # 1k/100k/10M 全部用例
+    python benchmarks/run_benchmarks.py --sizes 1k,100k --only indicators
+    python benchmarks/run_benchmarks.py --sizes 1k,100k --save-baseline
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import matplotlib
+matplotlib.use('Agg')
+
+from cases import BenchContext, SkipCase, select_cases, clear_work_dir
+from synthetic import parse_size, format_size
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results', 'latest.json')
+
+
+def environment() -> Dict[str, str]:
+    """
+    记录运行环境，便于判断结果是否可比
+    """
+    import backtrader
+    import numpy
+    import pandas
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'backtrader': backtrader.__version__,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def time_case(run, repeat: int, max_time: float) -> List[float]:
+    """
+    重复运行并记录每次耗时，累计超过 max_time 秒后不再重复
+    """
+    timings = []
+    total = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+        if total >= max_time:
+            break
+    return timings
+
+
+def run_benchmarks(sizes: List[int], patterns: Optional[List[str]], repeat: int,
+                   max_time: float, work_dir: str) -> Dict[str, Dict]:
+    """
+    运行选中的用例
+
+    Returns:
+    --------
+    dict
+        用例键（名称[规模]）到计时结果的映射
+    """
+    ctx = BenchContext(work_dir)
+    results = {}
+    for n in sizes:
+        for case in select_cases(patterns):
+            key = f'{case.name}[{format_size(n)}]'
+            entry = {'case': case.name, 'bars': n}
+            if case.max_bars is not None and n > case.max_bars:
+                entry['skipped'] = f'超过该用例的最大规模 {format_size(case.max_bars)}'
+            else:
+                try:
+                    # 屏蔽策略和加载器的日志输出
+                    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                        run = case.setup(n, ctx)
+                        timings = time_case(run, repeat, max_time)
+                    entry.update({
+                        'min': min(timings),
+                        'median': statistics.median(timings),
+                        'runs': len(timings),
+                        'bars_per_sec': n / min(timings) if min(timings) > 0 else None,
+                    })
+                except SkipCase as e:
+                    entry['skipped'] = str(e)
+                except MemoryError:
+                    entry['skipped'] = '内存不足'
+            results[key] = entry
+            status = entry.get('skipped') or f"{entry['min'] * 1000:.2f} ms"
+            print(f'{key:<55} {status}', flush=True)
+    clear_work_dir(ctx)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            tolerance: float, min_delta: float) -> List[str]:
+    """
+    与基线比较最短耗时
+
+    Parameters:
+    -----------
+    results : dict
+        本次结果
+    baseline : dict
+        基线结果
+    tolerance : float
+        允许的相对变慢比例，如 0.25 表示慢25%以内不算退化
+    min_delta : float
+        绝对差值小于该秒数时忽略，避免毫秒级用例的计时抖动误报
+
+    Returns:
+    --------
+    List[str]
+        退化的用例键
+    """
+    regressions = []
+    print(f'\n{"用例":<55} {"基线(ms)":>12} {"本次(ms)":>12} {"比值":>8}')
+    for key, entry in results.items():
+        base = baseline.get(key)
+        if 'min' not in entry or not base or 'min' not in base:
+            continue
+        ratio = entry['min'] / base['min'] if base['min'] > 0 else float('inf')
+        regressed = ratio > 1.0 + tolerance and entry['min'] - base['min'] > min_delta
+        flag = '  退化' if regressed else ''
+        print(f'{key:<55} {base["min"] * 1000:>12.2f} {entry["min"] * 1000:>12.2f} {ratio:>8.2f}{flag}')
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+
+def write_json(path: str, payload: Dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='性能基准测试')
+    parser.add_argument('--sizes', default='1k,100k,10M', help='合成数据规模，逗号分隔')
+    parser.add_argument('--only', nargs='*', help='只运行名称以这些前缀开头的用例')
+    parser.add_argument('--repeat', type=int, default=5, help='每个用例的最多重复次数')
+    parser.add_argument('--max-time', type=float, default=20.0, help='单个用例累计运行秒数上限')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='结果JSON路径')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线JSON路径')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的相对变慢比例')
+    parser.add_argument('--min-delta', type=float, default=0.005, help='忽略的绝对差值（秒）')
+    parser.add_argument('--work-dir', default=os.path.join(BENCH_DIR, '.work'), help='合成数据目录')
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(',') if s]
+    results = run_benchmarks(sizes, args.only, args.repeat, args.max_time, args.work_dir)
+    payload = {'environment': environment(), 'results': results}
+    write_json(args.output, payload)
+    print(f'\n结果已保存: {args.output}')
+
+    if args.save_baseline:
+        # 只更新本次运行过的用例，保留基线中的其他用例
+        baseline = {'environment': payload['environment'], 'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline['results'] = json.load(f).get('results', {})
+        baseline['results'].update({k: v for k, v in results.items() if 'min' in v})
+        write_json(args.baseline, baseline)
+        print(f'基线已更新: {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('未找到基线，跳过比较')
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline.get('results', {}), args.tolerance, args.min_delta)
+    if regressions:
+        print(f'\n发现 {len(regressions)} 个性能退化: {", ".join(regressions)}')
+        return 1
+    print('\n未发现性能退化')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+命令行入口
+
+    python -m src run config/example.yaml --workers 4
+    python -m src run nightly/*.toml --store output/backtest_runs.csv
+"""
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+# 模块按 src 目录下的包名导入（data、engine、strategies 等）
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config.config import load_config  # noqa: E402
+from engine.results_store import ResultsStore  # noqa: E402
+from engine.runner import run_batch  # noqa: E402
+
+DEFAULT_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output', 'backtest_runs.csv')
+
+
+def _run(args: argparse.Namespace) -> int:
+    configs = []
+    for path in args.configs:
+        configs.extend(load_config(path))
+    if args.only:
+        configs = [config for config in configs if any(name in config.name for name in args.only)]
+    if not configs:
+        print("没有要运行的任务")
+        return 1
+
+    if args.dry_run:
+        for config in configs:
+            print(f"{config.name}: {config.strategy} {config.params} mode={config.mode} "
+                  f"data={config.data_label} {config.start or ''}~{config.end or ''}")
+        return 0
+
+    store = None if args.no_store else ResultsStore(args.store)
+    print(f"运行 {len(configs)} 个回测任务")
+    results = run_batch(configs, max_workers=args.workers, store=store)
+    if store is not None:
+        print(f"结果已追加到: {store.path}")
+    return 0 if (results['status'] == 'ok').all() else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src', description='回测命令行')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='按配置文件运行回测')
+    run.add_argument('configs', nargs='+', help='YAML 或 TOML 配置文件')
+    run.add_argument('--workers', type=int, help='工作进程数，默认等于CPU核数')
+    run.add_argument('--store', default=DEFAULT_STORE, help='结果仓库（CSV，追加写入）')
+    run.add_argument('--no-store', action='store_true', help='不写入结果仓库')
+    run.add_argument('--only', nargs='+', help='只运行名称包含这些字符串的任务')
+    run.add_argument('--dry-run', action='store_true', help='只列出展开后的任务，不运行')
+    run.set_defaults(func=_run)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,66 +1,186 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
 import numpy as np
 from datetime import datetime
 import backtrader as bt
-from strategies.buy_and_hold_strategy import BuyAndHoldStrategy
+from analysis.metrics import compute_metrics, full_metrics, trade_stats, TRADE_DTYPE
+from analysis.equity_recorder import EquityRecorder
+from analysis.report import ReportData, render_report, DEFAULT_MAX_POINTS
+from engine.vectorized_engine import VectorizedBacktestEngine
+
+def trade_records(strategy: bt.Strategy) -> np.ndarray:
+    """
+    从策略实例中取出已平仓的交易，不需要挂载 TradeAnalyzer
+    
+    Parameters:
+    -----------
+    strategy : bt.Strategy
+        运行结束的策略实例
+        
+    Returns:
+    --------
+    np.ndarray
+        TRADE_DTYPE 结构化数组，按平仓顺序排列
+    """
+    rows = [(trade.baropen - 1, trade.barclose - 1, trade.pnl, trade.pnlcomm)
+            for data_trades in strategy._trades.values()
+            for trades in data_trades.values()
+            for trade in trades if trade.isclosed]
+    records = np.array(rows, dtype=TRADE_DTYPE)
+    return records[np.argsort(records['exit'], kind='stable')]
+
 
 class BacktestAnalyzer:
     """
     回测结果分析器
+    
+    cerebro 挂载了 sharpe、returns、drawdown、trades 分析器时沿用其结果；
+    未挂载时由资金曲线和交易记录数组向量化计算，Sortino、Calmar、盈亏比等指标总是由数组计算
     """
-    def __init__(self, cerebro, results, data):
+    def __init__(self, cerebro=None, results=None, data=None,
+                 equity: np.ndarray = None,
+                 trades: np.ndarray = None,
+                 index: pd.Index = None,
+                 initial_cash: float = None):
         """
         初始化分析器
         
         Parameters:
         -----------
-        cerebro : bt.Cerebro
+        cerebro : bt.Cerebro, optional
             回测引擎实例
-        results : list
+        results : list, optional
             回测结果列表
-        data : bt.feeds.DataBase
+        data : bt.feeds.DataBase, optional
             回测数据，用于Buy&Hold对比
+        equity : np.ndarray, optional
+            每根bar的账户总值，默认取自策略的 EquityRecorder 分析器或 Broker 观察器
+        trades : np.ndarray, optional
+            TRADE_DTYPE 交易记录，默认取自策略实例
+        index : pd.Index, optional
+            资金曲线的时间索引，默认取自数据源
+        initial_cash : float, optional
+            初始资金，默认取自 cerebro
         """
+        if cerebro is None and equity is None:
+            raise ValueError("需要传入 cerebro 回测结果或资金曲线")
         self.cerebro = cerebro
-        self.results = results[0]  # 获取第一个策略实例的结果
+        self.results = results[0] if results else None  # 获取第一个策略实例的结果
         self.data = data
-        self.bh_results = None  # Buy&Hold策略结果
+        self.equity = equity
+        self.trades = trades
+        self.index = index
+        self.initial_cash = initial_cash if initial_cash is not None else cerebro.broker.startingcash
+        self.bh_results = None  # Buy&Hold策略结果（VectorizedResult）
+        self.bh_metrics = None  # Buy&Hold策略指标
+        self._bh_cash = None
+        self._metrics = None
         
-    def run_buy_and_hold(self, initial_cash):
+    @classmethod
+    def from_arrays(cls, equity: np.ndarray, index: pd.Index, initial_cash: float,
+                    trades: np.ndarray = None) -> 'BacktestAnalyzer':
         """
-        运行Buy&Hold策略
+        直接由资金曲线和交易记录创建，用于未经 cerebro 的结果（如向量化回测）
+        """
+        return cls(equity=np.asarray(equity, dtype=np.float64), trades=trades,
+                   index=index, initial_cash=initial_cash)
         
-        Parameters:
-        -----------
-        initial_cash : float
-            初始资金
+    def _has_bt_analyzers(self) -> bool:
+        """
+        策略上是否挂载了 backtrader 的统计分析器
         """
-        # 创建新的回测引擎
-        cerebro = bt.Cerebro()
+        if self.results is None:
+            return False
+        return all(getattr(self.results.analyzers, name, None) is not None
+                   for name in ('sharpe', 'returns', 'drawdown', 'trades'))
         
-        # 添加数据
-        cerebro.adddata(self.data)
+    def _resolve_arrays(self) -> bool:
+        """
+        补齐资金曲线、交易记录和时间索引；优先使用 EquityRecorder（_name='equity'）的记录，
+        其次为 Broker 观察器，都没有时返回False
+        """
+        recorder = getattr(self.results.analyzers, 'equity', None) if self.results is not None else None
+        if self.equity is None and isinstance(recorder, EquityRecorder):
+            arrays = recorder.arrays
+            self.equity = arrays['value']
+            if self.index is None:
+                self.index = pd.DatetimeIndex(arrays['datetime'], copy=False)
+        if self.equity is None:
+            if self.results is None:
+                return False
+            broker = getattr(self.results.stats, 'broker', None)
+            if broker is None:
+                return False
+            value = broker.lines.value
+            self.equity = np.asarray(value.array[:len(value)], dtype=np.float64)
+        if self.trades is None and self.results is not None:
+            self.trades = trade_records(self.results)
+        if self.index is None:
+            if self.data is not None:
+                self.index = self._feed_frame().index[:len(self.equity)]
+            else:
+                self.index = pd.RangeIndex(len(self.equity))
+        return True
         
-        # 设置初始资金
-        cerebro.broker.setcash(initial_cash)
+    def vectorized_metrics(self) -> dict:
+        """
+        由资金曲线和交易记录数组计算的全部指标，见 analysis.metrics.full_metrics
         
-        # 设置手续费
-        cerebro.broker.setcommission(commission=0.001)
+        Returns:
+        --------
+        dict
+            夏普、Sortino、Calmar、收益率、最大回撤及其持续bar数、胜率、盈亏比、期望收益、持仓时间占比等
+        """
+        if self._metrics is None:
+            if not self._resolve_arrays():
+                raise ValueError("策略没有 EquityRecorder 分析器或 Broker 观察器，请传入资金曲线")
+            self._metrics = full_metrics(self.equity, self.index, self.initial_cash, self.trades)
+        return self._metrics
         
-        # 添加Buy&Hold策略
-        cerebro.addstrategy(BuyAndHoldStrategy)
+    def _feed_frame(self) -> pd.DataFrame:
+        """
+        取出主回测数据源的开盘、最高、最低、收盘价，不重新读取数据
+        """
+        fields = ['open', 'high', 'low', 'close']
+        dataname = getattr(self.data.p, 'dataname', None)
+        if isinstance(dataname, pd.DataFrame):
+            columns = {}
+            for field in fields:
+                col = getattr(self.data.p, field)
+                if isinstance(col, int):
+                    col = dataname.columns[col]
+                columns[field] = dataname[col].to_numpy(dtype=np.float64)
+            return pd.DataFrame(columns, index=dataname.index)
         
-        # 添加分析器
-        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-        cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-        cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-        cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
+        # 其他数据源在主回测运行后，各数据线中保存了全部bar
+        n = self.data.buflen()
+        index = pd.DatetimeIndex([bt.num2date(x) for x in self.data.datetime.array[:n]])
+        return pd.DataFrame({field: np.asarray(getattr(self.data, field).array[:n]) for field in fields},
+                            index=index)
         
-        # 运行回测
-        results = cerebro.run()
-        self.bh_results = results[0]
+    def run_buy_and_hold(self, initial_cash):
+        """
+        计算Buy&Hold策略的资金曲线和指标
+        
+        与 BuyAndHoldStrategy 在 cerebro 中的结果一致：第一根bar收盘以95%现金下单，
+        下一根bar开盘成交并持有到最后。直接由主回测数据源的价格数组向量化计算，
+        不再运行第二遍 cerebro；结果缓存在分析器上，重复调用不会重新计算
+        
+        Parameters:
+        -----------
+        initial_cash : float
+            初始资金
+        """
+        if self.bh_results is not None and self._bh_cash == initial_cash:
+            return
+            
+        df = self._feed_frame()
+        commission = self.cerebro.broker.getcommissioninfo(self.data).p.commission
+        engine = VectorizedBacktestEngine(initial_cash, commission)
+        # 与 BuyAndHoldStrategy 一致：只买入、不卖出
+        self.bh_results = engine.run(df, np.ones(len(df)), size_pct=0.95)
+        self.bh_metrics = compute_metrics(self.bh_results.equity, df.index, initial_cash)
+        self._bh_cash = initial_cash
         
     def _get_strategy_metrics(self, results):
         """
@@ -76,6 +196,11 @@ class BacktestAnalyzer:
         dict
             策略指标字典
         """
+        if not self._has_bt_analyzers():
+            vectorized = self.vectorized_metrics()
+            return {key: vectorized[key] for key in
+                    ('sharpe_ratio', 'total_return', 'annual_return', 'max_drawdown', 'final_value')}
+            
         metrics = {}
         
         try:
@@ -124,72 +249,138 @@ class BacktestAnalyzer:
             print(f'夏普比率: {strategy_metrics["sharpe_ratio"]:.2f}')
             print(f'最终资金: {strategy_metrics["final_value"]:.2f}')
             
-            # 运行Buy&Hold策略并获取结果
-            if self.bh_results is None:
-                self.run_buy_and_hold(self.cerebro.broker.startingcash)
-                
-            bh_metrics = self._get_strategy_metrics(self.bh_results)
-            
-            print('\n=== Buy & Hold 策略对比 ===')
-            print(f'总收益率: {strategy_metrics["total_return"]:.2f}% vs {bh_metrics["total_return"]:.2f}%')
-            print(f'年化收益率: {strategy_metrics["annual_return"]:.2f}% vs {bh_metrics["annual_return"]:.2f}%')
-            print(f'最大回撤: {strategy_metrics["max_drawdown"]:.2f}% vs {bh_metrics["max_drawdown"]:.2f}%')
-            print(f'夏普比率: {strategy_metrics["sharpe_ratio"]:.2f} vs {bh_metrics["sharpe_ratio"]:.2f}')
-            print(f'最终资金: {strategy_metrics["final_value"]:.2f} vs {bh_metrics["final_value"]:.2f}')
+            if self._resolve_arrays():
+                vectorized = self.vectorized_metrics()
+                print(f'最长回撤持续: {vectorized["max_drawdown_len"]} 根K线')
+                print(f'Sortino比率: {self._format_ratio(vectorized["sortino_ratio"])}')
+                print(f'Calmar比率: {self._format_ratio(vectorized["calmar_ratio"])}')
             
-            # 计算超额收益
-            excess_return = strategy_metrics["annual_return"] - bh_metrics["annual_return"]
-            print(f'\n超额收益: {excess_return:.2f}%')
+            # Buy&Hold对比需要主回测的行情数据
+            if self.cerebro is not None and self.data is not None:
+                # 运行Buy&Hold策略并获取结果
+                if self.bh_results is None:
+                    self.run_buy_and_hold(self.cerebro.broker.startingcash)
+                    
+                bh_metrics = self.bh_metrics
+                
+                print('\n=== Buy & Hold 策略对比 ===')
+                print(f'总收益率: {strategy_metrics["total_return"]:.2f}% vs {bh_metrics["total_return"]:.2f}%')
+                print(f'年化收益率: {strategy_metrics["annual_return"]:.2f}% vs {bh_metrics["annual_return"]:.2f}%')
+                print(f'最大回撤: {strategy_metrics["max_drawdown"]:.2f}% vs {bh_metrics["max_drawdown"]:.2f}%')
+                print(f'夏普比率: {strategy_metrics["sharpe_ratio"]:.2f} vs {bh_metrics["sharpe_ratio"]:.2f}')
+                print(f'最终资金: {strategy_metrics["final_value"]:.2f} vs {bh_metrics["final_value"]:.2f}')
+                
+                # 计算超额收益
+                excess_return = strategy_metrics["annual_return"] - bh_metrics["annual_return"]
+                print(f'\n超额收益: {excess_return:.2f}%')
             
-            # 获取交易分析
-            trade_analysis = self.results.analyzers.trades.get_analysis()
+            # 获取交易统计
+            stats = self._trade_stats()
             
             print('\n=== 交易统计 ===')
             # 统计总交易次数
-            total_trades = trade_analysis.get('total', {}).get('total', 0)
+            total_trades = stats['total_trades']
             print('总交易次数:', total_trades)
             
             if total_trades == 0:
                 return
                 
             # 统计盈利交易
-            won = trade_analysis.get('won', {})
-            won_trades = won.get('total', 0)
+            won_trades = stats['won_trades']
             print('盈利交易:', won_trades)
             if won_trades > 0:
-                print('平均盈利: %.2f' % won.get('pnl', {}).get('average', 0.0))
-                print('最大盈利: %.2f' % won.get('pnl', {}).get('max', 0.0))
+                print('平均盈利: %.2f' % stats['avg_win'])
+                print('最大盈利: %.2f' % stats['max_win'])
                 
             # 统计亏损交易
-            lost = trade_analysis.get('lost', {})
-            lost_trades = lost.get('total', 0)
+            lost_trades = stats['lost_trades']
             print('亏损交易:', lost_trades)
             if lost_trades > 0:
-                print('平均亏损: %.2f' % lost.get('pnl', {}).get('average', 0.0))
-                print('最大亏损: %.2f' % lost.get('pnl', {}).get('min', 0.0))
+                print('平均亏损: %.2f' % stats['avg_loss'])
+                print('最大亏损: %.2f' % stats['max_loss'])
             
             # 计算胜率
-            win_rate = (won_trades / total_trades * 100) if total_trades > 0 else 0
-            print('胜率: %.2f%%' % win_rate)
+            print('胜率: %.2f%%' % stats['win_rate'])
+            print(f'盈亏比: {self._format_ratio(stats["profit_factor"])}')
+            print('期望收益: %.2f' % stats['expectancy'])
+            if stats['exposure'] is not None:
+                print('持仓时间占比: %.2f%%' % stats['exposure'])
             
         except Exception as e:
             print(f"结果分析失败: {str(e)}")
             import traceback
             print(traceback.format_exc())
+            
+    @staticmethod
+    def _format_ratio(value) -> str:
+        return '-' if value is None else f'{value:.2f}'
+        
+    def _trade_stats(self) -> dict:
+        """
+        交易统计：次数、盈亏、盈亏比和持仓时间占比都由已平仓交易的记录数组计算，
+        与 get_performance_metrics 一致
+        """
+        n_bars = len(self.equity) if self._resolve_arrays() else None
+        if self.trades is None:
+            self.trades = (trade_records(self.results) if self.results is not None
+                           else np.empty(0, dtype=TRADE_DTYPE))
+        return trade_stats(self.trades, n_bars=n_bars)
         
-    def plot_results(self):
+    def report_data(self, title: str = 'Backtest Report') -> ReportData:
         """
-        绘制回测结果图表
+        收集渲染报告所需的数组：资金曲线、交易记录，有数据源时另含K线和Buy&Hold曲线
+        
+        Parameters:
+        -----------
+        title : str
+            报告标题
+            
+        Returns:
+        --------
+        ReportData
+            可传给 render_report / render_reports 的报告数据
         """
+        metrics = self.vectorized_metrics()
+        ohlc = None
+        benchmark = None
+        if self.data is not None:
+            df = self._feed_frame().iloc[:len(self.equity)]
+            ohlc = {field: df[field].to_numpy() for field in df.columns}
+            if self.bh_results is not None:
+                benchmark = self.bh_results.equity[:len(self.equity)]
+        return ReportData(self.index, self.equity, ohlc=ohlc, trades=self.trades,
+                          benchmark=benchmark, metrics=metrics, title=title)
+        
+    def plot_results(self, path: str = None, max_points: int = DEFAULT_MAX_POINTS) -> str:
+        """
+        绘制回测报告并保存为文件
+        
+        不调用 cerebro.plot()，在 Agg 画布上绘制，不需要图形界面，也不会阻塞
+        
+        Parameters:
+        -----------
+        path : str, optional
+            输出路径，.png 或 .html，默认为 output/backtest_report.png
+        max_points : int
+            每个面板最多绘制的点数，更长的序列先做抽稀
+            
+        Returns:
+        --------
+        str
+            报告路径，绘制失败时为None
+        """
+        if path is None:
+            path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'output', 'backtest_report.png')
         try:
-            # 使用 backtrader 默认的绘图方式
-            self.cerebro.plot(style='candlestick', barup='green', bardown='red',
-                            volup='green', voldown='red',
-                            grid=True, volume=True)
+            render_report(self.report_data(), path, max_points)
         except Exception as e:
             print(f"绘图出错: {str(e)}")
             import traceback
             print(traceback.format_exc())
+            return None
+        print(f"回测报告已保存: {path}")
+        return path
         
     def get_performance_metrics(self):
         """
@@ -198,24 +389,20 @@ class BacktestAnalyzer:
         Returns:
         --------
         dict
-            包含各项性能指标的字典
+            包含各项性能指标的字典；挂载了 backtrader 分析器时另含 trade_analysis，
+            夏普、年化收益和最大回撤取自分析器
         """
+        metrics = dict(self.vectorized_metrics()) if self._resolve_arrays() else {}
+        if not self._has_bt_analyzers():
+            return metrics
+            
         trade_analysis = self.results.analyzers.trades.get_analysis()
         
-        metrics = {
+        # 胜率、交易次数仍取自交易记录数组，只统计已平仓交易，不随是否挂载分析器变化
+        metrics.update({
             'sharpe_ratio': self.results.analyzers.sharpe.get_analysis()['sharperatio'],
             'annual_return': self.results.analyzers.returns.get_analysis()['rnorm100'],
             'max_drawdown': self.results.analyzers.drawdown.get_analysis()['max']['drawdown'],
             'trade_analysis': trade_analysis,
-        }
-        
-        # 添加胜率
-        if 'total' in trade_analysis and trade_analysis['total']['total'] > 0:
-            if 'won' in trade_analysis:
-                metrics['win_rate'] = trade_analysis['won']['total'] / trade_analysis['total']['total'] * 100
-            else:
-                metrics['win_rate'] = 0
-        else:
-            metrics['win_rate'] = 0
-            
-        return metrics 
\ No newline at end of file
+        })
+        return metrics
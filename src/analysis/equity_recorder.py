@@ -0,0 +1,107 @@
+"""
+资金曲线记录器
+逐bar把账户总值、现金、持仓数量写入按数据长度预先分配的数组，回撤在回测结束时一次性计算，
+开销小到可以在参数优化中一直挂载
+"""
+
+from typing import Dict
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+# backtrader 数值时间中 1970-01-01 对应的值
+_EPOCH_ORDINAL = 719163.0
+
+FIELDS = ['value', 'cash', 'position', 'drawdown']
+
+
+def num2datetime64(values: np.ndarray) -> np.ndarray:
+    """
+    将backtrader的数值时间批量转换为 datetime64[ns]，精度与 bt.num2date 相同（微秒）
+    """
+    us = np.round((np.asarray(values, dtype=np.float64) - _EPOCH_ORDINAL) * 86_400_000_000.0)
+    return (us.astype(np.int64) * 1000).view('datetime64[ns]')
+
+
+class EquityRecorder(bt.Analyzer):
+    """
+    记录每根bar的账户总值、现金、持仓数量和回撤
+
+    账户总值和现金取自 notify_cashvalue 的通知，不再另行查询 broker；
+    数据源已预加载时按其长度一次分配，未预加载时按倍数扩容
+
+        cerebro.addanalyzer(EquityRecorder, _name='equity')
+        strat = cerebro.run()[0]
+        df = strat.analyzers.equity.to_frame()
+    """
+    params = (
+        ('capacity', 0),  # 初始容量，0 表示按数据源长度分配
+    )
+
+    def start(self):
+        capacity = self.p.capacity or self.strategy.data.buflen()
+        # 第0行为数值时间，其余依次为 value、cash、position
+        self._buffer = np.empty((4, max(capacity, 256)), dtype=np.float64)
+        self._n = 0
+        self._cash = np.nan
+        self._value = np.nan
+        self._position = self.strategy.getposition(self.strategy.data)
+        self._arrays = None
+
+    def notify_cashvalue(self, cash, value):
+        self._cash = cash
+        self._value = value
+
+    def next(self):
+        i = self._n
+        buffer = self._buffer
+        if i == buffer.shape[1]:
+            buffer = self._buffer = np.concatenate([buffer, np.empty_like(buffer)], axis=1)
+        buffer[0, i] = self.strategy.datetime[0]
+        buffer[1, i] = self._value
+        buffer[2, i] = self._cash
+        buffer[3, i] = self._position.size
+        self._n = i + 1
+
+    def stop(self):
+        self._arrays = self._build()
+
+    def _build(self) -> Dict[str, np.ndarray]:
+        n = self._n
+        dt, value, cash, position = self._buffer[:, :n]
+        peak = np.maximum.accumulate(value) if n else value
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = np.where(peak > 0, 100.0 * (peak - value) / peak, 0.0)
+        return {
+            'datetime': num2datetime64(dt),
+            'value': value,
+            'cash': cash,
+            'position': position,
+            'drawdown': drawdown,
+        }
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        datetime（datetime64[ns]）、value、cash、position、drawdown（百分比）数组，长度为已记录的bar数
+        """
+        if self._arrays is None or len(self._arrays['value']) != self._n:
+            self._arrays = self._build()
+        return self._arrays
+
+    def get_analysis(self) -> Dict[str, np.ndarray]:
+        return self.arrays
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        转换为以datetime为索引的DataFrame，不拷贝数组
+
+        Returns:
+        --------
+        pd.DataFrame
+            value、cash、position、drawdown 四列
+        """
+        arrays = self.arrays
+        index = pd.DatetimeIndex(arrays['datetime'], name='datetime', copy=False)
+        return pd.DataFrame({name: arrays[name] for name in FIELDS}, index=index, copy=False)
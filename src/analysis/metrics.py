@@ -0,0 +1,421 @@
+"""
+绩效指标计算
+基于资金曲线数组计算回测指标，口径与 backtrader 的 SharpeRatio、Returns、DrawDown、TradeAnalyzer 分析器一致；
+另提供 Sortino、Calmar、盈亏比、期望收益、持仓时间占比等指标，以及对多条资金曲线一次性计算的 batch_metrics
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Optional, Dict, Union
+
+# 交易记录：开仓、平仓所在的bar序号（平仓bar不计入持仓），毛利润和扣除手续费后的净利润
+TRADE_DTYPE = np.dtype([
+    ('entry', np.int64),
+    ('exit', np.int64),
+    ('pnl', np.float64),
+    ('pnlcomm', np.float64),
+])
+
+
+def annual_returns(equity: np.ndarray, index: pd.Index, initial_value: float) -> np.ndarray:
+    """
+    按自然年计算收益率，与 bt.analyzers.TimeReturn(timeframe=Years) 一致
+
+    Parameters:
+    -----------
+    equity : np.ndarray
+        每根bar的账户总值
+    index : pd.Index
+        bar时间索引，非时间索引时整段视为一期
+    initial_value : float
+        初始资金
+
+    Returns:
+    --------
+    np.ndarray
+        每年的收益率
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return np.empty(0)
+
+    if isinstance(index, pd.DatetimeIndex):
+        years = index.year.to_numpy()
+        year_end = np.flatnonzero(np.diff(years) != 0)
+        year_end = np.append(year_end, len(equity) - 1)
+    else:
+        year_end = np.array([len(equity) - 1])
+
+    end_values = equity[year_end]
+    start_values = np.concatenate(([initial_value], end_values[:-1]))
+    return end_values / start_values - 1.0
+
+
+def sharpe_ratio(equity: np.ndarray,
+                 index: pd.Index,
+                 initial_value: float,
+                 riskfree_rate: float = 0.01) -> Optional[float]:
+    """
+    年度夏普比率，与 bt.analyzers.SharpeRatio 默认参数一致
+
+    Parameters:
+    -----------
+    equity : np.ndarray
+        每根bar的账户总值
+    index : pd.Index
+        bar时间索引
+    initial_value : float
+        初始资金
+    riskfree_rate : float
+        无风险利率
+
+    Returns:
+    --------
+    float or None
+        夏普比率，标准差为0时返回None
+    """
+    excess = annual_returns(equity, index, initial_value) - riskfree_rate
+    if len(excess) == 0:
+        return None
+    std = excess.std()
+    if std == 0:
+        return None
+    return float(excess.mean() / std)
+
+
+def returns(equity: np.ndarray, initial_value: float, tann: float = 252.0) -> Dict[str, float]:
+    """
+    对数总收益和年化收益，与 bt.analyzers.Returns 一致
+
+    Parameters:
+    -----------
+    equity : np.ndarray
+        每根bar的账户总值
+    initial_value : float
+        初始资金
+    tann : float
+        年化使用的周期数，日线为252
+
+    Returns:
+    --------
+    dict
+        rtot、ravg、rnorm、rnorm100
+    """
+    n = len(equity)
+    ratio = equity[-1] / initial_value if n else 1.0
+    rtot = float(np.log(ratio)) if ratio > 0 else float('-inf')
+    ravg = rtot / n if n else 0.0
+    rnorm = float(np.expm1(ravg * tann)) if ravg > float('-inf') else ravg
+    return {'rtot': rtot, 'ravg': ravg, 'rnorm': rnorm, 'rnorm100': rnorm * 100.0}
+
+
+def drawdown(equity: np.ndarray) -> Dict[str, float]:
+    """
+    最大回撤，与 bt.analyzers.DrawDown 一致
+
+    Parameters:
+    -----------
+    equity : np.ndarray
+        每根bar的账户总值
+
+    Returns:
+    --------
+    dict
+        max_drawdown（百分比）、max_moneydown、max_len（持续bar数）
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return {'max_drawdown': 0.0, 'max_moneydown': 0.0, 'max_len': 0}
+
+    peak = np.maximum.accumulate(equity)
+    moneydown = peak - equity
+    dd = 100.0 * moneydown / peak
+
+    # 连续回撤长度：以每次回到新高为分段点
+    in_dd = dd != 0
+    if in_dd.any():
+        groups = np.cumsum(~in_dd)
+        max_len = int(np.bincount(groups, weights=in_dd).max())
+    else:
+        max_len = 0
+
+    return {
+        'max_drawdown': float(dd.max()),
+        'max_moneydown': float(moneydown.max()),
+        'max_len': max_len,
+    }
+
+
+def bar_returns(equity: np.ndarray, initial_value: float) -> np.ndarray:
+    """
+    逐bar收益率，第一根bar相对初始资金计算
+
+    Parameters:
+    -----------
+    equity : np.ndarray
+        每根bar的账户总值，二维时每行为一条资金曲线
+    initial_value : float
+        初始资金
+
+    Returns:
+    --------
+    np.ndarray
+        与 equity 形状相同的收益率
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    prev = np.empty_like(equity)
+    prev[..., 0] = initial_value
+    prev[..., 1:] = equity[..., :-1]
+    return equity / prev - 1.0
+
+
+def sortino_ratio(equity: np.ndarray,
+                  initial_value: float,
+                  periods_per_year: float = 252.0,
+                  target: float = 0.0) -> Optional[float]:
+    """
+    年化Sortino比率：逐bar超额收益均值除以下行偏差
+
+    Parameters:
+    -----------
+    equity : np.ndarray
+        每根bar的账户总值
+    initial_value : float
+        初始资金
+    periods_per_year : float
+        每年的bar数，日线为252
+    target : float
+        每根bar的目标收益率
+
+    Returns:
+    --------
+    float or None
+        Sortino比率，没有低于目标的收益时返回None
+    """
+    excess = bar_returns(equity, initial_value) - target
+    if len(excess) == 0:
+        return None
+    downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+    if downside == 0:
+        return None
+    return float(excess.mean() / downside * np.sqrt(periods_per_year))
+
+
+def calmar_ratio(annual_return: float, max_drawdown: float) -> Optional[float]:
+    """
+    Calmar比率：年化收益率除以最大回撤
+
+    Parameters:
+    -----------
+    annual_return : float
+        年化收益率（百分比）
+    max_drawdown : float
+        最大回撤（百分比）
+
+    Returns:
+    --------
+    float or None
+        Calmar比率，没有回撤时返回None
+    """
+    if max_drawdown == 0:
+        return None
+    return float(annual_return / max_drawdown)
+
+
+def trade_stats(trades: Union[np.ndarray, pd.DataFrame], n_bars: Optional[int] = None) -> Dict[str, float]:
+    """
+    交易统计，盈亏判定与 bt.analyzers.TradeAnalyzer 一致（按净利润，净利润为0计为盈利）
+
+    Parameters:
+    -----------
+    trades : np.ndarray or pd.DataFrame
+        TRADE_DTYPE 结构化数组、包含同名列的DataFrame，或一维的净利润数组
+    n_bars : int, optional
+        回测总bar数，提供且交易记录含 entry/exit 时计算持仓时间占比
+
+    Returns:
+    --------
+    dict
+        total_trades、won_trades、lost_trades、win_rate（百分比）、avg_win、max_win、avg_loss、max_loss、
+        gross_profit、gross_loss、profit_factor、expectancy、exposure（百分比，无法计算时为None）
+    """
+    if isinstance(trades, pd.DataFrame):
+        columns = {name: trades[name].to_numpy() for name in trades.columns}
+    elif getattr(trades, 'dtype', None) is not None and trades.dtype.names:
+        columns = {name: trades[name] for name in trades.dtype.names}
+    else:
+        columns = {'pnlcomm': trades}
+    pnl = np.asarray(columns['pnlcomm'], dtype=np.float64)
+
+    won = pnl >= 0
+    wins, losses = pnl[won], pnl[~won]
+    gross_profit = float(wins.sum())
+    gross_loss = float(-losses.sum())
+    total = len(pnl)
+
+    exposure = None
+    if n_bars and 'entry' in columns and 'exit' in columns:
+        # 各笔交易持仓区间的并集：区间端点处 +1/-1，累加后大于0的bar即为持仓
+        entry = np.clip(np.asarray(columns['entry'], dtype=np.int64), 0, n_bars)
+        exit_ = np.clip(np.asarray(columns['exit'], dtype=np.int64), 0, n_bars)
+        delta = np.bincount(entry, minlength=n_bars + 1) - np.bincount(exit_, minlength=n_bars + 1)
+        exposure = float((np.cumsum(delta[:n_bars]) > 0).sum() / n_bars * 100)
+
+    return {
+        'total_trades': total,
+        'won_trades': int(won.sum()),
+        'lost_trades': int(total - won.sum()),
+        'win_rate': float(won.sum() / total * 100) if total else 0.0,
+        'avg_win': float(wins.mean()) if len(wins) else 0.0,
+        'max_win': float(wins.max()) if len(wins) else 0.0,
+        'avg_loss': float(losses.mean()) if len(losses) else 0.0,
+        'max_loss': float(losses.min()) if len(losses) else 0.0,
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'profit_factor': gross_profit / gross_loss if gross_loss > 0 else None,
+        'expectancy': float(pnl.mean()) if total else 0.0,
+        'exposure': exposure,
+    }
+
+
+def compute_metrics(equity: np.ndarray,
+                    index: pd.Index,
+                    initial_value: float) -> Dict[str, float]:
+    """
+    计算与 BacktestAnalyzer 输出字段相同的指标
+
+    Parameters:
+    -----------
+    equity : np.ndarray
+        每根bar的账户总值
+    index : pd.Index
+        bar时间索引
+    initial_value : float
+        初始资金
+
+    Returns:
+    --------
+    dict
+        sharpe_ratio、total_return、annual_return、max_drawdown、final_value
+    """
+    rets = returns(equity, initial_value)
+    sharpe = sharpe_ratio(equity, index, initial_value)
+    return {
+        'sharpe_ratio': sharpe if sharpe is not None else 0.0,
+        'total_return': rets['rtot'] * 100,
+        'annual_return': rets['rnorm100'],
+        'max_drawdown': drawdown(equity)['max_drawdown'],
+        'final_value': float(equity[-1]) if len(equity) else initial_value,
+    }
+
+
+def full_metrics(equity: np.ndarray,
+                 index: pd.Index,
+                 initial_value: float,
+                 trades: Union[np.ndarray, pd.DataFrame, None] = None,
+                 periods_per_year: float = 252.0) -> Dict[str, float]:
+    """
+    compute_metrics 的全部指标，加上Sortino、Calmar、最长回撤持续时间和交易统计
+
+    Parameters:
+    -----------
+    equity : np.ndarray
+        每根bar的账户总值
+    index : pd.Index
+        bar时间索引
+    initial_value : float
+        初始资金
+    trades : np.ndarray or pd.DataFrame, optional
+        交易记录，见 trade_stats
+    periods_per_year : float
+        每年的bar数，用于Sortino年化
+
+    Returns:
+    --------
+    dict
+        compute_metrics 的字段，以及 sortino_ratio、calmar_ratio、max_drawdown_len，
+        提供交易记录时另含 trade_stats 的字段
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    metrics = compute_metrics(equity, index, initial_value)
+    metrics['max_drawdown_len'] = drawdown(equity)['max_len']
+    metrics['sortino_ratio'] = sortino_ratio(equity, initial_value, periods_per_year)
+    metrics['calmar_ratio'] = calmar_ratio(metrics['annual_return'], metrics['max_drawdown'])
+    if trades is not None:
+        metrics.update(trade_stats(trades, n_bars=len(equity)))
+    return metrics
+
+
+def batch_metrics(equity: np.ndarray,
+                  index: pd.Index,
+                  initial_value: float,
+                  periods_per_year: float = 252.0,
+                  riskfree_rate: float = 0.01) -> pd.DataFrame:
+    """
+    对共享同一时间索引的多条资金曲线一次性计算指标，口径与 full_metrics 相同
+
+    Parameters:
+    -----------
+    equity : np.ndarray
+        (回测数, bar数) 的资金曲线矩阵
+    index : pd.Index
+        bar时间索引
+    initial_value : float
+        初始资金
+    periods_per_year : float
+        每年的bar数
+    riskfree_rate : float
+        夏普比率使用的无风险利率
+
+    Returns:
+    --------
+    pd.DataFrame
+        每行对应一条资金曲线：sharpe_ratio、total_return、annual_return、max_drawdown、
+        max_drawdown_len、sortino_ratio、calmar_ratio、final_value，无法计算的比率为NaN
+    """
+    equity = np.atleast_2d(np.asarray(equity, dtype=np.float64))
+    n_runs, n = equity.shape
+    if n == 0:
+        raise ValueError("资金曲线为空")
+
+    # 年度夏普：与 sharpe_ratio 相同的年末取值，各行共用年末位置
+    if isinstance(index, pd.DatetimeIndex):
+        year_end = np.append(np.flatnonzero(np.diff(index.year.to_numpy()) != 0), n - 1)
+    else:
+        year_end = np.array([n - 1])
+    end_values = equity[:, year_end]
+    start_values = np.concatenate([np.full((n_runs, 1), initial_value), end_values[:, :-1]], axis=1)
+    excess = end_values / start_values - 1.0 - riskfree_rate
+    std = excess.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, excess.mean(axis=1) / std, 0.0)
+
+    # 对数收益，与 returns 一致
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rtot = np.log(equity[:, -1] / initial_value)
+    rnorm100 = np.expm1(rtot / n * 252.0) * 100.0
+
+    # 最大回撤和最长回撤持续时间：连续回撤段长度为累计计数减去最近一次回到新高时的计数
+    peak = np.maximum.accumulate(equity, axis=1)
+    dd = 100.0 * (peak - equity) / peak
+    in_dd = dd != 0
+    count = np.cumsum(in_dd, axis=1)
+    reset = np.maximum.accumulate(np.where(in_dd, 0, count), axis=1)
+    max_dd = dd.max(axis=1)
+
+    rets = bar_returns(equity, initial_value)
+    downside = np.sqrt(np.mean(np.minimum(rets, 0.0) ** 2, axis=1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sortino = np.where(downside > 0, rets.mean(axis=1) / downside * np.sqrt(periods_per_year), np.nan)
+        calmar = np.where(max_dd > 0, rnorm100 / max_dd, np.nan)
+
+    return pd.DataFrame({
+        'sharpe_ratio': sharpe,
+        'total_return': rtot * 100,
+        'annual_return': rnorm100,
+        'max_drawdown': max_dd,
+        'max_drawdown_len': (count - reset).max(axis=1),
+        'sortino_ratio': sortino,
+        'calmar_ratio': calmar,
+        'final_value': equity[:, -1],
+    })
@@ -0,0 +1,246 @@
+"""
+回测报告渲染
+不依赖图形界面：直接在 matplotlib 的 Agg 画布上绘制K线、交易标记、资金曲线和回撤，
+输出为PNG，或内嵌图片和指标表的HTML；长序列按桶做最小/最大值抽稀后再绘制，
+多份报告可在工作进程中并行渲染
+"""
+
+import base64
+import html
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from analysis.metrics import TRADE_DTYPE
+from utils.downsample import decimate_ohlc, minmax_indices
+
+FORMATS = ('png', 'html')
+
+# 默认每个面板最多绘制的点数，约为图片宽度的像素数
+DEFAULT_MAX_POINTS = 2000
+
+
+class ReportData:
+    """
+    渲染一份报告所需的数组，可直接传给工作进程
+    """
+    def __init__(self,
+                 index: pd.Index,
+                 equity: np.ndarray,
+                 ohlc: Optional[Dict[str, np.ndarray]] = None,
+                 trades: Optional[np.ndarray] = None,
+                 benchmark: Optional[np.ndarray] = None,
+                 metrics: Optional[Dict[str, float]] = None,
+                 title: str = 'Backtest Report'):
+        """
+        Parameters:
+        -----------
+        index : pd.Index
+            bar时间索引
+        equity : np.ndarray
+            每根bar的账户总值
+        ohlc : Dict[str, np.ndarray], optional
+            open、high、low、close 数组，与 index 等长；缺少时不绘制K线面板
+        trades : np.ndarray, optional
+            TRADE_DTYPE 交易记录，在K线上标出开仓、平仓位置
+        benchmark : np.ndarray, optional
+            对比资金曲线，如 Buy&Hold
+        metrics : Dict[str, float], optional
+            HTML报告中列出的指标
+        title : str
+            报告标题
+        """
+        self.index = index
+        self.equity = np.asarray(equity, dtype=np.float64)
+        self.ohlc = ohlc
+        self.trades = trades if trades is not None else np.empty(0, dtype=TRADE_DTYPE)
+        self.benchmark = benchmark
+        self.metrics = metrics or {}
+        self.title = title
+
+    @property
+    def drawdown(self) -> np.ndarray:
+        """回撤百分比"""
+        peak = np.maximum.accumulate(self.equity)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(peak > 0, 100.0 * (peak - self.equity) / peak, 0.0)
+
+
+def _x(index: pd.Index) -> np.ndarray:
+    """
+    横轴坐标：时间索引转换为 matplotlib 的日期数值，其他索引直接使用位置
+    """
+    if isinstance(index, pd.DatetimeIndex):
+        return mdates.date2num(index.to_numpy())
+    return np.arange(len(index), dtype=np.float64)
+
+
+def _plot_ohlc(ax, x: np.ndarray, data: ReportData, max_points: int):
+    ohlc = data.ohlc
+    bx, o, h, l, c, _ = decimate_ohlc(x, ohlc['open'], ohlc['high'], ohlc['low'], ohlc['close'], max_points)
+    up = c >= o
+    colors = np.where(up, 'tab:green', 'tab:red')
+    ax.vlines(bx, l, h, colors=colors, linewidth=0.6)
+    ax.vlines(bx, np.minimum(o, c), np.maximum(o, c), colors=colors,
+              linewidth=max(0.8, 600.0 / max(len(bx), 1)))
+
+    trades = data.trades
+    if len(trades):
+        opens = ohlc['open']
+        ax.scatter(x[trades['entry']], opens[trades['entry']], marker='^', s=28,
+                   color='tab:blue', zorder=3, label='Entry')
+        ax.scatter(x[trades['exit']], opens[trades['exit']], marker='v', s=28,
+                   color='black', zorder=3, label='Exit')
+        ax.legend(loc='upper left', fontsize=8)
+    ax.set_ylabel('Price')
+
+
+def render_figure(data: ReportData, max_points: int = DEFAULT_MAX_POINTS,
+                  width: float = 14.0, dpi: int = 100) -> Figure:
+    """
+    绘制报告图：K线与交易标记（有 ohlc 时）、资金曲线、回撤
+
+    Parameters:
+    -----------
+    data : ReportData
+        报告数据
+    max_points : int
+        每个面板最多绘制的点数
+    width : float
+        图片宽度（英寸）
+    dpi : int
+        分辨率
+
+    Returns:
+    --------
+    Figure
+        绑定在 Agg 画布上的图，不经过 pyplot，不依赖显示设备
+    """
+    panels = 3 if data.ohlc is not None else 2
+    ratios = [3, 2, 1][-panels:]
+    fig = Figure(figsize=(width, 2.6 * panels), dpi=dpi)
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(panels, 1, sharex=True, gridspec_kw={'height_ratios': ratios})
+    x = _x(data.index)
+
+    if data.ohlc is not None:
+        _plot_ohlc(axes[0], x, data, max_points)
+
+    ax = axes[-2]
+    keep = minmax_indices(data.equity, max_points)
+    ax.plot(x[keep], data.equity[keep], color='tab:blue', linewidth=1.0, label='Strategy')
+    if data.benchmark is not None:
+        benchmark = np.asarray(data.benchmark, dtype=np.float64)
+        keep = minmax_indices(benchmark, max_points)
+        ax.plot(x[keep], benchmark[keep], color='tab:gray', linewidth=0.8, label='Buy&Hold')
+        ax.legend(loc='upper left', fontsize=8)
+    ax.set_ylabel('Equity')
+
+    ax = axes[-1]
+    drawdown = data.drawdown
+    keep = minmax_indices(drawdown, max_points)
+    ax.fill_between(x[keep], -drawdown[keep], 0.0, color='tab:red', alpha=0.4, linewidth=0)
+    ax.set_ylabel('Drawdown (%)')
+
+    if isinstance(data.index, pd.DatetimeIndex):
+        axes[-1].xaxis_date()
+    for ax in axes:
+        ax.grid(True, alpha=0.3)
+    axes[0].set_title(data.title)
+    fig.tight_layout()
+    return fig
+
+
+def _png_bytes(fig: Figure) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def _metrics_table(metrics: Dict[str, float]) -> str:
+    rows = []
+    for name, value in metrics.items():
+        if isinstance(value, (int, float, np.floating, np.integer)):
+            text = f'{value:,.4f}' if isinstance(value, (float, np.floating)) else f'{value:,}'
+        else:
+            text = str(value)
+        rows.append(f'<tr><th>{html.escape(str(name))}</th><td>{html.escape(text)}</td></tr>')
+    return '<table>\n' + '\n'.join(rows) + '\n</table>'
+
+
+def render_report(data: ReportData, path: str, max_points: int = DEFAULT_MAX_POINTS) -> str:
+    """
+    渲染报告并写入文件
+
+    Parameters:
+    -----------
+    data : ReportData
+        报告数据
+    path : str
+        输出路径，按扩展名输出 .png 图片，或内嵌图片和指标表的 .html 文件
+    max_points : int
+        每个面板最多绘制的点数
+
+    Returns:
+    --------
+    str
+        输出路径
+    """
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的报告格式: {fmt}，可选 {FORMATS}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    png = _png_bytes(render_figure(data, max_points))
+    if fmt == 'png':
+        with open(path, 'wb') as f:
+            f.write(png)
+        return path
+
+    title = html.escape(data.title)
+    image = base64.b64encode(png).decode('ascii')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{title}</title></head>\n'
+                f'<body>\n<h2>{title}</h2>\n{_metrics_table(data.metrics)}\n'
+                f'<img src="data:image/png;base64,{image}" style="max-width:100%">\n</body></html>\n')
+    return path
+
+
+def _render_task(task: Tuple[ReportData, str, int]) -> str:
+    data, path, max_points = task
+    return render_report(data, path, max_points)
+
+
+def render_reports(reports: Iterable[Tuple[ReportData, str]],
+                   max_workers: Optional[int] = None,
+                   max_points: int = DEFAULT_MAX_POINTS) -> List[str]:
+    """
+    并行渲染多份报告，结果顺序与输入一致
+
+    Parameters:
+    -----------
+    reports : Iterable[Tuple[ReportData, str]]
+        (报告数据, 输出路径) 列表
+    max_workers : int, optional
+        工作进程数，默认等于CPU核数；为1时在当前进程内串行渲染
+    max_points : int
+        每个面板最多绘制的点数
+
+    Returns:
+    --------
+    List[str]
+        输出路径
+    """
+    tasks = [(data, path, max_points) for data, path in reports]
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if max_workers == 1:
+        return [_render_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_render_task, tasks))
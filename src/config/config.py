@@ -1 +1,244 @@
- 
\ No newline at end of file
+"""
+回测配置
+从 YAML 或 TOML 文件读取一组回测任务：策略及参数、数据源、时间范围、引擎模式、资金与手续费。
+
+文件顶层可直接是一个任务，也可以是 defaults（所有任务共用的字段）加 runs（任务列表）：
+
+    defaults:
+      data: {path: data/BTCUSDT_1d_2021_2025_cleaned.csv}
+      initial_cash: 1000000
+      commission: 0.001
+    runs:
+      - name: ema_default
+        strategy: ema_crossover
+      - name: ema_grid
+        strategy: ema_crossover
+        mode: feed
+        start: 2022-01-01
+        grid: {ema1_period: [8, 12], ema2_period: [26, 50]}
+
+grid 中的参数组合展开为多个任务，与 params 合并；report 为报告输出路径（相对配置文件所在目录），
+其中的 {name} 替换为任务名称
+"""
+
+import copy
+import importlib
+import itertools
+import os
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+# 策略简称 -> 模块路径.类名，也可以在配置中直接写完整路径
+STRATEGIES = {
+    'ema_crossover': 'strategies.ema_crossover_strategy.EMACrossoverStrategy',
+    'ema_rsi': 'strategies.ema_rsi_strategy.EmaRsiStrategy',
+    'double_ma': 'strategies.double_ma_strategy.DoubleMAStrategy',
+    'buy_and_hold': 'strategies.buy_and_hold_strategy.BuyAndHoldStrategy',
+}
+
+# cerebro：逐bar运行 backtrader；feed：预计算指标数据源（策略需实现 feed_indicators）；
+# vectorized：向量化引擎（策略需实现 vectorized_signals）
+MODES = ('cerebro', 'feed', 'vectorized')
+
+RUN_FIELDS = {'name', 'strategy', 'params', 'grid', 'data', 'start', 'end', 'mode',
+              'initial_cash', 'commission', 'report'}
+
+
+def resolve_strategy(name: str) -> type:
+    """
+    按简称或 模块路径.类名 导入策略类
+    """
+    path = STRATEGIES.get(name, name)
+    module_name, _, class_name = path.rpartition('.')
+    if not module_name:
+        raise ValueError(f"未知的策略: {name}，可选 {sorted(STRATEGIES)} 或 模块路径.类名")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _time_text(value) -> Optional[str]:
+    # YAML 会把 2022-01-01 解析为 date
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+class RunConfig:
+    """
+    单个回测任务
+    """
+    def __init__(self,
+                 name: str,
+                 strategy: str,
+                 data: Dict[str, Any],
+                 params: Optional[Dict[str, Any]] = None,
+                 start: Optional[str] = None,
+                 end: Optional[str] = None,
+                 mode: str = 'cerebro',
+                 initial_cash: float = 1000000.0,
+                 commission: float = 0.001,
+                 report: Optional[str] = None):
+        """
+        Parameters:
+        -----------
+        name : str
+            任务名称，写入结果仓库
+        strategy : str
+            策略简称（见 STRATEGIES）或 模块路径.类名
+        data : Dict[str, Any]
+            数据源：{'path': CSV路径}，或本地行情仓库 {'symbol': ..., 'timeframe': ..., 'store': 仓库目录（可选）}
+        params : Dict[str, Any], optional
+            策略参数
+        start : str, optional
+            开始时间（含）
+        end : str, optional
+            结束时间（含）
+        mode : str
+            引擎模式，见 MODES
+        initial_cash : float
+            初始资金
+        commission : float
+            手续费率
+        report : str, optional
+            回测报告输出路径（.png 或 .html）
+        """
+        if mode not in MODES:
+            raise ValueError(f"任务 {name}: 不支持的引擎模式 {mode}，可选 {MODES}")
+        if 'path' not in data and not ('symbol' in data and 'timeframe' in data):
+            raise ValueError(f"任务 {name}: 数据源需指定 path，或 symbol 和 timeframe")
+        self.name = name
+        self.strategy = strategy
+        self.data = data
+        self.params = dict(params or {})
+        self.start = _time_text(start)
+        self.end = _time_text(end)
+        self.mode = mode
+        self.initial_cash = float(initial_cash)
+        self.commission = float(commission)
+        self.report = report
+
+    @property
+    def data_label(self) -> str:
+        """数据源的简短描述"""
+        if 'path' in self.data:
+            return os.path.basename(self.data['path'])
+        return f"{self.data['symbol']}:{self.data['timeframe']}"
+
+    def strategy_class(self) -> type:
+        return resolve_strategy(self.strategy)
+
+    def __repr__(self) -> str:
+        return f"RunConfig({self.name!r}, {self.strategy!r}, {self.mode!r}, {self.params!r})"
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    合并两层配置，params、data 等字典字段逐键覆盖
+    """
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = dict(merged[key], **value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _resolve_path(path: Optional[str], base_dir: str) -> Optional[str]:
+    """
+    相对路径依次按当前目录、配置文件所在目录查找
+    """
+    if path is None or os.path.isabs(path) or os.path.exists(path):
+        return path
+    candidate = os.path.join(base_dir, path)
+    return candidate if os.path.exists(candidate) else path
+
+
+def expand_runs(document: Dict[str, Any], base_dir: str = '.') -> List[RunConfig]:
+    """
+    将配置文档展开为任务列表
+
+    Parameters:
+    -----------
+    document : Dict[str, Any]
+        解析后的配置文档
+    base_dir : str
+        配置文件所在目录，用于解析数据源和报告的相对路径
+
+    Returns:
+    --------
+    List[RunConfig]
+        回测任务
+    """
+    defaults = document.get('defaults', {})
+    entries = document['runs'] if 'runs' in document else [{k: v for k, v in document.items() if k != 'defaults'}]
+
+    runs = []
+    for i, entry in enumerate(entries):
+        entry = _merge(defaults, entry)
+        unknown = set(entry) - RUN_FIELDS
+        if unknown:
+            raise ValueError(f"第 {i + 1} 个任务包含未知字段: {sorted(unknown)}")
+        if 'strategy' not in entry or 'data' not in entry:
+            raise ValueError(f"第 {i + 1} 个任务缺少 strategy 或 data")
+
+        data = dict(entry['data'])
+        if 'path' in data:
+            data['path'] = _resolve_path(data['path'], base_dir)
+        if 'store' in data:
+            data['store'] = _resolve_path(data['store'], base_dir)
+        name = entry.get('name') or f"{entry['strategy']}_{i + 1}"
+        grid = entry.pop('grid', None) or {}
+        names = list(grid)
+        for combo in itertools.product(*(list(grid[key]) for key in names)):
+            params = dict(entry.get('params') or {}, **dict(zip(names, combo)))
+            suffix = ','.join(f'{key}={value}' for key, value in zip(names, combo))
+            run_name = f'{name}[{suffix}]' if suffix else name
+            fields = dict(entry, params=params, data=data, name=run_name)
+            if entry.get('report'):
+                fields['report'] = os.path.join(base_dir, entry['report'].format(name=run_name))
+            runs.append(RunConfig(**fields))
+    return runs
+
+
+def read_document(path: str) -> Dict[str, Any]:
+    """
+    按扩展名读取 YAML（.yaml/.yml，需安装 PyYAML）或 TOML（.toml）文件
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("读取 YAML 配置需先安装: pip install pyyaml") from e
+        with open(path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    if ext == '.toml':
+        try:
+            import tomllib
+        except ImportError:  # Python 3.10 及以下
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    raise ValueError(f"不支持的配置文件格式: {path}，可选 .yaml、.yml、.toml")
+
+
+def load_config(path: str) -> List[RunConfig]:
+    """
+    读取配置文件中的全部回测任务
+
+    Parameters:
+    -----------
+    path : str
+        配置文件路径
+
+    Returns:
+    --------
+    List[RunConfig]
+        回测任务
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到配置文件: {path}")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    return expand_runs(read_document(path), base_dir)
@@ -0,0 +1,177 @@
+"""
+紧凑K线容器
+只保存回测需要的 int64 时间戳和OHLCV五列，价格可选 float32；
+其余列（成交额、主动买入量等）只在调用 extra() 时才从列式缓存中按需映射
+"""
+
+from typing import Dict, Optional, Sequence
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from data.data_cache import ColumnarCache
+
+FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class BarData:
+    """
+    按列存放的OHLCV数据
+    """
+    def __init__(self,
+                 timestamps: np.ndarray,
+                 columns: Dict[str, np.ndarray],
+                 unit: str = 'ns',
+                 source: Optional[str] = None,
+                 cache: Optional[ColumnarCache] = None,
+                 variant: Optional[str] = None):
+        """
+        Parameters:
+        -----------
+        timestamps : np.ndarray
+            int64时间戳，按时间升序
+        columns : Dict[str, np.ndarray]
+            open、high、low、close、volume 五列，长度与时间戳相同
+        unit : str
+            时间戳精度，'s'、'ms'、'us' 或 'ns'
+        source : str, optional
+            源CSV路径，用于按需读取其他列
+        cache : ColumnarCache, optional
+            源CSV对应的列式缓存
+        variant : str, optional
+            读取其他列时使用的缓存名称，须与本数据的行一一对应
+        """
+        self.timestamps = timestamps
+        self.columns = columns
+        self.unit = unit
+        self.source = source
+        self.cache = cache
+        self.variant = variant
+        # 在源数据中的起始行，slice() 得到的视图读取其他列时据此对齐
+        self._offset = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype: str = 'float64', **kwargs) -> 'BarData':
+        """
+        由以时间为索引、包含小写OHLCV列的DataFrame创建
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            OHLCV数据
+        dtype : str
+            价格和成交量的类型，'float64' 或 'float32'
+        **kwargs
+            source、cache、variant，见 __init__
+
+        Returns:
+        --------
+        BarData
+            float64 时各列尽量直接引用原数据，不做拷贝
+        """
+        if dtype not in ('float64', 'float32'):
+            raise ValueError(f"不支持的数值类型: {dtype}")
+        # 保留索引原有精度，换算精度会拷贝整列
+        columns = {name: df[name].to_numpy(dtype=dtype, copy=False) for name in FIELDS}
+        return cls(df.index.asi8, columns, df.index.unit, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        # bars.close 等价于 bars.columns['close']
+        columns = self.__dict__.get('columns', {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.columns['close'].dtype
+
+    @property
+    def nbytes(self) -> int:
+        """时间戳和OHLCV占用的字节数"""
+        return self.timestamps.nbytes + sum(values.nbytes for values in self.columns.values())
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        """以时间戳构造的索引，不拷贝数据"""
+        return pd.DatetimeIndex(self.timestamps.view(f'datetime64[{self.unit}]'), name='datetime', copy=False)
+
+    def extra(self, name: str) -> np.ndarray:
+        """
+        按需读取OHLCV以外的列
+
+        Parameters:
+        -----------
+        name : str
+            源文件中的列名，如 'Quote asset volume'
+
+        Returns:
+        --------
+        np.ndarray
+            只读内存映射上的切片，与本数据的行对应
+        """
+        if self.source is None or self.cache is None:
+            raise KeyError(f"没有可读取 {name} 的源数据")
+        df = self.cache.read(self.source, columns=[name], variant=self.variant)
+        if name not in df.columns:
+            raise KeyError(f"源数据中没有列: {name}")
+        return df[name].to_numpy()[self._offset:self._offset + len(self)]
+
+    def slice(self, start: int, stop: int) -> 'BarData':
+        """
+        按行号截取，返回共享内存的视图
+        """
+        bars = BarData(self.timestamps[start:stop],
+                       {name: values[start:stop] for name, values in self.columns.items()},
+                       self.unit, self.source, self.cache, self.variant)
+        bars._offset = self._offset + range(len(self))[start:stop].start
+        return bars
+
+    def to_frame(self, extra: Sequence[str] = ()) -> pd.DataFrame:
+        """
+        转换为DataFrame
+
+        Parameters:
+        -----------
+        extra : Sequence[str]
+            同时附带的其他列
+
+        Returns:
+        --------
+        pd.DataFrame
+            以datetime为索引、列名为小写OHLCV的数据，不拷贝各列
+        """
+        columns = dict(self.columns)
+        for name in extra:
+            columns[name] = self.extra(name)
+        return pd.DataFrame(columns, index=self.index, copy=False)
+
+    def to_feed(self, **kwargs) -> bt.feeds.PandasData:
+        """
+        创建backtrader数据源
+
+        Parameters:
+        -----------
+        **kwargs
+            传给 PandasData 的其他参数，如 name
+
+        Returns:
+        --------
+        bt.feeds.PandasData
+            只包含OHLCV的数据源
+        """
+        return bt.feeds.PandasData(
+            dataname=self.to_frame(),
+            datetime=None,
+            open='open',
+            high='high',
+            low='low',
+            close='close',
+            volume='volume',
+            openinterest=-1,
+            **kwargs
+        )
@@ -0,0 +1,263 @@
+"""
+列式数据缓存
+首次加载CSV时将每列转换为 .npy 文件，之后以内存映射方式读取，
+多个进程读取同一份缓存时共享操作系统页缓存
+
+每个缓存条目下的数据按版本子目录存放，meta.json 指向当前版本并以原子替换的方式更新；
+写入新版本时不删除正在使用的版本，并发进程读取时不会遇到文件被删除
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from typing import Optional, Dict
+
+from data.stream_loader import parse_open_time
+
+# 缓存格式版本，格式变化时递增以使旧缓存失效
+CACHE_VERSION = 3
+
+# 不再被引用的数据版本超过该时间（秒）后才删除，留给仍在读取旧版本的进程
+STALE_SECONDS = 600
+
+
+class ColumnarCache:
+    """
+    CSV列式缓存
+    """
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        初始化缓存
+
+        Parameters:
+        -----------
+        cache_dir : str, optional
+            缓存目录，默认为数据目录下的 .cache
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+        self.cache_dir = cache_dir
+
+    def _entry_dir(self, csv_path: str, variant: Optional[str] = None) -> str:
+        """
+        每个源文件对应的缓存子目录，variant 区分由同一源文件派生的数据（如重采样结果）
+        """
+        abs_path = os.path.abspath(csv_path)
+        stem = os.path.splitext(os.path.basename(abs_path))[0]
+        digest = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()[:8]
+        name = f'{stem}_{digest}' if variant is None else f'{stem}_{digest}_{variant}'
+        return os.path.join(self.cache_dir, name)
+
+    @staticmethod
+    def _file_hash(path: str) -> str:
+        """
+        计算源文件内容哈希
+        """
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _read_meta(self, entry_dir: str) -> Optional[Dict]:
+        meta_path = os.path.join(entry_dir, 'meta.json')
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != CACHE_VERSION:
+            return None
+        return meta
+
+    def is_valid(self, csv_path: str, variant: Optional[str] = None) -> bool:
+        """
+        判断缓存是否与源文件一致
+        先比较修改时间和大小，不一致时再比较内容哈希
+
+        Parameters:
+        -----------
+        csv_path : str
+            源CSV路径
+        variant : str, optional
+            派生数据的名称
+
+        Returns:
+        --------
+        bool
+            缓存是否可用
+        """
+        entry_dir = self._entry_dir(csv_path, variant)
+        meta = self._read_meta(entry_dir)
+        if meta is None:
+            return False
+
+        stat = os.stat(csv_path)
+        if meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+            return True
+        if meta['size'] != stat.st_size:
+            return False
+
+        # 文件只是被touch过时，内容未变，更新元数据即可
+        if meta['sha1'] != self._file_hash(csv_path):
+            return False
+        meta['mtime_ns'] = stat.st_mtime_ns
+        self._write_meta(entry_dir, meta)
+        return True
+
+    @staticmethod
+    def _write_meta(entry_dir: str, meta: Dict):
+        tmp_path = os.path.join(entry_dir, f'meta.json.{os.getpid()}')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(entry_dir, 'meta.json'))
+
+    def write(self, csv_path: str, df: pd.DataFrame, variant: Optional[str] = None,
+              replace: bool = True):
+        """
+        将DataFrame按列写入缓存
+
+        Parameters:
+        -----------
+        csv_path : str
+            源CSV路径，用于记录失效信息
+        df : pd.DataFrame
+            解析后的数据
+        variant : str, optional
+            派生数据的名称
+        replace : bool
+            已有与源文件一致的缓存时是否仍写入新版本；为False时直接复用（如其他进程已抢先写入）
+        """
+        entry_dir = self._entry_dir(csv_path, variant)
+        os.makedirs(entry_dir, exist_ok=True)
+        if not replace and self.is_valid(csv_path, variant):
+            return
+
+        # 写入新的版本子目录，meta.json 替换之前其他进程看不到它
+        version = f'v{time.time_ns()}_{os.getpid()}'
+        data_dir = os.path.join(entry_dir, version)
+        os.makedirs(data_dir)
+
+        columns = []
+        for i, name in enumerate(df.columns):
+            values = df[name].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            file_name = f'col_{i:03d}.npy'
+            np.save(os.path.join(data_dir, file_name), values, allow_pickle=False)
+            columns.append({'name': name, 'file': file_name})
+
+        np.save(os.path.join(data_dir, 'index.npy'), df.index.to_numpy(), allow_pickle=False)
+
+        previous = self._read_meta(entry_dir)
+        stat = os.stat(csv_path)
+        self._write_meta(entry_dir, {
+            'version': CACHE_VERSION,
+            'data': version,
+            'source': os.path.abspath(csv_path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha1': self._file_hash(csv_path),
+            'index_name': df.index.name,
+            'columns': columns,
+        })
+        self._prune(entry_dir, keep={version, previous['data'] if previous else None})
+
+    @staticmethod
+    def _prune(entry_dir: str, keep: set):
+        """
+        删除已过期的旧版本数据（含早期格式直接存放在条目目录下的 .npy 文件）
+        """
+        now = time.time()
+        for name in os.listdir(entry_dir):
+            path = os.path.join(entry_dir, name)
+            if name in keep or name.startswith('meta.json'):
+                continue
+            try:
+                if now - os.stat(path).st_mtime < STALE_SECONDS:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def read(self, csv_path: str, columns: Optional[list] = None,
+             variant: Optional[str] = None) -> pd.DataFrame:
+        """
+        以内存映射方式读取缓存
+
+        Parameters:
+        -----------
+        csv_path : str
+            源CSV路径
+        columns : list, optional
+            只读取指定列
+        variant : str, optional
+            派生数据的名称
+
+        Returns:
+        --------
+        pd.DataFrame
+            列数据直接引用只读内存映射，不做拷贝
+        """
+        entry_dir = self._entry_dir(csv_path, variant)
+        for attempt in range(3):
+            meta = self._read_meta(entry_dir)
+            if meta is None:
+                raise FileNotFoundError(f"缓存不存在: {csv_path}")
+            data_dir = os.path.join(entry_dir, meta['data'])
+            try:
+                data = {}
+                for col in meta['columns']:
+                    if columns is not None and col['name'] not in columns:
+                        continue
+                    data[col['name']] = np.load(os.path.join(data_dir, col['file']), mmap_mode='r')
+                index = np.load(os.path.join(data_dir, 'index.npy'), mmap_mode='r')
+                break
+            except FileNotFoundError:
+                # 读取期间该版本已被清理，重新读取 meta.json 指向的新版本
+                if attempt == 2:
+                    raise
+
+        return pd.DataFrame(data, index=pd.Index(index, name=meta['index_name']), copy=False)
+
+    def read_csv(self, csv_path: str, date_col: str = 'Open time') -> pd.DataFrame:
+        """
+        读取CSV，优先使用缓存
+
+        Parameters:
+        -----------
+        csv_path : str
+            CSV文件路径
+        date_col : str
+            作为索引的日期列
+
+        Returns:
+        --------
+        pd.DataFrame
+            以日期列为索引的数据
+        """
+        if not self.is_valid(csv_path):
+            df = pd.read_csv(csv_path)
+            df[date_col] = parse_open_time(df[date_col])
+            df.set_index(date_col, inplace=True)
+            try:
+                self.write(csv_path, df, replace=False)
+            except OSError as e:
+                # 缓存目录不可写时直接返回解析结果
+                logging.warning(f"写入缓存失败: {csv_path}, 错误: {str(e)}")
+                return df
+        return self.read(csv_path)
+
+    def clear(self):
+        """
+        清空缓存目录
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -1,8 +1,434 @@
-import ccxt
-import pandas as pd
-
-okx = ccxt.okx()
-bars = okx.fetch_ohlcv("BTC/USDT", timeframe="1d", limit=100)
-df_okx = pd.DataFrame(bars, columns=["timestamp", "open", "high", "low", "close", "volume"])
-df_okx["timestamp"] = pd.to_datetime(df_okx["timestamp"], unit="ms")
-print(df_okx.head())
+"""
+历史K线下载器
+基于 ccxt 的异步接口并发下载多个交易对、多个周期的完整历史：
+首次下载时从当前时间向前分页回补到上市时间，之后从本地最后一根K线继续向后增量追加，
+所有请求共享同一个限频预算，中断后重新运行即可从断点续传
+
+用法：
+    python src/data/data_fetch.py --exchange okx --symbols BTC/USDT ETH/USDT --timeframes 1d 1h
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 与币安K线CSV的前六列一致，可直接由 StreamingCSVLoader 和 data_preparation 读取
+STORE_HEADER = 'Open time,Open,High,Low,Close,Volume\n'
+
+
+def create_exchange(exchange_id: str, **config):
+    """
+    创建 ccxt 异步交易所实例
+
+    Parameters:
+    -----------
+    exchange_id : str
+        交易所名称，如 okx、binance
+    **config
+        传给交易所的配置，如 apiKey、timeout
+
+    Returns:
+    --------
+    ccxt.async_support.Exchange
+        异步交易所实例，使用完毕后需 await exchange.close()
+    """
+    import ccxt.async_support as ccxt_async
+
+    # 限频由下载器统一控制
+    config.setdefault('enableRateLimit', False)
+    return getattr(ccxt_async, exchange_id)(config)
+
+
+def _retryable_errors() -> Tuple[type, ...]:
+    """
+    可重试的错误类型：网络错误、超时和限频
+    """
+    errors = (ConnectionError, asyncio.TimeoutError)
+    try:
+        import ccxt
+        errors += (ccxt.NetworkError,)
+    except ImportError:
+        pass
+    return errors
+
+
+class RateLimiter:
+    """
+    异步令牌桶，所有并发请求共享同一个每秒请求数预算
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Parameters:
+        -----------
+        rate : float
+            每秒允许的请求数
+        burst : int
+            允许的突发请求数
+        """
+        if rate <= 0:
+            raise ValueError("rate 必须大于0")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, cost: float = 1.0):
+        """
+        取得 cost 个令牌，不足时等待
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                await asyncio.sleep((cost - self._tokens) / self.rate)
+
+
+class CSVStore:
+    """
+    按 交易所/交易对_周期.csv 存放K线的本地仓库，只追加不改写
+
+    向前回补的分页先写入同名的 .backfill 临时文件，回补完成后排序去重再生成正式文件，
+    因此回补中途中断也能从临时文件中最早的时间继续
+    """
+    def __init__(self, root: str):
+        """
+        Parameters:
+        -----------
+        root : str
+            仓库目录
+        """
+        self.root = root
+
+    def path(self, exchange_id: str, symbol: str, timeframe: str) -> str:
+        """K线文件路径，文件名以交易对开头，可直接用于 DataLoader.load_panel"""
+        name = symbol.split(':')[0].replace('/', '')
+        return os.path.join(self.root, exchange_id, f'{name}_{timeframe}.csv')
+
+    @staticmethod
+    def _last_line(path: str) -> Optional[str]:
+        """只读取文件末尾，获取最后一行"""
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            block = min(size, 4096)
+            while True:
+                f.seek(size - block)
+                lines = f.read(block).rstrip(b'\n').split(b'\n')
+                if len(lines) > 1 or block == size:
+                    return lines[-1].decode('utf-8') if lines[-1] else None
+                block = min(size, block * 2)
+
+    def last_timestamp(self, path: str) -> Optional[int]:
+        """
+        最后一根K线的开盘时间（毫秒），文件不存在或为空时返回None
+        """
+        if not os.path.exists(path):
+            return None
+        line = self._last_line(path)
+        if not line or not line[0].isdigit():
+            return None
+        return int(line.split(',', 1)[0])
+
+    def first_timestamp(self, path: str) -> Optional[int]:
+        """
+        第一根K线的开盘时间（毫秒）
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line[0].isdigit():
+                    return int(line.split(',', 1)[0])
+        return None
+
+    @staticmethod
+    def _format(rows: np.ndarray) -> str:
+        return ''.join(f'{int(r[0])},{r[1]!r},{r[2]!r},{r[3]!r},{r[4]!r},{r[5]!r}\n'
+                       for r in rows.tolist())
+
+    def append(self, path: str, rows: np.ndarray):
+        """
+        追加已按时间升序排列的K线
+        """
+        if len(rows) == 0:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        new_file = not os.path.exists(path)
+        with open(path, 'a', encoding='utf-8') as f:
+            if new_file:
+                f.write(STORE_HEADER)
+            f.write(self._format(rows))
+
+    def spool_path(self, path: str) -> str:
+        return path + '.backfill'
+
+    def spool(self, path: str, rows: np.ndarray):
+        """
+        写入一页回补数据（页与页之间为时间倒序）
+        """
+        spool = self.spool_path(path)
+        os.makedirs(os.path.dirname(spool), exist_ok=True)
+        with open(spool, 'a', encoding='utf-8') as f:
+            f.write(self._format(rows))
+
+    def spool_start(self, path: str) -> Optional[int]:
+        """
+        回补临时文件中最早的开盘时间，即断点
+        """
+        spool = self.spool_path(path)
+        if not os.path.exists(spool) or os.path.getsize(spool) == 0:
+            return None
+        # 每页写入时页内升序，最后写入的一页最早，其第一行即为最早时间；
+        # 最后一页可能只写了一半，取整个文件的最小值更稳妥
+        stamps = np.loadtxt(spool, delimiter=',', usecols=0, dtype=np.int64, ndmin=1)
+        return int(stamps.min())
+
+    def finish_spool(self, path: str) -> int:
+        """
+        将回补数据排序去重后写成正式文件
+
+        Returns:
+        --------
+        int
+            写入的K线数
+        """
+        spool = self.spool_path(path)
+        if not os.path.exists(spool):
+            return 0
+        rows = np.loadtxt(spool, delimiter=',', dtype=np.float64, ndmin=2)
+        if len(rows):
+            rows = rows[np.argsort(rows[:, 0], kind='stable')]
+            keep = np.ones(len(rows), dtype=bool)
+            keep[1:] = rows[1:, 0] != rows[:-1, 0]
+            rows = rows[keep]
+            # 回补只在正式文件不存在时进行，写入临时文件后原子替换
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(STORE_HEADER)
+                f.write(self._format(rows))
+            os.replace(tmp, path)
+        os.remove(spool)
+        return len(rows)
+
+
+class HistoryDownloader:
+    """
+    异步历史K线下载器
+    """
+    def __init__(self,
+                 exchange,
+                 store: CSVStore,
+                 limit: int = 1000,
+                 max_concurrency: int = 4,
+                 rate: Optional[float] = None,
+                 retries: int = 5,
+                 backoff: float = 1.0):
+        """
+        Parameters:
+        -----------
+        exchange : ccxt.async_support.Exchange
+            异步交易所实例（或接口相同的 StubExchange）
+        store : CSVStore
+            本地仓库
+        limit : int
+            每页请求的K线数，超过交易所上限时以交易所实际返回为准
+        max_concurrency : int
+            同时进行的请求数上限
+        rate : float, optional
+            每秒请求数预算，默认按交易所的 rateLimit（毫秒/次）换算
+        retries : int
+            单个请求遇到网络错误或限频时的最多重试次数
+        backoff : float
+            首次重试的等待秒数，之后每次加倍
+        """
+        self.exchange = exchange
+        self.store = store
+        self.limit = limit
+        if rate is None:
+            rate_limit_ms = getattr(exchange, 'rateLimit', 0) or 0
+            rate = 1000.0 / rate_limit_ms if rate_limit_ms > 0 else 10.0
+        self.limiter = RateLimiter(rate, burst=max_concurrency)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.requests = 0
+
+    async def _fetch(self, symbol: str, timeframe: str, since: int) -> np.ndarray:
+        """
+        请求一页K线，遇到可重试错误时指数退避
+        """
+        errors = _retryable_errors()
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            try:
+                async with self.semaphore:
+                    self.requests += 1
+                    page = await self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=self.limit)
+                break
+            except errors as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                print(f"{symbol} {timeframe} 请求失败（{e}），{delay:.1f} 秒后重试")
+                await asyncio.sleep(delay)
+        if not page:
+            return np.empty((0, 6))
+        return np.asarray(page, dtype=np.float64)[:, :6]
+
+    async def _backfill(self, symbol: str, timeframe: str, path: str, step: int, end: int) -> int:
+        """
+        从 end（不含）向前分页回补，直到交易所不再返回更早的数据
+        """
+        resume = self.store.spool_start(path)
+        if resume is not None:
+            print(f"{symbol} {timeframe} 从 {_fmt(resume)} 继续向前回补")
+            end = resume
+        span = step * self.limit
+        while True:
+            # 交易所单页上限小于 limit 时一页取不满窗口，在窗口内向后继续翻页直到 end
+            window = []
+            since = end - span
+            while since < end:
+                page = await self._fetch(symbol, timeframe, since=since)
+                page = page[page[:, 0] < end]
+                if len(page) == 0:
+                    break
+                window.append(page)
+                since = int(page[-1, 0]) + step
+            if not window:
+                break
+            if len(window) > 1:
+                # 之后的窗口按交易所实际返回的页长计算，每个窗口一次请求
+                span = step * len(window[0])
+            # 整个窗口一次写入，断点之后的数据总是连续的
+            page = np.concatenate(window)
+            self.store.spool(path, page)
+            end = int(page[0, 0])
+        return self.store.finish_spool(path)
+
+    async def _forward(self, symbol: str, timeframe: str, path: str, step: int, last: int) -> int:
+        """
+        从最后一根K线之后向后分页追加已走完的K线
+        """
+        added = 0
+        now = self.exchange.milliseconds()
+        while True:
+            page = await self._fetch(symbol, timeframe, since=last + step)
+            # 只保存已走完的K线，未走完的K线留到下次更新
+            page = page[(page[:, 0] > last) & (page[:, 0] + step <= now)]
+            if len(page) == 0:
+                break
+            self.store.append(path, page)
+            added += len(page)
+            last = int(page[-1, 0])
+        return added
+
+    async def sync(self, symbol: str, timeframe: str) -> int:
+        """
+        同步一个交易对的一个周期
+
+        Returns:
+        --------
+        int
+            新增的K线数
+        """
+        path = self.store.path(self.exchange.id, symbol, timeframe)
+        step = self.exchange.parse_timeframe(timeframe) * 1000
+        added = 0
+        last = self.store.last_timestamp(path)
+        if last is None:
+            # 当前尚未走完的K线的开盘时间
+            end = self.exchange.milliseconds() // step * step
+            added += await self._backfill(symbol, timeframe, path, step, end)
+            last = self.store.last_timestamp(path)
+        if last is not None:
+            added += await self._forward(symbol, timeframe, path, step, last)
+        print(f"{symbol} {timeframe}: 新增 {added} 根K线 -> {path}")
+        return added
+
+    async def download(self, symbols: Sequence[str], timeframes: Sequence[str]) -> Dict[Tuple[str, str], int]:
+        """
+        并发同步多个交易对和周期
+
+        Returns:
+        --------
+        dict
+            (交易对, 周期) 到新增K线数的映射；失败的任务记为异常对象
+        """
+        jobs = [(symbol, timeframe) for symbol in symbols for timeframe in timeframes]
+        results = await asyncio.gather(*(self.sync(*job) for job in jobs), return_exceptions=True)
+        for job, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                print(f"{job[0]} {job[1]} 下载失败: {result}")
+        return dict(zip(jobs, results))
+
+
+def _fmt(ms: int) -> str:
+    return time.strftime('%Y-%m-%d %H:%M', time.gmtime(ms / 1000))
+
+
+async def download_history(exchange,
+                           symbols: Sequence[str],
+                           timeframes: Sequence[str],
+                           store_dir: str,
+                           **kwargs) -> Dict[Tuple[str, str], int]:
+    """
+    下载并在结束后关闭交易所连接
+
+    Parameters:
+    -----------
+    exchange : str or Exchange
+        交易所名称或实例
+    symbols : Sequence[str]
+        交易对，如 BTC/USDT
+    timeframes : Sequence[str]
+        周期，如 1m、1h、1d
+    store_dir : str
+        本地仓库目录
+    **kwargs
+        传给 HistoryDownloader 的参数
+
+    Returns:
+    --------
+    dict
+        (交易对, 周期) 到新增K线数的映射
+    """
+    if isinstance(exchange, str):
+        exchange = create_exchange(exchange)
+    try:
+        downloader = HistoryDownloader(exchange, CSVStore(store_dir), **kwargs)
+        start = time.perf_counter()
+        results = await downloader.download(symbols, timeframes)
+        print(f"共 {downloader.requests} 次请求，耗时 {time.perf_counter() - start:.1f} 秒")
+        return results
+    finally:
+        await exchange.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='历史K线下载')
+    parser.add_argument('--exchange', default='okx', help='ccxt 交易所名称')
+    parser.add_argument('--symbols', nargs='+', default=['BTC/USDT'], help='交易对')
+    parser.add_argument('--timeframes', nargs='+', default=['1d'], help='周期')
+    parser.add_argument('--store', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'store'),
+                        help='本地仓库目录')
+    parser.add_argument('--limit', type=int, default=100, help='每页K线数')
+    parser.add_argument('--concurrency', type=int, default=4, help='并发请求数')
+    parser.add_argument('--rate', type=float, help='每秒请求数预算，默认按交易所限频')
+    args = parser.parse_args(argv)
+
+    asyncio.run(download_history(args.exchange, args.symbols, args.timeframes, args.store,
+                                 limit=args.limit, max_concurrency=args.concurrency, rate=args.rate))
+
+
+if __name__ == '__main__':
+    main()
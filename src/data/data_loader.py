@@ -6,65 +6,313 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Dict
 import logging
 import backtrader as bt
 import os
 from datetime import datetime
+from data.data_cache import ColumnarCache
+from data.market_panel import MarketPanel
+from data.stream_loader import StreamingCSVLoader, parse_open_time
+from data.resampler import resample_ohlcv, infer_timeframe, close_time_index, bt_timeframe
+from data.data_preparation import CLEAN_VARIANT
+from data.market_store import MarketStore
+from data.bar_data import BarData
 
 class DataLoader:
     """
     数据加载器
     """
-    def __init__(self):
+    def __init__(self, use_cache: bool = True, store: Optional[MarketStore] = None):
+        """
+        Parameters:
+        -----------
+        use_cache : bool
+            是否使用列式缓存，首次加载后以内存映射方式读取
+        store : MarketStore, optional
+            本地行情仓库，默认为数据目录下的仓库
+        """
         # 获取当前文件的绝对路径
         current_dir = os.path.dirname(os.path.abspath(__file__))
         # 构建数据文件的绝对路径
         self.data_path = os.path.join(current_dir, 'BTCUSDT_1d_2021_2025_cleaned.csv')
+        self.cache = ColumnarCache() if use_cache else None
+        self.store = store or MarketStore()
+        # 重采样结果的内存缓存：(数据路径, 周期) -> DataFrame
+        self._resampled = {}
         
-    def load_data(self):
+    def load_dataframe(self, data_path: Optional[str] = None) -> pd.DataFrame:
         """
-        加载数据
+        加载数据为DataFrame
         
+        Parameters:
+        -----------
+        data_path : str, optional
+            数据文件路径，默认使用 self.data_path
+            
         Returns:
         --------
-        bt.feeds.PandasData
-            backtrader可用的数据对象
+        pd.DataFrame
+            以datetime为索引、列名为小写OHLCV的数据
         """
+        data_path = data_path or self.data_path
+        
         # 检查数据文件是否存在
-        if not os.path.exists(self.data_path):
-            raise FileNotFoundError(f"找不到数据文件: {self.data_path}")
+        if not os.path.exists(data_path):
+            raise FileNotFoundError(f"找不到数据文件: {data_path}")
             
-        # 读取CSV文件
-        df = pd.read_csv(self.data_path)
+        # 读取CSV文件（优先使用 data_preparation 写入的清洗结果，其次为缓存）
+        if self.cache is not None and self.cache.is_valid(data_path, CLEAN_VARIANT):
+            return self.cache.read(data_path, variant=CLEAN_VARIANT)
+        if self.cache is not None:
+            df = self.cache.read_csv(data_path)
+        else:
+            df = pd.read_csv(data_path)
+            df['Open time'] = parse_open_time(df['Open time'])
+            df.set_index('Open time', inplace=True)
         
         # 重命名列以匹配backtrader的要求
-        df.rename(columns={
-            'Open time': 'datetime',
+        df = df.rename(columns={
             'Open': 'open',
             'High': 'high',
             'Low': 'low',
             'Close': 'close',
             'Volume': 'volume'
-        }, inplace=True)
+        })
+        df.index.name = 'datetime'
+        
+        return df
         
-        # 转换日期列
-        df['datetime'] = pd.to_datetime(df['datetime'])
-        df.set_index('datetime', inplace=True)
+    def load_bars(self, data_path: Optional[str] = None, dtype: str = 'float64') -> BarData:
+        """
+        加载紧凑的OHLCV数据，只读取时间和OHLCV五列
         
-        # 创建backtrader数据源
-        data = bt.feeds.PandasData(
+        Parameters:
+        -----------
+        data_path : str, optional
+            数据文件路径，默认使用 self.data_path
+        dtype : str
+            价格和成交量的类型，'float64' 或 'float32'（内存减半）
+            
+        Returns:
+        --------
+        BarData
+            其他列可通过 BarData.extra 按需读取（需启用缓存）
+        """
+        data_path = data_path or self.data_path
+        if not os.path.exists(data_path):
+            raise FileNotFoundError(f"找不到数据文件: {data_path}")
+            
+        if self.cache is None:
+            df = pd.read_csv(data_path,
+                             usecols=['Open time', 'Open', 'High', 'Low', 'Close', 'Volume'],
+                             dtype={'Open': dtype, 'High': dtype, 'Low': dtype, 'Close': dtype, 'Volume': dtype})
+            df.index = parse_open_time(df.pop('Open time'))
+            df.columns = df.columns.str.lower()
+            return BarData.from_frame(df, dtype)
+            
+        # 只映射需要的五列，其余列留在缓存中
+        if self.cache.is_valid(data_path, CLEAN_VARIANT):
+            variant = CLEAN_VARIANT
+            df = self.cache.read(data_path, columns=['open', 'high', 'low', 'close', 'volume'], variant=variant)
+        else:
+            variant = None
+            if not self.cache.is_valid(data_path):
+                self.cache.read_csv(data_path)
+            df = self.cache.read(data_path, columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+            df.columns = df.columns.str.lower()
+        return BarData.from_frame(df, dtype, source=data_path, cache=self.cache, variant=variant)
+        
+    def load_data(self, dtype: str = 'float64'):
+        """
+        加载数据
+        
+        Parameters:
+        -----------
+        dtype : str
+            价格和成交量的类型，'float64' 或 'float32'
+        
+        Returns:
+        --------
+        bt.feeds.PandasData
+            backtrader可用的数据对象，只包含OHLCV
+        """
+        return self.load_bars(dtype=dtype).to_feed()
+
+    def load_store(self,
+                   symbol: str,
+                   timeframe: str,
+                   start: Optional[str] = None,
+                   end: Optional[str] = None) -> pd.DataFrame:
+        """
+        从本地行情仓库读取指定时间范围的数据
+        
+        Parameters:
+        -----------
+        symbol : str
+            交易对，如 BTCUSDT
+        timeframe : str
+            周期，如 1m、1d
+        start : str, optional
+            开始时间（含），格式：'YYYY-MM-DD'
+        end : str, optional
+            结束时间（含）
+            
+        Returns:
+        --------
+        pd.DataFrame
+            以datetime为索引、列名为小写OHLCV的数据，直接引用仓库的内存映射
+        """
+        return self.store.read(symbol, timeframe, start, end)
+        
+    def load_store_data(self,
+                        symbol: str,
+                        timeframe: str,
+                        start: Optional[str] = None,
+                        end: Optional[str] = None) -> bt.feeds.PandasData:
+        """
+        从本地行情仓库创建backtrader数据源，参数同 load_store
+        """
+        df = self.load_store(symbol, timeframe, start, end)
+        return bt.feeds.PandasData(
             dataname=df,
-            datetime=None,  # 使用索引作为日期
-            open='open',    # 使用重命名后的列名
+            datetime=None,
+            open='open',
             high='high',
             low='low',
             close='close',
             volume='volume',
-            openinterest=-1 # 不使用持仓量
+            openinterest=-1
         )
+
+    def load_panel(self,
+                   data_paths: Union[List[str], Dict[str, str]],
+                   join: str = 'outer') -> MarketPanel:
+        """
+        加载多个标的并按时间对齐
         
-        return data
+        Parameters:
+        -----------
+        data_paths : list or dict
+            数据文件路径列表，或标的名称到路径的映射；
+            传入列表时以文件名第一个下划线前的部分作为标的名称，如 BTCUSDT
+        join : str
+            'outer' 或 'inner'，见 MarketPanel.from_frames
+            
+        Returns:
+        --------
+        MarketPanel
+            对齐后的多标的行情
+        """
+        if not isinstance(data_paths, dict):
+            data_paths = {os.path.basename(path).split('_')[0]: path for path in data_paths}
+        frames = {symbol: self.load_dataframe(path) for symbol, path in data_paths.items()}
+        return MarketPanel.from_frames(frames, join=join)
+
+    def load_resampled(self, timeframe: str, data_path: Optional[str] = None) -> pd.DataFrame:
+        """
+        由基础数据重采样得到指定周期的K线，结果按周期缓存
+        
+        启用列式缓存时同时写入磁盘，源文件变化后自动失效
+        
+        Parameters:
+        -----------
+        timeframe : str
+            目标周期，如 4h、1d、1w
+        data_path : str, optional
+            基础数据文件路径，默认使用 self.data_path
+            
+        Returns:
+        --------
+        pd.DataFrame
+            以K线开盘时间为索引、列名为小写OHLCV的数据
+        """
+        data_path = os.path.abspath(data_path or self.data_path)
+        key = (data_path, timeframe)
+        if key in self._resampled:
+            return self._resampled[key]
+            
+        variant = f'resample_{timeframe}'
+        if self.cache is not None and self.cache.is_valid(data_path, variant):
+            df = self.cache.read(data_path, variant=variant)
+        else:
+            df = resample_ohlcv(self.load_dataframe(data_path), timeframe)
+            if self.cache is not None:
+                try:
+                    self.cache.write(data_path, df, variant=variant, replace=False)
+                except OSError as e:
+                    logging.warning(f"写入重采样缓存失败: {data_path}, 错误: {str(e)}")
+                    
+        self._resampled[key] = df
+        return df
+        
+    def load_multi_timeframe(self,
+                             timeframes: List[str],
+                             data_path: Optional[str] = None) -> List[bt.feeds.PandasData]:
+        """
+        由同一份基础数据生成多个周期的backtrader数据源
+        
+        按传入顺序依次加入 cerebro 后，策略中 self.datas[0]、self.datas[1] ...
+        即对应各个周期。各数据源以K线收盘时间标记，粗周期K线走完之后才会被策略看到
+        
+        Parameters:
+        -----------
+        timeframes : List[str]
+            周期列表，如 ['1h', '1d']，与基础数据相同的周期直接使用基础数据
+        data_path : str, optional
+            基础数据文件路径，默认使用 self.data_path
+            
+        Returns:
+        --------
+        List[bt.feeds.PandasData]
+            与 timeframes 顺序一致的数据源
+        """
+        data_path = data_path or self.data_path
+        base = self.load_dataframe(data_path)
+        base_timeframe = infer_timeframe(base.index)
+        
+        feeds = []
+        for timeframe in timeframes:
+            df = base if timeframe == base_timeframe else self.load_resampled(timeframe, data_path)
+            df = df.set_axis(close_time_index(df.index, timeframe), axis=0)
+            bt_tf, compression = bt_timeframe(timeframe)
+            feeds.append(bt.feeds.PandasData(
+                dataname=df,
+                name=timeframe,
+                timeframe=bt_tf,
+                compression=compression,
+                datetime=None,
+                open='open',
+                high='high',
+                low='low',
+                close='close',
+                volume='volume',
+                openinterest=-1
+            ))
+        return feeds
+
+    def stream(self,
+               data_path: Optional[str] = None,
+               chunksize: int = 1_000_000,
+               dtype: str = 'float64') -> StreamingCSVLoader:
+        """
+        以分块方式读取大文件（分钟级K线等），内存占用与文件大小无关
+        
+        Parameters:
+        -----------
+        data_path : str, optional
+            数据文件路径，默认使用 self.data_path
+        chunksize : int
+            每块行数
+        dtype : str
+            价格和成交量的类型，'float64' 或 'float32'
+            
+        Returns:
+        --------
+        StreamingCSVLoader
+            可通过 iter_chunks() 逐块读取，或 to_feed() 作为backtrader数据源
+        """
+        return StreamingCSVLoader(data_path or self.data_path, chunksize=chunksize, dtype=dtype)
 
     def load_csv(self, filename: str) -> pd.DataFrame:
         """
@@ -158,20 +406,21 @@ class DataLoader:
         Returns:
         --------
         pd.DataFrame
-            指定时间范围的数据
+            指定时间范围的数据；索引有序时二分查找定位，返回原数据的切片视图
         """
-        if start_date:
-            start_date = pd.to_datetime(start_date)
-            df = df[df.index >= start_date]
-            
-        if end_date:
-            end_date = pd.to_datetime(end_date)
-            df = df[df.index <= end_date]
+        if not df.index.is_monotonic_increasing:
+            if start_date:
+                df = df[df.index >= pd.to_datetime(start_date)]
+            if end_date:
+                df = df[df.index <= pd.to_datetime(end_date)]
+            return df
             
-        return df 
+        i = df.index.searchsorted(pd.to_datetime(start_date), side='left') if start_date else 0
+        j = df.index.searchsorted(pd.to_datetime(end_date), side='right') if end_date else len(df)
+        return df.iloc[i:j]
 
     @staticmethod
-    def load_crypto_data(file_path):
+    def load_crypto_data(file_path, use_cache: bool = True):
         """
         加载加密货币数据
         
@@ -179,16 +428,21 @@ class DataLoader:
         -----------
         file_path : str
             CSV文件路径
+        use_cache : bool
+            是否使用列式缓存
             
         Returns:
         --------
         bt.feeds.PandasData
             backtrader数据源对象
         """
-        # 读取CSV文件
-        df = pd.read_csv(file_path)
-        df['Open time'] = pd.to_datetime(df['Open time'])
-        df.set_index('Open time', inplace=True)
+        # 读取CSV文件（优先使用缓存）
+        if use_cache:
+            df = ColumnarCache().read_csv(file_path)
+        else:
+            df = pd.read_csv(file_path)
+            df['Open time'] = parse_open_time(df['Open time'])
+            df.set_index('Open time', inplace=True)
         
         # 创建backtrader数据源
         data = bt.feeds.PandasData(
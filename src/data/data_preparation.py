@@ -1,39 +1,295 @@
+"""
+K线数据清洗
+排序、去重、缺失值前向填充、按预期周期检测（并可补齐）缺失K线，
+清洗结果直接写入列式缓存，DataLoader 加载原始文件时优先读取清洗结果，
+不再另存 *_cleaned.csv 副本；指定 --store 时同时把新增的K线追加到本地行情仓库
+
+用法：
+    python src/data/data_preparation.py src/data/ETHBTC_1d_2017_2025_merged.csv
+    python src/data/data_preparation.py raw.csv --timeframe 1m --fill-gaps --csv cleaned.csv
+    python src/data/data_preparation.py src/data/store/okx/BTCUSDT_1m.csv --store
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
 import pandas as pd
 
-file_path = 'ETHBTC_1d_2017_2025_data_cleaned.csv'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.data_cache import ColumnarCache
+from data.market_store import MarketStore
+from data.stream_loader import StreamingCSVLoader
+from data.resampler import parse_timeframe, infer_timeframe
+
+# 清洗结果在列式缓存中的名称
+CLEAN_VARIANT = 'clean'
+
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _count_rows(file_path: str) -> int:
+    """
+    统计文件行数（不解析内容），用于预分配数组
+    """
+    count = 0
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 24), b''):
+            count += block.count(b'\n')
+    return count + 1
+
+
+def _read_columns(file_path: str, chunksize: int, extra_columns: Sequence[str]):
+    """
+    分块读取并写入预分配的数组，峰值内存约为最终数据加一个数据块
+    """
+    loader = StreamingCSVLoader(file_path, chunksize=chunksize, extra_columns=extra_columns)
+    capacity = _count_rows(file_path)
+    names = OHLCV + list(extra_columns)
+    ts = np.empty(capacity, dtype=np.int64)
+    columns = {name: np.empty(capacity) for name in names}
+
+    n = 0
+    for chunk in loader.iter_chunks():
+        m = len(chunk)
+        ts[n:n + m] = chunk.index.asi8
+        for name in names:
+            columns[name][n:n + m] = chunk[name].to_numpy()
+        n += m
+    print(f"读取 {n} 行，{loader.rows_per_sec:,.0f} 行/秒")
+    return ts[:n], {name: values[:n] for name, values in columns.items()}
+
+
+def _ffill(values: np.ndarray) -> int:
+    """
+    原地前向填充NaN，返回填充的个数
+    """
+    missing = np.isnan(values)
+    count = int(missing.sum())
+    if count:
+        src = np.where(missing, 0, np.arange(len(values)))
+        np.maximum.accumulate(src, out=src)
+        values[:] = values[src]
+    return count
+
+
+def clean_arrays(ts: np.ndarray,
+                 columns: Dict[str, np.ndarray],
+                 timeframe: Optional[str] = None,
+                 fill_gaps: bool = False):
+    """
+    清洗按列存放的K线数据
+
+    Parameters:
+    -----------
+    ts : np.ndarray
+        int64纳秒时间戳
+    columns : Dict[str, np.ndarray]
+        列名到float64数组的映射，至少包含 open、high、low、close、volume
+    timeframe : str, optional
+        预期K线周期，如 1m、1d；默认由数据推断
+    fill_gaps : bool
+        是否补齐缺失的K线：开高低收取前一根收盘价，成交量及其他列为0
+
+    Returns:
+    --------
+    tuple
+        (时间戳, 列字典, 清洗报告)
+    """
+    report = {'rows_in': len(ts)}
+
+    # 1. 排序：数据通常已有序，只在必要时做一次稳定排序
+    unsorted = len(ts) > 1 and bool((np.diff(ts) < 0).any())
+    report['sorted'] = unsorted
+    if unsorted:
+        order = np.argsort(ts, kind='stable')
+        ts = ts[order]
+        columns = {name: values[order] for name, values in columns.items()}
+        del order
+
+    # 2. 去重：同一时间保留第一条
+    keep = np.ones(len(ts), dtype=bool)
+    keep[1:] = ts[1:] != ts[:-1]
+    report['duplicates'] = int(len(ts) - keep.sum())
+    if report['duplicates']:
+        ts = ts[keep]
+        columns = {name: values[keep] for name, values in columns.items()}
+    del keep
+
+    # 3. 缺失值前向填充，开头无法填充的行删除
+    report['nan_filled'] = sum(_ffill(values) for values in columns.values())
+    leading = np.zeros(len(ts), dtype=bool)
+    for values in columns.values():
+        leading |= np.isnan(values)
+    report['leading_nan_dropped'] = int(leading.sum())
+    if report['leading_nan_dropped']:
+        ts = ts[~leading]
+        columns = {name: values[~leading] for name, values in columns.items()}
+    del leading
+
+    # 4. 按预期周期检测缺失K线
+    if len(ts) > 1:
+        timeframe = timeframe or infer_timeframe(pd.DatetimeIndex(ts.view('datetime64[ns]')))
+        interval = parse_timeframe(timeframe)[0]
+        steps = np.diff(ts)
+        gap_at = np.flatnonzero(steps > interval)
+        report['timeframe'] = timeframe
+        report['gaps'] = len(gap_at)
+        report['missing_bars'] = int(((steps[gap_at] - 1) // interval).sum())
+        report['largest_gaps'] = [
+            (str(pd.Timestamp(ts[i])), str(pd.Timedelta(int(steps[i]), unit='ns')))
+            for i in gap_at[np.argsort(steps[gap_at])[::-1][:5]]
+        ]
+        report['off_grid'] = int(((ts - ts[0]) % interval != 0).sum())
+
+        if fill_gaps and report['missing_bars']:
+            if report['off_grid']:
+                print(f"有 {report['off_grid']} 根K线不在 {timeframe} 网格上，跳过补齐")
+            else:
+                ts, columns = _fill_gaps(ts, columns, interval)
+                report['gaps_filled'] = report['missing_bars']
+
+    report['rows_out'] = len(ts)
+    return ts, columns, report
+
+
+def _fill_gaps(ts: np.ndarray, columns: Dict[str, np.ndarray], interval: int):
+    """
+    将数据铺到完整的时间网格上，逐列处理以限制峰值内存
+    """
+    slots = (ts - ts[0]) // interval
+    n_full = int(slots[-1]) + 1
+    present = np.zeros(n_full, dtype=bool)
+    present[slots] = True
+    # 每个网格位置对应的最近一根真实K线
+    src = np.cumsum(present) - 1
+
+    close = columns['close'][src]
+    filled = {}
+    for name in list(columns):
+        values = columns.pop(name)
+        if name == 'close':
+            out = close
+        elif name in ('open', 'high', 'low'):
+            out = close.copy()
+            out[slots] = values
+        else:
+            out = np.zeros(n_full)
+            out[slots] = values
+        filled[name] = out
+    full_ts = ts[0] + np.arange(n_full, dtype=np.int64) * interval
+    return full_ts, filled
+
+
+def print_report(report: Dict):
+    """
+    打印清洗报告
+    """
+    print(f"输入 {report['rows_in']} 行，输出 {report['rows_out']} 行")
+    if report.get('sorted'):
+        print("数据未按时间排序，已重新排序")
+    if report['duplicates']:
+        print(f"去掉了 {report['duplicates']} 行重复日期数据")
+    if report['nan_filled']:
+        print(f"已对 {report['nan_filled']} 个 NaN 进行前向填充")
+    if report['leading_nan_dropped']:
+        print(f"删除了开头 {report['leading_nan_dropped']} 行无法填充的数据")
+    if 'timeframe' in report:
+        print(f"K线周期 {report['timeframe']}：{report['gaps']} 处缺口，共缺 {report['missing_bars']} 根K线")
+        for start, length in report['largest_gaps']:
+            print(f"  {start} 之后间隔 {length}")
+        if report.get('gaps_filled'):
+            print(f"已补齐 {report['gaps_filled']} 根K线")
+
+
+def prepare(file_path: str,
+            timeframe: Optional[str] = None,
+            fill_gaps: bool = False,
+            extra_columns: Sequence[str] = (),
+            cache: Optional[ColumnarCache] = None,
+            csv_path: Optional[str] = None,
+            chunksize: int = 1_000_000,
+            store: Optional[MarketStore] = None,
+            symbol: Optional[str] = None) -> Dict:
+    """
+    清洗K线CSV并写入列式缓存
+
+    Parameters:
+    -----------
+    file_path : str
+        原始CSV（带表头的项目格式或无表头的币安格式，时间可为毫秒时间戳或日期字符串）
+    timeframe : str, optional
+        预期K线周期，默认由数据推断
+    fill_gaps : bool
+        是否补齐缺失K线
+    extra_columns : Sequence[str]
+        除OHLCV外一并保留的列
+    cache : ColumnarCache, optional
+        写入的缓存，默认为数据目录下的缓存
+    csv_path : str, optional
+        同时导出的CSV路径
+    chunksize : int
+        读取时每块行数
+    store : MarketStore, optional
+        追加写入的行情仓库，仓库中已有的K线不会重复写入
+    symbol : str, optional
+        写入仓库时的交易对名称，默认取文件名第一个下划线前的部分
+
+    Returns:
+    --------
+    dict
+        清洗报告
+    """
+    ts, columns, report = clean_arrays(*_read_columns(file_path, chunksize, extra_columns),
+                                       timeframe=timeframe, fill_gaps=fill_gaps)
+    index = pd.DatetimeIndex(ts.view('datetime64[ns]'), name='datetime')
+    df = pd.DataFrame(columns, index=index, copy=False)
 
-# 1. 读取 CSV
-df = pd.read_csv(file_path)
+    cache = cache or ColumnarCache()
+    cache.write(file_path, df, variant=CLEAN_VARIANT)
+    print_report(report)
+    print(f"清洗结果已写入缓存: {cache.cache_dir}")
 
-# 2. 将 'Open time' 从毫秒级时间戳转换为可读日期时间
-# df['Open time'] = pd.to_datetime(df['Open time'], unit='ms')
+    if csv_path:
+        out = df.rename(columns={name: name.capitalize() for name in OHLCV})
+        out.index.name = 'Open time'
+        out.to_csv(csv_path)
+        print(f"已导出: {csv_path}")
 
-# 3. 按日期进行排序
-df.sort_values(by='Open time', inplace=True)
+    if store is not None and 'timeframe' in report:
+        symbol = symbol or os.path.basename(file_path).split('_')[0]
+        report['appended'] = store.append(symbol, report['timeframe'], df)
+        print(f"已向仓库追加 {report['appended']} 根K线: {symbol} {report['timeframe']}")
+    return report
 
-# 4. 确认是否有重复日期：检查并去重
-before_count = len(df)
-df.drop_duplicates(subset='Open time', keep='first', inplace=True)
-after_count = len(df)
-if before_count != after_count:
-    print(f"去掉了 {before_count - after_count} 行重复日期数据")
 
-# 5. 检查是否存在缺失值
-nan_rows = df[df.isnull().any(axis=1)]
-if not nan_rows.empty:
-    print("以下行存在 NaN 值：")
-    print(nan_rows)
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='K线数据清洗')
+    parser.add_argument('files', nargs='+', help='原始CSV文件')
+    parser.add_argument('--timeframe', help='预期K线周期，如 1m、1h、1d，默认自动推断')
+    parser.add_argument('--fill-gaps', action='store_true', help='补齐缺失的K线')
+    parser.add_argument('--keep', nargs='*', default=[], help='除OHLCV外保留的列')
+    parser.add_argument('--cache-dir', help='列式缓存目录')
+    parser.add_argument('--csv', help='同时导出清洗后的CSV（仅处理单个文件时可用）')
+    parser.add_argument('--chunksize', type=int, default=1_000_000, help='每块读取的行数')
+    parser.add_argument('--store', nargs='?', const='', help='追加到本地行情仓库，可指定仓库目录')
+    parser.add_argument('--symbol', help='写入仓库时的交易对名称（仅处理单个文件时可用）')
+    args = parser.parse_args(argv)
 
-    # 按列进行前向填充
-    df.fillna(method='ffill', inplace=True)
-    print("\n已对 NaN 进行前向填充（forward fill）。")
-else:
-    print("没有检测到 NaN 值。")
+    if args.csv and len(args.files) > 1:
+        parser.error('--csv 只能用于单个文件')
+    if args.symbol and len(args.files) > 1:
+        parser.error('--symbol 只能用于单个文件')
+    cache = ColumnarCache(args.cache_dir) if args.cache_dir else None
+    store = None if args.store is None else MarketStore(args.store or None)
+    for file_path in args.files:
+        print(f"\n=== {file_path} ===")
+        prepare(file_path, args.timeframe, args.fill_gaps, args.keep, cache, args.csv, args.chunksize,
+                store, args.symbol)
 
-# 6. 检查结果
-print("\n处理后的 DataFrame 概况：")
-print(df.info())
-print(df.head())
 
-# 如需保存处理完的数据，可执行
-df.to_csv('ETHBTC_1d_2017_2025_cleaned.csv', index=False)
+if __name__ == '__main__':
+    main()
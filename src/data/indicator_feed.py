@@ -0,0 +1,195 @@
+"""
+带预计算指标的数据源
+指标在回测前按backtrader内置指标的口径一次性向量化计算，作为数据源的扩展线随K线推送，
+策略直接读取这些线，cerebro 运行时不再逐bar计算指标
+"""
+
+from typing import Dict, Optional, Tuple, Type
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from backtrader.utils import date2num
+
+from utils.indicator_cache import IndicatorCache, bt_indicator
+from utils.indicator_kernels import crossover
+
+# 线名 -> (指标名, 参数)，例如 {'ema1': ('ema', {'period': 12})}
+IndicatorSpec = Dict[str, Tuple[str, Dict]]
+
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+
+class IndicatorPandasData(bt.feeds.PandasData):
+    """
+    带指标线的 PandasData
+
+    指标线由 indicator_feed_class 按需声明；各列在 start() 时一次性取出，
+    逐bar加载时按行号读取，不再经过 DataFrame.iloc
+    """
+    params = (
+        ('warmup', 1),  # 指标线全部有效所需的bar数，与对应内置指标组合的最小周期一致
+    )
+
+    def start(self):
+        super(IndicatorPandasData, self).start()
+        df = self.p.dataname
+        self._columns = [(getattr(self.lines, field), df.iloc[:, colindex].to_numpy(dtype=np.float64).tolist())
+                         for field, colindex in self._colmapping.items()
+                         if field != 'datetime' and colindex is not None]
+        if self._colmapping['datetime'] is None:
+            stamps = df.index
+        else:
+            stamps = pd.DatetimeIndex(df.iloc[:, self._colmapping['datetime']])
+        self._dtnums = [date2num(dt) for dt in stamps.to_pydatetime()]
+
+    def _load(self):
+        self._idx += 1
+        if self._idx >= len(self._dtnums):
+            return False
+
+        idx = self._idx
+        for line, values in self._columns:
+            line[0] = values[idx]
+        self.lines.datetime[0] = self._dtnums[idx]
+        return True
+
+
+_feed_classes: Dict[Tuple[str, ...], Type[IndicatorPandasData]] = {}
+
+
+def indicator_feed_class(names: Tuple[str, ...]) -> Type[IndicatorPandasData]:
+    """
+    声明了给定指标线的数据源类，相同的线名组合复用同一个类
+
+    Parameters:
+    -----------
+    names : Tuple[str, ...]
+        指标线名称，同时也是 DataFrame 中对应的列名
+
+    Returns:
+    --------
+    Type[IndicatorPandasData]
+        数据源类
+    """
+    names = tuple(names)
+    if names not in _feed_classes:
+        _feed_classes[names] = type(
+            f"IndicatorPandasData_{'_'.join(names)}",
+            (IndicatorPandasData,),
+            {'lines': names, 'params': tuple((name, name) for name in names)},
+        )
+    return _feed_classes[names]
+
+
+def compute_indicators(df: pd.DataFrame,
+                       spec: IndicatorSpec,
+                       cache: Optional[IndicatorCache] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    按backtrader口径计算指标列
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        以时间为索引、包含小写OHLCV列的数据
+    spec : IndicatorSpec
+        线名到 (指标名, 参数) 的映射；指标名为 indicator_cache 支持的
+        ema、sma、volume_sma、rsi、atr，或 crossover（参数 fast、slow 为之前已声明的线名）
+    cache : IndicatorCache, optional
+        指标缓存，默认为进程内共享缓存
+
+    Returns:
+    --------
+    tuple
+        (指标列组成的DataFrame, 所有指标线都有效所需的bar数)
+    """
+    columns = {}
+    minperiods = {}
+    for line, (name, params) in spec.items():
+        if line in OHLCV:
+            raise ValueError(f"指标线不能与行情字段重名: {line}")
+        if name == 'crossover':
+            fast, slow = params['fast'], params['slow']
+            # 与 bt.indicators.CrossOver 一致，需要前一根bar的差值
+            columns[line] = crossover(columns[fast], columns[slow]).astype(np.float64)
+            minperiods[line] = max(minperiods[fast], minperiods[slow]) + 1
+        else:
+            values, minperiods[line] = bt_indicator(
+                lambda field: df[field].to_numpy(dtype=np.float64), name, cache, **params)
+            columns[line] = values
+    warmup = max(minperiods.values(), default=1)
+    return pd.DataFrame(columns, index=df.index, copy=False), warmup
+
+
+def indicator_feed(df: pd.DataFrame,
+                   spec: IndicatorSpec,
+                   cache: Optional[IndicatorCache] = None,
+                   **kwargs) -> IndicatorPandasData:
+    """
+    创建带预计算指标线的数据源
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        以时间为索引、包含小写OHLCV列的数据
+    spec : IndicatorSpec
+        指标线声明，见 compute_indicators
+    cache : IndicatorCache, optional
+        指标缓存，默认为进程内共享缓存
+    **kwargs
+        传给 PandasData 的其他参数，如 name
+
+    Returns:
+    --------
+    IndicatorPandasData
+        在OHLCV之外带有 spec 中各条指标线的数据源
+    """
+    indicators, warmup = compute_indicators(df, spec, cache)
+    frame = pd.concat([df[OHLCV], indicators], axis=1)
+    feed_class = indicator_feed_class(tuple(spec))
+    return feed_class(
+        dataname=frame,
+        datetime=None,
+        open='open',
+        high='high',
+        low='low',
+        close='close',
+        volume='volume',
+        openinterest=-1,
+        warmup=warmup,
+        **kwargs
+    )
+
+
+def strategy_feed(df: pd.DataFrame,
+                  strategy_class: Type[bt.Strategy],
+                  strategy_params: Optional[Dict] = None,
+                  cache: Optional[IndicatorCache] = None,
+                  **kwargs) -> IndicatorPandasData:
+    """
+    按策略声明的指标创建数据源
+
+    策略需实现 feed_indicators 类方法，并以 use_feed_indicators=True 运行
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        以时间为索引、包含小写OHLCV列的数据
+    strategy_class : Type[bt.Strategy]
+        策略类
+    strategy_params : dict, optional
+        策略参数，决定指标周期
+    cache : IndicatorCache, optional
+        指标缓存，默认为进程内共享缓存
+    **kwargs
+        传给 PandasData 的其他参数
+
+    Returns:
+    --------
+    IndicatorPandasData
+        带策略所需指标线的数据源
+    """
+    if not hasattr(strategy_class, 'feed_indicators'):
+        raise TypeError(f"{strategy_class.__name__} 不支持预计算指标数据源")
+    spec = strategy_class.feed_indicators(**(strategy_params or {}))
+    return indicator_feed(df, spec, cache, **kwargs)
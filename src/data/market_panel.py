@@ -0,0 +1,147 @@
+"""
+多标的行情面板
+将多个标的的OHLCV按统一时间索引一次性对齐为 (bar数, 标的数) 的连续数组，
+组合回测逐bar处理时直接按行访问，无需逐bar查字典
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class MarketPanel:
+    """
+    对齐后的多标的行情
+    """
+    def __init__(self, index: pd.Index, symbols: List[str], arrays: Dict[str, np.ndarray]):
+        """
+        Parameters:
+        -----------
+        index : pd.Index
+            公共时间索引
+        symbols : List[str]
+            标的名称，与数组的列顺序一致
+        arrays : Dict[str, np.ndarray]
+            字段名到 (len(index), len(symbols)) 数组的映射，缺失行情为NaN
+        """
+        self.index = index
+        self.symbols = list(symbols)
+        self.open = arrays['open']
+        self.high = arrays['high']
+        self.low = arrays['low']
+        self.close = arrays['close']
+        self.volume = arrays['volume']
+        # 标的在该bar是否有行情
+        self.tradable = ~np.isnan(self.close)
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], join: str = 'outer') -> 'MarketPanel':
+        """
+        由各标的的DataFrame构建面板
+
+        Parameters:
+        -----------
+        frames : Dict[str, pd.DataFrame]
+            标的名称到小写OHLCV DataFrame 的映射，索引为时间
+        join : str
+            'outer' 取所有标的时间的并集，未上市或停牌的bar为NaN；
+            'inner' 只保留所有标的都有行情的bar
+
+        Returns:
+        --------
+        MarketPanel
+            对齐后的面板
+        """
+        if not frames:
+            raise ValueError("至少需要一个标的")
+        if join not in ('outer', 'inner'):
+            raise ValueError(f"不支持的对齐方式: {join}")
+
+        symbols = list(frames)
+        index = None
+        for df in frames.values():
+            if index is None:
+                index = df.index
+            elif join == 'outer':
+                index = index.union(df.index)
+            else:
+                index = index.intersection(df.index)
+        index = index.sort_values()
+
+        n, m = len(index), len(symbols)
+        arrays = {field: np.full((n, m), np.nan) for field in FIELDS}
+        for j, symbol in enumerate(symbols):
+            df = frames[symbol]
+            if not df.index.is_unique:
+                raise ValueError(f"{symbol} 的时间索引存在重复")
+            # 每个标的只做一次索引定位，再按整列写入
+            rows = index.get_indexer(df.index)
+            keep = rows >= 0
+            rows = rows[keep]
+            for field in FIELDS:
+                arrays[field][rows, j] = df[field].to_numpy(dtype=np.float64)[keep]
+        return cls(index, symbols, arrays)
+
+    @property
+    def shape(self):
+        """(bar数, 标的数)"""
+        return self.close.shape
+
+    def frame(self, symbol: str, dropna: bool = True) -> pd.DataFrame:
+        """
+        取出单个标的的OHLCV
+
+        Parameters:
+        -----------
+        symbol : str
+            标的名称
+        dropna : bool
+            是否去掉该标的没有行情的bar
+
+        Returns:
+        --------
+        pd.DataFrame
+            小写OHLCV列的数据
+        """
+        j = self.symbols.index(symbol)
+        rows = self.tradable[:, j] if dropna else slice(None)
+        return pd.DataFrame({field: getattr(self, field)[rows, j] for field in FIELDS},
+                            index=self.index[rows])
+
+    def mark_prices(self) -> np.ndarray:
+        """
+        估值用的收盘价：停牌时沿用最近收盘价，上市前为0
+
+        Returns:
+        --------
+        np.ndarray
+            (bar数, 标的数) 的数组
+        """
+        close = self.close
+        n = len(close)
+        last = np.where(self.tradable, np.arange(n)[:, None], 0)
+        np.maximum.accumulate(last, axis=0, out=last)
+        prices = close[last, np.arange(close.shape[1])]
+        return np.nan_to_num(prices, nan=0.0)
+
+    def slice(self, start: int, stop: Optional[int] = None) -> 'MarketPanel':
+        """
+        按bar位置截取，返回共享底层数组的视图
+
+        Parameters:
+        -----------
+        start : int
+            起始位置
+        stop : int, optional
+            结束位置（不含）
+
+        Returns:
+        --------
+        MarketPanel
+            截取后的面板
+        """
+        rows = slice(start, stop)
+        return MarketPanel(self.index[rows], self.symbols,
+                           {field: getattr(self, field)[rows] for field in FIELDS})
@@ -0,0 +1,255 @@
+"""
+本地行情仓库
+按 交易对/周期 分区，每个分区的各列为只追加的二进制文件，
+时间列本身即为有序索引，区间查询用二分查找定位，读取结果直接引用内存映射，不做拷贝
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# 仓库格式版本
+STORE_VERSION = 1
+
+FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+TimeLike = Union[str, pd.Timestamp, np.datetime64, int, None]
+
+
+def _to_ns(value: TimeLike) -> Optional[int]:
+    """
+    将时间转换为纳秒时间戳，整数视为已是纳秒
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).as_unit('ns').value)
+
+
+class StorePartition:
+    """
+    一个 交易对/周期 分区的只读视图
+
+    打开时按清单中的行数映射各列文件，之后追加的数据需重新打开分区才可见
+    """
+    def __init__(self, path: str, manifest: Dict):
+        self.path = path
+        self.manifest = manifest
+        rows = manifest['rows']
+        if rows:
+            self.timestamps = np.memmap(os.path.join(path, 'timestamp.bin'), dtype=np.int64,
+                                        mode='r', shape=(rows,))
+            self.columns = {name: np.memmap(os.path.join(path, f'{name}.bin'), dtype=np.float64,
+                                            mode='r', shape=(rows,))
+                            for name in FIELDS}
+        else:
+            self.timestamps = np.empty(0, dtype=np.int64)
+            self.columns = {name: np.empty(0) for name in FIELDS}
+
+    def __len__(self) -> int:
+        return self.manifest['rows']
+
+    @property
+    def segments(self) -> List[Dict]:
+        """每次追加对应的行区间和时间范围"""
+        return self.manifest['segments']
+
+    @property
+    def first_timestamp(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(int(self.timestamps[0])) if len(self) else None
+
+    @property
+    def last_timestamp(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(int(self.timestamps[-1])) if len(self) else None
+
+    def locate(self, start: TimeLike = None, end: TimeLike = None) -> slice:
+        """
+        二分查找 [start, end] 对应的行区间，复杂度 O(log n)
+
+        Parameters:
+        -----------
+        start : str, Timestamp or int, optional
+            开始时间（含），整数为纳秒时间戳
+        end : str, Timestamp or int, optional
+            结束时间（含）
+
+        Returns:
+        --------
+        slice
+            行区间
+        """
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+        i = 0 if start_ns is None else int(np.searchsorted(self.timestamps, start_ns, side='left'))
+        j = len(self) if end_ns is None else int(np.searchsorted(self.timestamps, end_ns, side='right'))
+        return slice(i, max(i, j))
+
+    def arrays(self, start: TimeLike = None, end: TimeLike = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        区间内的时间戳和各列数组（内存映射上的切片）
+        """
+        rows = self.locate(start, end)
+        return self.timestamps[rows], {name: values[rows] for name, values in self.columns.items()}
+
+    def frame(self, start: TimeLike = None, end: TimeLike = None) -> pd.DataFrame:
+        """
+        读取区间内的数据
+
+        Returns:
+        --------
+        pd.DataFrame
+            以datetime为索引、列名为小写OHLCV的数据，各列直接引用只读内存映射
+        """
+        ts, columns = self.arrays(start, end)
+        index = pd.DatetimeIndex(ts.view('datetime64[ns]'), name='datetime', copy=False)
+        return pd.DataFrame(columns, index=index, copy=False)
+
+
+class MarketStore:
+    """
+    按 交易对/周期 分区的只追加行情仓库
+
+    每次追加写入各列文件末尾并在清单中记录一个分段，已有数据不会被改写；
+    清单最后替换，写到一半中断时多出的尾部字节会在下次追加前截掉
+    """
+    def __init__(self, root: Optional[str] = None):
+        """
+        Parameters:
+        -----------
+        root : str, optional
+            仓库目录，默认为数据目录下的 market
+        """
+        if root is None:
+            root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'market')
+        self.root = root
+
+    def _partition_dir(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, symbol.replace('/', ''), timeframe)
+
+    @staticmethod
+    def _read_manifest(path: str) -> Dict:
+        try:
+            with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {'version': STORE_VERSION, 'rows': 0, 'segments': []}
+        if manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"不支持的仓库版本: {path}")
+        return manifest
+
+    @staticmethod
+    def _write_manifest(path: str, manifest: Dict):
+        tmp_path = os.path.join(path, f'manifest.json.{os.getpid()}')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(path, 'manifest.json'))
+
+    def partitions(self) -> Iterator[Tuple[str, str]]:
+        """
+        列出仓库中的 (交易对, 周期)
+        """
+        if not os.path.isdir(self.root):
+            return
+        for symbol in sorted(os.listdir(self.root)):
+            symbol_dir = os.path.join(self.root, symbol)
+            if not os.path.isdir(symbol_dir):
+                continue
+            for timeframe in sorted(os.listdir(symbol_dir)):
+                if os.path.exists(os.path.join(symbol_dir, timeframe, 'manifest.json')):
+                    yield symbol, timeframe
+
+    def open(self, symbol: str, timeframe: str) -> StorePartition:
+        """
+        打开分区
+
+        Parameters:
+        -----------
+        symbol : str
+            交易对，如 BTCUSDT 或 BTC/USDT
+        timeframe : str
+            周期，如 1m、1d
+
+        Returns:
+        --------
+        StorePartition
+            分区的只读视图
+        """
+        path = self._partition_dir(symbol, timeframe)
+        if not os.path.exists(os.path.join(path, 'manifest.json')):
+            raise FileNotFoundError(f"仓库中没有 {symbol} {timeframe}")
+        return StorePartition(path, self._read_manifest(path))
+
+    def read(self, symbol: str, timeframe: str,
+             start: TimeLike = None, end: TimeLike = None) -> pd.DataFrame:
+        """
+        读取 [start, end] 区间的数据，见 StorePartition.frame
+        """
+        return self.open(symbol, timeframe).frame(start, end)
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> Optional[pd.Timestamp]:
+        """
+        分区中最后一根K线的时间，分区不存在时返回None
+        """
+        path = self._partition_dir(symbol, timeframe)
+        manifest = self._read_manifest(path)
+        if not manifest['segments']:
+            return None
+        return pd.Timestamp(manifest['segments'][-1]['last'])
+
+    def append(self, symbol: str, timeframe: str, df: pd.DataFrame) -> int:
+        """
+        追加K线
+
+        早于或等于分区最后一根K线的行视为已存在而跳过，其余行须按时间严格递增
+
+        Parameters:
+        -----------
+        symbol : str
+            交易对
+        timeframe : str
+            周期
+        df : pd.DataFrame
+            以时间为索引、包含小写OHLCV列的数据
+
+        Returns:
+        --------
+        int
+            实际追加的行数
+        """
+        path = self._partition_dir(symbol, timeframe)
+        os.makedirs(path, exist_ok=True)
+        manifest = self._read_manifest(path)
+        rows = manifest['rows']
+
+        ts = df.index.as_unit('ns').asi8
+        if manifest['segments']:
+            new = ts > manifest['segments'][-1]['last']
+            if not new.all():
+                df, ts = df[new], ts[new]
+        if len(ts) == 0:
+            return 0
+        if len(ts) > 1 and not (np.diff(ts) > 0).all():
+            raise ValueError("追加的数据须按时间严格递增且无重复，请先用 data_preparation 清洗")
+
+        for name, values, dtype in [('timestamp', ts, np.int64)] + [(f, df[f].to_numpy(), np.float64)
+                                                                   for f in FIELDS]:
+            file_path = os.path.join(path, f'{name}.bin')
+            with open(file_path, 'ab') as f:
+                # 截掉上次中断时写入但未记入清单的部分
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+        manifest['rows'] = rows + len(ts)
+        manifest['segments'].append({
+            'start': rows,
+            'stop': rows + len(ts),
+            'first': int(ts[0]),
+            'last': int(ts[-1]),
+            'written_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        })
+        self._write_manifest(path, manifest)
+        return len(ts)
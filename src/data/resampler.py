@@ -0,0 +1,164 @@
+"""
+K线重采样
+由较细周期的基础数据一次性向量化合成较粗周期的K线：
+开盘取首个、最高取最大、最低取最小、收盘取最后、成交量求和
+"""
+
+import re
+from typing import Tuple
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+_NS = {
+    'm': 60 * 10**9,
+    'h': 3600 * 10**9,
+    'd': 86400 * 10**9,
+    'w': 7 * 86400 * 10**9,
+}
+
+# 1970-01-01 为周四，周线以周一为起点需要平移3天
+_WEEK_OFFSET = 3 * 86400 * 10**9
+
+# 周期单位对应的backtrader时间框架
+_BT_TIMEFRAMES = {
+    'm': bt.TimeFrame.Minutes,
+    'h': bt.TimeFrame.Minutes,
+    'd': bt.TimeFrame.Days,
+    'w': bt.TimeFrame.Weeks,
+}
+
+
+# 时间索引各精度下每个单位的纳秒数
+_UNIT_NS = {'s': 10**9, 'ms': 10**6, 'us': 10**3, 'ns': 1}
+
+
+def _ticks(index: pd.DatetimeIndex) -> Tuple[np.ndarray, int]:
+    """
+    取时间索引在其自身精度下的整数值，避免转换精度带来的整列拷贝
+
+    Returns:
+    --------
+    tuple
+        (int64数组, 每个单位的纳秒数)
+    """
+    return index.asi8, _UNIT_NS[index.unit]
+
+
+def parse_timeframe(timeframe: str) -> Tuple[int, int]:
+    """
+    解析 1m、15m、1h、4h、1d、1w 形式的周期（与数据文件名中的写法一致）
+
+    Parameters:
+    -----------
+    timeframe : str
+        周期
+
+    Returns:
+    --------
+    tuple
+        (周期纳秒数, 分桶偏移纳秒数)
+    """
+    match = re.fullmatch(r'(\d+)([mhdw])', timeframe)
+    if not match:
+        raise ValueError(f"不支持的周期: {timeframe}")
+    count, unit = int(match.group(1)), match.group(2)
+    if count <= 0:
+        raise ValueError(f"不支持的周期: {timeframe}")
+    return count * _NS[unit], _WEEK_OFFSET if unit == 'w' else 0
+
+
+def bt_timeframe(timeframe: str) -> Tuple[int, int]:
+    """
+    周期对应的backtrader (timeframe, compression)
+    """
+    parse_timeframe(timeframe)
+    count, unit = int(timeframe[:-1]), timeframe[-1]
+    if unit == 'h':
+        count *= 60
+    return _BT_TIMEFRAMES[unit], count
+
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    将OHLCV重采样为更粗的周期
+
+    按时间戳整除周期长度分桶，再用 reduceat 在桶边界上一次完成聚合，
+    不经过 groupby；周线以周一 00:00 为起点
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        以时间为索引、按时间升序、列名为小写OHLCV的数据
+    timeframe : str
+        目标周期，如 4h、1d、1w
+
+    Returns:
+    --------
+    pd.DataFrame
+        以每根K线开盘时间为索引的重采样结果，最后一根可能是未走完的K线
+    """
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise TypeError("重采样需要以时间为索引的数据")
+    if not df.index.is_monotonic_increasing:
+        raise ValueError("数据未按时间升序排列")
+
+    width, offset = parse_timeframe(timeframe)
+    if len(df) > 1:
+        base = infer_timeframe(df.index)
+        if parse_timeframe(base)[0] > width:
+            raise ValueError(f"目标周期 {timeframe} 比数据周期 {base} 更细")
+    if len(df) == 0:
+        return df[['open', 'high', 'low', 'close', 'volume']].iloc[:0]
+
+    ticks, unit_ns = _ticks(df.index)
+    width //= unit_ns
+    offset //= unit_ns
+    bins = (ticks + offset) // width
+    starts = np.flatnonzero(np.diff(bins, prepend=bins[0] - 1))
+    ends = np.append(starts[1:], len(ticks)) - 1
+
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    volume = df['volume'].to_numpy()
+    index = pd.DatetimeIndex((bins[starts] * width - offset).view(f'datetime64[{df.index.unit}]'),
+                             name=df.index.name)
+    return pd.DataFrame({
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(high, starts),
+        'low': np.minimum.reduceat(low, starts),
+        'close': df['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(volume, starts),
+    }, index=index)
+
+
+def infer_timeframe(index: pd.DatetimeIndex) -> str:
+    """
+    由相邻时间间隔的最小值推断数据周期
+
+    Returns:
+    --------
+    str
+        如 1m、1h、1d
+    """
+    ticks, unit_ns = _ticks(index)
+    steps = np.diff(ticks)
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        raise ValueError("数据不足，无法推断周期")
+    step = int(steps.min()) * unit_ns
+    for unit in ('w', 'd', 'h', 'm'):
+        if step % _NS[unit] == 0:
+            return f'{step // _NS[unit]}{unit}'
+    raise ValueError(f"无法识别的数据周期: {pd.Timedelta(step, unit='ns')}")
+
+
+def close_time_index(index: pd.DatetimeIndex, timeframe: str) -> pd.DatetimeIndex:
+    """
+    将K线开盘时间换算为收盘时间（周期结束前1毫秒，与币安 Close time 一致）
+
+    多周期同时回测时，以收盘时间标记K线可保证粗周期的K线在走完之后才被策略看到
+    """
+    width, _ = parse_timeframe(timeframe)
+    return index + pd.Timedelta(width - 10**6, unit='ns')
@@ -0,0 +1,120 @@
+"""
+本地模拟交易所
+按 ccxt 异步接口的约定返回预先生成的K线分页，供下载器在离线环境下验证分页、续传和限速逻辑
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_TIMEFRAME_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+class StubRateLimitExceeded(ConnectionError):
+    """
+    模拟交易所返回的限频错误
+    """
+
+
+class StubExchange:
+    """
+    模拟的 ccxt 异步交易所
+
+    fetch_ohlcv 与 ccxt 一致：返回开盘时间不早于 since 的前 limit 根K线，
+    未指定 since 时返回最近的 limit 根；最后一根可能是尚未走完的K线
+    """
+    id = 'stub'
+
+    def __init__(self,
+                 bars: Dict[Tuple[str, str], np.ndarray],
+                 now: Optional[int] = None,
+                 max_limit: int = 500,
+                 latency: float = 0.0,
+                 fail_every: int = 0):
+        """
+        Parameters:
+        -----------
+        bars : dict
+            (交易对, 周期) 到K线数组的映射，每行为 [开盘时间(毫秒), 开, 高, 低, 收, 量]
+        now : int, optional
+            当前时间（毫秒），默认为最后一根K线的开盘时间加一毫秒，即最后一根尚未走完
+        max_limit : int
+            单次请求最多返回的K线数
+        latency : float
+            每次请求的模拟延迟（秒）
+        fail_every : int
+            每隔多少次请求抛出一次限频错误，0 表示不出错
+        """
+        self.bars = {key: np.asarray(value, dtype=np.float64) for key, value in bars.items()}
+        if now is None:
+            now = int(max(value[-1, 0] for value in self.bars.values())) + 1
+        self.now = now
+        self.max_limit = max_limit
+        self.latency = latency
+        self.fail_every = fail_every
+        self.rateLimit = 0
+        self.calls: List[Tuple[str, str, Optional[int], int]] = []
+
+    @staticmethod
+    def make_bars(start: int, count: int, timeframe: str, seed: int = 0) -> np.ndarray:
+        """
+        生成随机游走K线
+
+        Parameters:
+        -----------
+        start : int
+            第一根K线的开盘时间（毫秒）
+        count : int
+            K线数量
+        timeframe : str
+            周期，如 1m、1h、1d
+
+        Returns:
+        --------
+        np.ndarray
+            (count, 6) 的K线数组
+        """
+        rng = np.random.default_rng(seed)
+        step = StubExchange.parse_timeframe(timeframe) * 1000
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+        open_ = np.concatenate([[100.0], close[:-1]])
+        spread = np.abs(rng.normal(0, 0.005, count)) * close
+        return np.column_stack([
+            start + np.arange(count, dtype=np.float64) * step,
+            open_,
+            np.maximum(open_, close) + spread,
+            np.minimum(open_, close) - spread,
+            close,
+            rng.uniform(1, 100, count),
+        ])
+
+    @staticmethod
+    def parse_timeframe(timeframe: str) -> int:
+        """周期秒数，与 ccxt 的同名方法一致"""
+        return int(timeframe[:-1]) * _TIMEFRAME_MS[timeframe[-1]] // 1000
+
+    def milliseconds(self) -> int:
+        return self.now
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: Optional[int] = None,
+                          limit: Optional[int] = None, params: Optional[Dict] = None) -> List[List[float]]:
+        self.calls.append((symbol, timeframe, since, limit))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_every and len(self.calls) % self.fail_every == 0:
+            raise StubRateLimitExceeded(f'{self.id} 429 Too Many Requests')
+
+        bars = self.bars[(symbol, timeframe)]
+        # 只提供当前时间之前已开盘的K线
+        bars = bars[:np.searchsorted(bars[:, 0], self.now, side='left')]
+        limit = min(limit or self.max_limit, self.max_limit)
+        if since is None:
+            page = bars[-limit:]
+        else:
+            start = np.searchsorted(bars[:, 0], since, side='left')
+            page = bars[start:start + limit]
+        return page.tolist()
+
+    async def close(self):
+        pass
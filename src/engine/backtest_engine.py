@@ -1,5 +1,17 @@
+import time
 import backtrader as bt
-from typing import Type, Union, Dict, Any
+import pandas as pd
+from typing import Type, Union, Dict, Any, Iterable, Optional, List
+from engine.vectorized_engine import VectorizedBacktestEngine, VectorizedResult
+from engine.portfolio_engine import PortfolioBacktestEngine, PortfolioResult, signals_to_weights
+from engine import optimizer
+from engine.profiling import RunProfiler
+from engine.walk_forward import walk_forward, WalkForwardResult
+from analysis.equity_recorder import EquityRecorder
+from data.data_loader import DataLoader
+from data.market_panel import MarketPanel
+from data.market_store import MarketStore
+from data.indicator_feed import strategy_feed
 
 class BacktestEngine:
     """
@@ -7,7 +19,8 @@ class BacktestEngine:
     """
     def __init__(self, 
                  initial_cash: float = 1000000.0,
-                 commission: float = 0.001):
+                 commission: float = 0.001,
+                 analyzers: bool = True):
         """
         初始化回测引擎
         
@@ -17,16 +30,32 @@ class BacktestEngine:
             初始资金
         commission : float
             交易手续费率
+        analyzers : bool
+            是否挂载 backtrader 的统计分析器；为False时回测中不逐bar统计，
+            BacktestAnalyzer 由资金曲线和交易记录向量化计算指标
         """
+        self.initial_cash = initial_cash
+        self.commission = commission
+        
         self.cerebro = bt.Cerebro()
         self.cerebro.broker.setcash(initial_cash)
         self.cerebro.broker.setcommission(commission=commission)
         
-        # 添加分析器
-        self.cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-        self.cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-        self.cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-        self.cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
+        # 添加分析器；资金曲线记录器开销很小，总是挂载
+        self.cerebro.addanalyzer(EquityRecorder, _name='equity')
+        if analyzers:
+            self.cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
+            self.cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
+            self.cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+            self.cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
+        
+        # 加入 cerebro 之前的准备耗时（秒），剖析模式下写入报告
+        self.setup_timings = {}
+        # 最近一次剖析模式运行的报告
+        self.profile_report = None
+        
+    def _record_setup(self, name: str, start: float):
+        self.setup_timings[name] = self.setup_timings.get(name, 0.0) + time.perf_counter() - start
         
     def add_data(self, data):
         """
@@ -38,7 +67,77 @@ class BacktestEngine:
             backtrader数据源对象
         """
         self.cerebro.adddata(data)
+
+    def add_store_data(self,
+                       symbol: str,
+                       timeframe: str,
+                       start: Optional[str] = None,
+                       end: Optional[str] = None,
+                       store: Optional[MarketStore] = None):
+        """
+        从本地行情仓库添加数据源，只映射所需区间，不拷贝数据
+
+        Parameters:
+        -----------
+        symbol : str
+            交易对，如 BTCUSDT
+        timeframe : str
+            周期，如 1m、1d
+        start : str, optional
+            开始时间（含）
+        end : str, optional
+            结束时间（含）
+        store : MarketStore, optional
+            行情仓库，默认为数据目录下的仓库
+
+        Returns:
+        --------
+        bt.feeds.PandasData
+            已添加的数据源
+        """
+        t0 = time.perf_counter()
+        data = DataLoader(use_cache=False, store=store).load_store_data(symbol, timeframe, start, end)
+        self._record_setup('data_load', t0)
+        self.cerebro.adddata(data)
+        return data
+
+    def add_indicator_data(self,
+                           data: Union[str, pd.DataFrame, bt.feeds.PandasData],
+                           strategy_class: Type[bt.Strategy],
+                           strategy_params: Dict[str, Any] = None):
+        """
+        添加带预计算指标线的数据源，并以 use_feed_indicators=True 添加策略
+        
+        指标在回测前一次性向量化计算，cerebro 运行时策略不再逐bar计算指标
         
+        Parameters:
+        -----------
+        data : str, pd.DataFrame or bt.feeds.PandasData
+            数据文件路径或数据
+        strategy_class : Type[bt.Strategy]
+            实现了 feed_indicators 的策略类
+        strategy_params : Dict[str, Any], optional
+            策略参数字典
+            
+        Returns:
+        --------
+        IndicatorPandasData
+            已添加的数据源
+        """
+        if isinstance(data, str):
+            t0 = time.perf_counter()
+            data = DataLoader().load_bars(data).to_frame()
+            self._record_setup('data_load', t0)
+        elif isinstance(data, bt.feeds.PandasData):
+            data = data.p.dataname
+            
+        t0 = time.perf_counter()
+        feed = strategy_feed(data, strategy_class, strategy_params)
+        self._record_setup('indicator_precompute', t0)
+        self.cerebro.adddata(feed)
+        self.add_strategy(strategy_class, dict(strategy_params or {}, use_feed_indicators=True))
+        return feed
+
     def add_strategy(self, strategy_class: Type[bt.Strategy], 
                     strategy_params: Dict[str, Any] = None):
         """
@@ -56,17 +155,210 @@ class BacktestEngine:
         else:
             self.cerebro.addstrategy(strategy_class)
             
-    def run(self):
+    def run(self,
+            profile: bool = False,
+            profiler: Optional[str] = None,
+            report_path: Optional[str] = None):
         """
         运行回测
         
+        Parameters:
+        -----------
+        profile : bool
+            是否统计各阶段耗时（数据加载、指标预热、next()延迟分布、下单与通知、撮合、分析器），
+            报告保存在 self.profile_report
+        profiler : str, optional
+            同时运行的函数级剖析器：'cprofile' 或 'pyinstrument'，指定时自动开启 profile
+        report_path : str, optional
+            JSON报告的保存路径，指定时自动开启 profile
+        
         Returns:
         --------
         tuple
             (回测引擎实例, 回测结果)
         """
         print('初始资金: %.2f' % self.cerebro.broker.getvalue())
-        results = self.cerebro.run()
+        if profile or profiler or report_path:
+            run_profiler = RunProfiler(profiler, setup=self.setup_timings)
+            results = run_profiler.run(self.cerebro)
+            self.profile_report = run_profiler.report()
+            run_profiler.print_summary()
+            if report_path:
+                print(f"剖析报告已保存: {run_profiler.save(report_path)}")
+        else:
+            results = self.cerebro.run()
         print('最终资金: %.2f' % self.cerebro.broker.getvalue())
         
-        return self.cerebro, results 
\ No newline at end of file
+        return self.cerebro, results 
+        
+    def run_vectorized(self,
+                       data: Union[pd.DataFrame, bt.feeds.PandasData],
+                       strategy_class: Type[bt.Strategy],
+                       strategy_params: Dict[str, Any] = None) -> VectorizedResult:
+        """
+        以向量化模式运行回测，不经过 cerebro
+        
+        策略需实现 vectorized_signals 类方法，资金和手续费沿用本引擎的设置
+        
+        Parameters:
+        -----------
+        data : pd.DataFrame or bt.feeds.PandasData
+            OHLCV数据，也可直接传入 DataLoader.load_data 返回的数据源
+        strategy_class : Type[bt.Strategy]
+            策略类
+        strategy_params : Dict[str, Any], optional
+            策略参数字典
+            
+        Returns:
+        --------
+        VectorizedResult
+            向量化回测结果
+        """
+        if not hasattr(strategy_class, 'vectorized_signals'):
+            raise TypeError(f"{strategy_class.__name__} 不支持向量化回测")
+            
+        if isinstance(data, bt.feeds.PandasData):
+            data = data.p.dataname
+            
+        signals = strategy_class.vectorized_signals(data, **(strategy_params or {}))
+        engine = VectorizedBacktestEngine(self.initial_cash, self.commission)
+        return engine.run(data, **signals)
+        
+    def run_portfolio(self,
+                      data: Union[MarketPanel, List[str], Dict[str, str]],
+                      strategy_class: Type[bt.Strategy],
+                      strategy_params: Dict[str, Any] = None,
+                      allocation: float = 0.95,
+                      join: str = 'outer') -> PortfolioResult:
+        """
+        多标的组合回测，所有标的共享本引擎的资金
+        
+        各标的分别由策略的 vectorized_signals 生成信号，按等权份额持仓
+        
+        Parameters:
+        -----------
+        data : MarketPanel, list or dict
+            已对齐的行情面板，或数据文件路径列表/标的名称到路径的映射
+        strategy_class : Type[bt.Strategy]
+            策略类
+        strategy_params : Dict[str, Any], optional
+            策略参数字典，对所有标的相同
+        allocation : float
+            总仓位比例，每个标的的份额为 allocation / 标的数
+        join : str
+            传入路径时的时间对齐方式，'outer' 或 'inner'
+            
+        Returns:
+        --------
+        PortfolioResult
+            组合回测结果
+        """
+        if not hasattr(strategy_class, 'vectorized_signals'):
+            raise TypeError(f"{strategy_class.__name__} 不支持向量化回测")
+            
+        panel = data if isinstance(data, MarketPanel) else DataLoader().load_panel(data, join=join)
+        weights = signals_to_weights(panel, strategy_class, strategy_params, allocation)
+        engine = PortfolioBacktestEngine(self.initial_cash, self.commission)
+        return engine.run(panel, weights)
+        
+    def optimize(self,
+                 strategy_class: Type[bt.Strategy],
+                 param_grid: Dict[str, Iterable],
+                 data: Union[str, pd.DataFrame, bt.feeds.PandasData] = None,
+                 mode: str = 'cerebro',
+                 max_workers: Optional[int] = None,
+                 sort_by: str = 'sharpe_ratio') -> pd.DataFrame:
+        """
+        并行参数网格优化
+        
+        Parameters:
+        -----------
+        strategy_class : Type[bt.Strategy]
+            策略类
+        param_grid : Dict[str, Iterable]
+            参数网格，例如 {'ema1_period': [5, 12], 'ema2_period': [26, 50]}
+        data : str, pd.DataFrame or bt.feeds.PandasData, optional
+            数据文件路径或数据，默认使用已通过 add_data 添加的数据
+        mode : str
+            'cerebro' 逐bar回测，或 'vectorized' 向量化回测
+        max_workers : int, optional
+            工作进程数，默认等于CPU核数
+        sort_by : str
+            排序指标
+            
+        Returns:
+        --------
+        pd.DataFrame
+            按指标排序的参数组合结果
+        """
+        if data is None:
+            if not self.cerebro.datas:
+                raise ValueError("未指定数据，请传入data或先调用add_data")
+            data = self.cerebro.datas[0]
+        if isinstance(data, bt.feeds.PandasData):
+            data = data.p.dataname
+            
+        return optimizer.optimize(strategy_class, param_grid, data,
+                                  initial_cash=self.initial_cash,
+                                  commission=self.commission,
+                                  mode=mode,
+                                  max_workers=max_workers,
+                                  sort_by=sort_by,
+                                  ascending=(sort_by == 'max_drawdown'))
+                                  
+    def walk_forward(self,
+                     strategy_class: Type[bt.Strategy],
+                     param_grid: Dict[str, Iterable],
+                     train_size: int,
+                     test_size: int,
+                     data: Union[str, pd.DataFrame, bt.feeds.PandasData] = None,
+                     step: Optional[int] = None,
+                     anchored: bool = False,
+                     max_workers: Optional[int] = None,
+                     sort_by: str = 'sharpe_ratio') -> WalkForwardResult:
+        """
+        滚动前推优化，在训练窗口上选参、在随后的测试窗口上检验
+        
+        Parameters:
+        -----------
+        strategy_class : Type[bt.Strategy]
+            实现了 vectorized_signals 的策略类
+        param_grid : Dict[str, Iterable]
+            参数网格
+        train_size : int
+            训练窗口长度（bar数）
+        test_size : int
+            测试窗口长度（bar数）
+        data : str, pd.DataFrame or bt.feeds.PandasData, optional
+            数据文件路径或数据，默认使用已通过 add_data 添加的数据
+        step : int, optional
+            窗口前移步长，默认等于 test_size
+        anchored : bool
+            是否固定训练窗口起点
+        max_workers : int, optional
+            工作进程数，默认等于CPU核数
+        sort_by : str
+            选择最优参数所用的指标
+            
+        Returns:
+        --------
+        WalkForwardResult
+            各窗口结果和拼接后的样本外资金曲线
+        """
+        if data is None:
+            if not self.cerebro.datas:
+                raise ValueError("未指定数据，请传入data或先调用add_data")
+            data = self.cerebro.datas[0]
+        if isinstance(data, bt.feeds.PandasData):
+            data = data.p.dataname
+            
+        return walk_forward(strategy_class, param_grid, data,
+                            train_size=train_size,
+                            test_size=test_size,
+                            step=step,
+                            anchored=anchored,
+                            initial_cash=self.initial_cash,
+                            commission=self.commission,
+                            max_workers=max_workers,
+                            sort_by=sort_by,
+                            ascending=(sort_by == 'max_drawdown'))
@@ -0,0 +1,217 @@
+"""
+参数网格优化器
+在多进程中并行运行策略参数组合，每个工作进程只加载一次数据
+"""
+
+import itertools
+import os
+import sys
+import backtrader as bt
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Type, Union, Dict, Any, List, Iterable, Optional
+
+from data.data_loader import DataLoader
+from analysis.metrics import compute_metrics
+from analysis.equity_recorder import EquityRecorder
+from engine.vectorized_engine import VectorizedBacktestEngine
+from strategies.strategy_logging import StrategyLogMixin, WARNING
+
+# 优化结果中的指标列
+METRIC_COLUMNS = ['sharpe_ratio', 'total_return', 'annual_return', 'max_drawdown', 'final_value']
+
+# 工作进程内共享的数据，由 _init_worker 在进程启动时加载一次
+_worker_data = None
+
+
+def _init_worker(data_source: Union[str, pd.DataFrame], quiet: bool = True):
+    """
+    工作进程初始化：加载数据并屏蔽策略日志输出
+
+    Parameters:
+    -----------
+    data_source : str or pd.DataFrame
+        数据文件路径或已加载的DataFrame
+    quiet : bool
+        是否屏蔽标准输出
+    """
+    global _worker_data
+    if isinstance(data_source, str):
+        # 只加载OHLCV五列，减少每个工作进程的内存占用
+        _worker_data = DataLoader().load_bars(data_source).to_frame()
+    else:
+        _worker_data = data_source
+
+    if quiet:
+        # 提高策略日志级别，逐笔日志直接跳过，不再格式化后写入空设备
+        StrategyLogMixin.default_level = WARNING
+        sys.stdout = open(os.devnull, 'w')
+
+
+def _run_cerebro(strategy_class, params, data, initial_cash, commission):
+    """
+    使用 cerebro 运行单组参数
+    """
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.broker.setcash(initial_cash)
+    cerebro.broker.setcommission(commission=commission)
+    cerebro.adddata(bt.feeds.PandasData(
+        dataname=data,
+        datetime=None,
+        open='open',
+        high='high',
+        low='low',
+        close='close',
+        volume='volume',
+        openinterest=-1
+    ))
+    cerebro.addstrategy(strategy_class, **params)
+    cerebro.addanalyzer(EquityRecorder, _name='equity')
+
+    strat = cerebro.run()[0]
+    arrays = strat.analyzers.equity.arrays
+    return compute_metrics(arrays['value'], data.index[:len(arrays['value'])], initial_cash)
+
+
+def _run_vectorized(strategy_class, params, data, initial_cash, commission):
+    """
+    使用向量化引擎运行单组参数
+    """
+    signals = strategy_class.vectorized_signals(data, **params)
+    result = VectorizedBacktestEngine(initial_cash, commission).run(data, **signals)
+    return compute_metrics(result.equity, result.index, initial_cash)
+
+
+def _run_task(task):
+    """
+    工作进程任务入口，任务失败时返回NaN指标而不中断整个优化
+
+    任务可带 (start, stop) 位置窗口，只在该段数据上回测；
+    按位置切片得到的是共享数据的视图，不复制数据
+    """
+    strategy_class, params, initial_cash, commission, mode, window = task
+    runner = _run_vectorized if mode == 'vectorized' else _run_cerebro
+    data = _worker_data if window is None else _worker_data.iloc[window[0]:window[1]]
+    try:
+        metrics = runner(strategy_class, params, data, initial_cash, commission)
+    except Exception as e:
+        sys.stderr.write(f"参数 {params} 回测失败: {str(e)}\n")
+        metrics = {key: float('nan') for key in METRIC_COLUMNS}
+    return {**params, **metrics}
+
+
+def expand_grid(param_grid: Dict[str, Iterable]) -> List[Dict[str, Any]]:
+    """
+    将参数网格展开为参数组合列表
+
+    Parameters:
+    -----------
+    param_grid : Dict[str, Iterable]
+        参数名到候选值列表的映射
+
+    Returns:
+    --------
+    List[Dict[str, Any]]
+        所有参数组合
+    """
+    names = list(param_grid)
+    values = [list(param_grid[name]) for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def run_tasks(tasks: List[tuple], data_source: Union[str, pd.DataFrame],
+              max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    并行执行回测任务，结果顺序与任务顺序一致
+
+    Parameters:
+    -----------
+    tasks : List[tuple]
+        (strategy_class, params, initial_cash, commission, mode, window) 任务列表
+    data_source : str or pd.DataFrame
+        数据文件路径或DataFrame
+    max_workers : int, optional
+        工作进程数，默认等于CPU核数；为1时在当前进程内串行运行
+
+    Returns:
+    --------
+    List[Dict[str, Any]]
+        每个任务的参数和指标
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1:
+        global _worker_data
+        previous = _worker_data
+        stdout = sys.stdout
+        log_level = StrategyLogMixin.default_level
+        _init_worker(data_source, quiet=True)
+        try:
+            return [_run_task(task) for task in tasks]
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            StrategyLogMixin.default_level = log_level
+            _worker_data = previous
+
+    # 按块分发任务以减少进程间通信次数
+    chunksize = max(1, len(tasks) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_init_worker,
+                             initargs=(data_source,)) as executor:
+        return list(executor.map(_run_task, tasks, chunksize=chunksize))
+
+
+def optimize(strategy_class: Type[bt.Strategy],
+             param_grid: Dict[str, Iterable],
+             data_source: Union[str, pd.DataFrame],
+             initial_cash: float = 1000000.0,
+             commission: float = 0.001,
+             mode: str = 'cerebro',
+             max_workers: Optional[int] = None,
+             sort_by: str = 'sharpe_ratio',
+             ascending: bool = False) -> pd.DataFrame:
+    """
+    并行运行参数网格并按指标排序
+
+    Parameters:
+    -----------
+    strategy_class : Type[bt.Strategy]
+        策略类
+    param_grid : Dict[str, Iterable]
+        参数网格，例如 {'ema1_period': [5, 12], 'ema2_period': [26, 50]}
+    data_source : str or pd.DataFrame
+        数据文件路径或DataFrame；路径由各工作进程自行加载，DataFrame每个进程只传输一次
+    initial_cash : float
+        初始资金
+    commission : float
+        交易手续费率
+    mode : str
+        'cerebro' 或 'vectorized'
+    max_workers : int, optional
+        工作进程数，默认等于CPU核数；为1时在当前进程内串行运行
+    sort_by : str
+        排序指标
+    ascending : bool
+        是否升序排列
+
+    Returns:
+    --------
+    pd.DataFrame
+        每组参数一行，包含参数列和 sharpe_ratio、total_return、annual_return、
+        max_drawdown、final_value 指标列，按 sort_by 排序
+    """
+    if mode not in ('cerebro', 'vectorized'):
+        raise ValueError(f"不支持的运行模式: {mode}")
+    if mode == 'vectorized' and not hasattr(strategy_class, 'vectorized_signals'):
+        raise TypeError(f"{strategy_class.__name__} 不支持向量化回测")
+
+    combos = expand_grid(param_grid)
+    tasks = [(strategy_class, params, initial_cash, commission, mode, None) for params in combos]
+    rows = run_tasks(tasks, data_source, max_workers)
+
+    results = pd.DataFrame(rows, columns=list(param_grid) + METRIC_COLUMNS)
+    results.sort_values(sort_by, ascending=ascending, inplace=True, na_position='last')
+    results.reset_index(drop=True, inplace=True)
+    results.index.name = 'rank'
+    return results
@@ -0,0 +1,259 @@
+"""
+组合回测引擎
+多个标的共享同一账户现金，输入为对齐后的行情面板和目标权重矩阵，
+成交规则与单标的向量化引擎一致：信号bar收盘决策，下一根bar开盘成交
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+from data.market_panel import MarketPanel
+
+
+class PortfolioResult:
+    """
+    组合回测结果
+    """
+    def __init__(self, index, symbols, equity, cash, positions, orders, initial_cash):
+        """
+        Parameters:
+        -----------
+        index : pd.Index
+            bar时间索引
+        symbols : list
+            标的名称
+        equity : np.ndarray
+            每根bar收盘后的账户总值
+        cash : np.ndarray
+            每根bar收盘后的现金
+        positions : np.ndarray
+            (bar数, 标的数) 的持仓数量
+        orders : pd.DataFrame
+            成交记录
+        initial_cash : float
+            初始资金
+        """
+        self.index = index
+        self.symbols = symbols
+        self.equity = equity
+        self.cash = cash
+        self.positions = positions
+        self.orders = orders
+        self.initial_cash = initial_cash
+
+    @property
+    def final_value(self) -> float:
+        """最终账户总值"""
+        return float(self.equity[-1]) if len(self.equity) else self.initial_cash
+
+    @property
+    def total_commission(self) -> float:
+        """累计手续费"""
+        return float(self.orders['commission'].sum())
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        以DataFrame形式返回逐bar的资金曲线
+
+        Returns:
+        --------
+        pd.DataFrame
+            包含 value、cash 两列
+        """
+        return pd.DataFrame({'value': self.equity, 'cash': self.cash}, index=self.index)
+
+    def holdings(self) -> pd.DataFrame:
+        """
+        逐bar的各标的持仓数量
+
+        Returns:
+        --------
+        pd.DataFrame
+            以标的名称为列
+        """
+        return pd.DataFrame(self.positions, index=self.index, columns=self.symbols)
+
+
+class PortfolioBacktestEngine:
+    """
+    组合回测引擎
+    只在目标权重发生变化的bar上调仓，Python循环次数为调仓次数，
+    每次调仓对所有标的做数组运算，适合数百个标的的组合
+    """
+    def __init__(self,
+                 initial_cash: float = 1000000.0,
+                 commission: float = 0.001):
+        """
+        初始化回测引擎
+
+        Parameters:
+        -----------
+        initial_cash : float
+            初始资金
+        commission : float
+            交易手续费率
+        """
+        self.initial_cash = initial_cash
+        self.commission = commission
+
+    @staticmethod
+    def _hold_weights(weights: np.ndarray, tradable: np.ndarray) -> np.ndarray:
+        """
+        没有行情的bar无法下单，沿用上一根bar的目标权重
+        """
+        weights = np.where(tradable, np.nan_to_num(weights), np.nan)
+        n = len(weights)
+        last = np.where(~np.isnan(weights), np.arange(n)[:, None], 0)
+        np.maximum.accumulate(last, axis=0, out=last)
+        held = weights[last, np.arange(weights.shape[1])]
+        return np.nan_to_num(held, nan=0.0)
+
+    @staticmethod
+    def _defer_orders(change: np.ndarray, open_: np.ndarray) -> np.ndarray:
+        """
+        下一根bar没有开盘价时订单无法成交，顺延到下一根有开盘价的bar之前再按当时的目标权重下单
+        """
+        n = len(open_)
+        # fill_bar[t] 为第 t 根bar之后第一根有开盘价的bar，没有时为 n
+        nxt = np.where(~np.isnan(open_), np.arange(n)[:, None], n)
+        nxt = np.minimum.accumulate(nxt[::-1], axis=0)[::-1]
+        fill_bar = np.full(open_.shape, n)
+        fill_bar[:-1] = nxt[1:]
+
+        rows, cols = np.nonzero(change)
+        fill = fill_bar[rows, cols]
+        # 之后再没有开盘价（含最后一根bar上发出）的订单不会成交
+        ok = fill < n
+        deferred = np.zeros(change.shape, dtype=bool)
+        deferred[fill[ok] - 1, cols[ok]] = True
+        return deferred
+
+    def run(self, panel: MarketPanel, weights: np.ndarray) -> PortfolioResult:
+        """
+        运行组合回测
+
+        Parameters:
+        -----------
+        panel : MarketPanel
+            对齐后的多标的行情
+        weights : np.ndarray
+            (bar数, 标的数) 的目标权重，即该标的市值占账户总值的比例；
+            第 t 根bar的权重在该bar收盘时决策，于第 t+1 根bar开盘按目标调仓，
+            权重不变的bar不交易；第 t+1 根bar没有开盘价时订单顺延，
+            在下一根有开盘价的bar按届时的目标权重成交
+
+        Returns:
+        --------
+        PortfolioResult
+            回测结果
+        """
+        n, m = panel.shape
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != (n, m):
+            raise ValueError(f"权重矩阵形状 {weights.shape} 与行情面板 {(n, m)} 不一致")
+
+        weights = self._hold_weights(weights, panel.tradable)
+        change = np.diff(weights, axis=0, prepend=np.zeros((1, m))) != 0
+        change = self._defer_orders(change, panel.open)
+        event_bars = np.flatnonzero(change.any(axis=1))
+
+        comm = self.commission
+        marks = panel.mark_prices()
+        cash = float(self.initial_cash)
+        pos = np.zeros(m)
+        # 第0行为初始状态，第k+1行为第k次调仓后的状态
+        pos_hist = np.zeros((len(event_bars) + 1, m))
+        cash_hist = np.full(len(event_bars) + 1, cash)
+        orders = []
+
+        for k, t in enumerate(event_bars):
+            value = cash + pos @ marks[t]
+            cols = np.flatnonzero(change[t])
+            # 顺延的订单下单时该bar可能停牌，按最近收盘价计算目标数量
+            signal_close = marks[t, cols]
+            fill_price = panel.open[t + 1, cols]
+
+            delta = value * weights[t, cols] / signal_close - pos[cols]
+            sell = delta < 0
+            cash -= delta[sell] @ fill_price[sell] * (1.0 - comm)
+
+            # 先卖后买，现金不足时按比例缩减所有买单
+            buy = ~sell
+            cost = delta[buy] @ fill_price[buy] * (1.0 + comm)
+            if cost > cash:
+                delta[buy] *= max(cash, 0.0) / cost
+                cost = delta[buy] @ fill_price[buy] * (1.0 + comm)
+            cash -= cost
+
+            pos[cols] += delta
+            pos_hist[k + 1] = pos
+            cash_hist[k + 1] = cash
+            traded = delta != 0
+            orders.append((np.full(traded.sum(), t + 1), cols[traded],
+                           delta[traded], fill_price[traded]))
+
+        # 调仓之间持仓和现金不变，按成交bar一次性展开为逐bar数组
+        seg = np.searchsorted(event_bars + 1, np.arange(n), side='right')
+        positions = pos_hist[seg]
+        cash_curve = cash_hist[seg]
+        equity = cash_curve + np.einsum('ij,ij->i', positions, marks)
+
+        return PortfolioResult(panel.index, panel.symbols, equity, cash_curve, positions,
+                               self._build_orders(panel, orders), self.initial_cash)
+
+    def _build_orders(self, panel: MarketPanel, orders) -> pd.DataFrame:
+        """
+        组装成交记录
+        """
+        if orders:
+            bars, cols, size, price = (np.concatenate(parts) for parts in zip(*orders))
+        else:
+            bars = cols = np.empty(0, dtype=np.int64)
+            size = price = np.empty(0)
+        value = np.abs(size) * price
+        return pd.DataFrame({
+            'bar': bars,
+            'time': panel.index[bars],
+            'symbol': np.asarray(panel.symbols, dtype=object)[cols],
+            'size': size,
+            'price': price,
+            'value': value,
+            'commission': value * self.commission,
+        })
+
+
+def signals_to_weights(panel: MarketPanel, strategy_class, strategy_params: Optional[dict] = None,
+                       allocation: float = 0.95) -> np.ndarray:
+    """
+    对每个标的分别运行策略的 vectorized_signals，生成等权目标权重
+
+    每个标的分得 allocation / 标的数 的资金份额，持有信号时满额持有该份额，
+    策略自身的仓位参数不再使用
+
+    Parameters:
+    -----------
+    panel : MarketPanel
+        对齐后的多标的行情
+    strategy_class : Type[bt.Strategy]
+        实现了 vectorized_signals 的策略类
+    strategy_params : dict, optional
+        策略参数
+    allocation : float
+        总仓位比例，预留部分现金支付手续费
+
+    Returns:
+    --------
+    np.ndarray
+        (bar数, 标的数) 的目标权重
+    """
+    n, m = panel.shape
+    weights = np.zeros((n, m))
+    sleeve = allocation / m if m else 0.0
+    for j, symbol in enumerate(panel.symbols):
+        rows = np.flatnonzero(panel.tradable[:, j])
+        if len(rows) == 0:
+            continue
+        signals = strategy_class.vectorized_signals(panel.frame(symbol), **(strategy_params or {}))
+        weights[rows, j] = (np.nan_to_num(signals['positions']) > 0) * sleeve
+    return weights
@@ -0,0 +1,334 @@
+"""
+回测运行剖析
+在不修改策略代码的前提下统计 cerebro.run() 各阶段耗时：数据加载、策略初始化、指标预热、
+逐bar next() 延迟分布、下单与通知、撮合、分析器，结果可导出为JSON，
+并可选用 cProfile 或 pyinstrument 记录函数级调用
+"""
+
+import array
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import backtrader as bt
+import numpy as np
+from backtrader.lineiterator import LineIterator
+
+# next() 延迟直方图的分桶边界（微秒），计数比边界多一个：首桶为小于1微秒，末桶为不小于最后一个边界
+LATENCY_EDGES_US = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000, 50_000, 100_000]
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+class _Timer:
+    """
+    累计耗时和调用次数
+    """
+    __slots__ = ('ns', 'calls')
+
+    def __init__(self):
+        self.ns = 0
+        self.calls = 0
+
+    def wrap(self, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.ns += time.perf_counter_ns() - t0
+                self.calls += 1
+        return timed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'seconds': self.ns / 1e9, 'calls': self.calls}
+
+
+class StrategyProfile:
+    """
+    单个策略类的统计，同一策略类的多个实例累计在一起
+    """
+    # 按阶段计时的策略方法
+    PHASES = {
+        '__init__': 'init',
+        '_once': 'indicators',
+        'prenext': 'prenext',
+        '_notify': 'notify',
+        '_next_analyzers': 'analyzers',
+        '_stop': 'stop',
+        'buy': 'orders',
+        'sell': 'orders',
+        'close': 'orders',
+        'cancel': 'orders',
+    }
+
+    def __init__(self, name: str):
+        self.name = name
+        self.timers = {phase: _Timer() for phase in dict.fromkeys(self.PHASES.values())}
+        # 逐bar模式（runonce=False）下指标在每根bar上计算，单独累计
+        self.timers['indicators_next'] = _Timer()
+        self.latencies = array.array('q')
+
+    def instrument(self, strategy_class: type) -> type:
+        """
+        生成带计时的策略子类，类名与原策略相同
+        """
+        profile = self
+        namespace = {}
+        for method, phase in self.PHASES.items():
+            namespace[method] = profile.timers[phase].wrap(getattr(strategy_class, method))
+
+        latencies = self.latencies
+        next_ = strategy_class.next
+
+        def next(strat):
+            t0 = time.perf_counter_ns()
+            next_(strat)
+            latencies.append(time.perf_counter_ns() - t0)
+
+        start = strategy_class._start
+        indicators_next = self.timers['indicators_next']
+
+        def _start(strat):
+            start(strat)
+            for indicator in strat._lineiterators[LineIterator.IndType]:
+                indicator._next = indicators_next.wrap(indicator._next)
+
+        namespace['next'] = next
+        namespace['_start'] = _start
+        namespace['__module__'] = strategy_class.__module__
+        return type(strategy_class.__name__, (strategy_class,), namespace)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        统计结果
+        """
+        result = {phase: timer.to_dict() for phase, timer in self.timers.items()}
+        lat = np.frombuffer(self.latencies, dtype=np.int64) if len(self.latencies) else np.empty(0, np.int64)
+        result['next'] = latency_summary(lat)
+        return result
+
+
+def latency_summary(latencies_ns: np.ndarray) -> Dict[str, Any]:
+    """
+    延迟分布摘要
+
+    Parameters:
+    -----------
+    latencies_ns : np.ndarray
+        每次调用的耗时（纳秒）
+
+    Returns:
+    --------
+    dict
+        calls、seconds、mean/p50/p90/p99/max（微秒）以及直方图
+    """
+    if len(latencies_ns) == 0:
+        return {'calls': 0, 'seconds': 0.0}
+    us = latencies_ns / 1e3
+    p50, p90, p99 = np.percentile(us, [50, 90, 99])
+    edges = np.asarray(LATENCY_EDGES_US, dtype=np.float64)
+    counts = np.bincount(np.searchsorted(edges, us, side='right'), minlength=len(edges) + 1)
+    return {
+        'calls': int(len(us)),
+        'seconds': float(latencies_ns.sum() / 1e9),
+        'mean_us': float(us.mean()),
+        'p50_us': float(p50),
+        'p90_us': float(p90),
+        'p99_us': float(p99),
+        'max_us': float(us.max()),
+        'histogram': {'edges_us': LATENCY_EDGES_US, 'counts': counts.tolist()},
+    }
+
+
+class RunProfiler:
+    """
+    cerebro.run() 的剖析器
+
+    运行期间临时替换策略类、数据源的 load 和 broker.next，运行结束后恢复；
+    只统计主进程，参数优化（optstrategy 多进程）时子进程中的调用不计入
+    """
+    def __init__(self,
+                 profiler: Optional[str] = None,
+                 setup: Optional[Dict[str, float]] = None,
+                 top: int = 30):
+        """
+        Parameters:
+        -----------
+        profiler : str, optional
+            同时运行的函数级剖析器：'cprofile' 或 'pyinstrument'（需另行安装）
+        setup : Dict[str, float], optional
+            cerebro 运行前已发生的耗时（秒），如引擎中加载数据、预计算指标的时间
+        top : int
+            报告中列出的函数个数（按累计耗时，仅 cprofile）
+        """
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"不支持的剖析器: {profiler}，可选 {PROFILERS}")
+        self.profiler = profiler
+        self.setup = dict(setup or {})
+        self.top = top
+        self.strategies: Dict[str, StrategyProfile] = {}
+        self.data_load = _Timer()
+        self.broker = _Timer()
+        self.total_ns = 0
+        self._profile = None
+
+    def _strategy_profile(self, strategy_class: type) -> StrategyProfile:
+        name = strategy_class.__name__
+        if name not in self.strategies:
+            self.strategies[name] = StrategyProfile(name)
+        return self.strategies[name]
+
+    def run(self, cerebro: bt.Cerebro, **kwargs) -> List:
+        """
+        带统计地运行回测
+
+        Parameters:
+        -----------
+        cerebro : bt.Cerebro
+            已添加数据、策略的回测引擎
+        **kwargs
+            传给 cerebro.run 的参数
+
+        Returns:
+        --------
+        list
+            cerebro.run 的返回值
+        """
+        strats = [list(entries) for entries in cerebro.strats]
+        cerebro.strats = [[(self._strategy_profile(cls).instrument(cls), args, skwargs)
+                           for cls, args, skwargs in entries] for entries in strats]
+        for data in cerebro.datas:
+            data.load = self.data_load.wrap(data.load)
+        broker = cerebro.broker
+        broker.next = self.broker.wrap(broker.next)
+
+        t0 = time.perf_counter_ns()
+        try:
+            if self.profiler is None:
+                return cerebro.run(**kwargs)
+            return self._run_profiled(cerebro, **kwargs)
+        finally:
+            self.total_ns = time.perf_counter_ns() - t0
+            cerebro.strats = strats
+            for data in cerebro.datas:
+                del data.load
+            del broker.next
+
+    def _run_profiled(self, cerebro: bt.Cerebro, **kwargs) -> List:
+        if self.profiler == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            try:
+                return cerebro.run(**kwargs)
+            finally:
+                self._profile.disable()
+
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError("使用 pyinstrument 剖析需先安装: pip install pyinstrument") from e
+        self._profile = Profiler()
+        self._profile.start()
+        try:
+            return cerebro.run(**kwargs)
+        finally:
+            self._profile.stop()
+
+    def _top_functions(self) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        return [{
+            'function': f'{os.path.basename(filename)}:{line}({func})',
+            'calls': nc,
+            'tottime': tt,
+            'cumtime': ct,
+        } for (filename, line, func), (cc, nc, tt, ct, callers) in rows]
+
+    def report(self) -> Dict[str, Any]:
+        """
+        结构化的统计报告
+
+        Returns:
+        --------
+        dict
+            total_seconds、setup、data_load、broker、strategies（各策略分阶段耗时和next延迟分布）、
+            unaccounted_seconds（框架自身开销，如时钟推进、观察器），使用剖析器时另有 profiler
+        """
+        strategies = {name: profile.report() for name, profile in self.strategies.items()}
+        accounted = self.data_load.ns / 1e9 + self.broker.ns / 1e9
+        for result in strategies.values():
+            # 下单发生在 next() 之内，不重复计入
+            accounted += sum(result[phase]['seconds'] for phase in result if phase != 'orders')
+
+        report = {
+            'total_seconds': self.total_ns / 1e9,
+            'setup': self.setup,
+            'data_load': self.data_load.to_dict(),
+            'broker': self.broker.to_dict(),
+            'strategies': strategies,
+            'unaccounted_seconds': self.total_ns / 1e9 - accounted,
+        }
+        if self.profiler == 'cprofile' and self._profile is not None:
+            report['profiler'] = {'type': 'cprofile', 'top': self._top_functions()}
+        elif self.profiler == 'pyinstrument' and self._profile is not None:
+            report['profiler'] = {'type': 'pyinstrument'}
+        return report
+
+    def save(self, path: str) -> str:
+        """
+        保存JSON报告；使用剖析器时在同目录另存 .prof（cprofile）或 .html（pyinstrument）
+
+        Parameters:
+        -----------
+        path : str
+            JSON报告路径
+
+        Returns:
+        --------
+        str
+            报告路径
+        """
+        report = self.report()
+        base = os.path.splitext(path)[0]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if self.profiler == 'cprofile' and self._profile is not None:
+            report['profiler']['output'] = base + '.prof'
+            self._profile.dump_stats(report['profiler']['output'])
+        elif self.profiler == 'pyinstrument' and self._profile is not None:
+            report['profiler']['output'] = base + '.html'
+            with open(report['profiler']['output'], 'w', encoding='utf-8') as f:
+                f.write(self._profile.output_html())
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+    def print_summary(self):
+        """
+        打印各阶段耗时
+        """
+        report = self.report()
+        total = report['total_seconds'] or 1e-12
+        print(f"回测耗时 {report['total_seconds']:.3f} 秒")
+        for name, seconds in report['setup'].items():
+            print(f"  准备阶段 {name}: {seconds:.3f} 秒")
+        rows = [('数据加载', report['data_load']['seconds']), ('撮合', report['broker']['seconds'])]
+        for name, result in report['strategies'].items():
+            rows += [(f'{name} 初始化', result['init']['seconds']),
+                     (f'{name} 指标', result['indicators']['seconds'] + result['indicators_next']['seconds']),
+                     (f'{name} next', result['next']['seconds']),
+                     (f'{name} 通知', result['notify']['seconds']),
+                     (f'{name} 分析器', result['analyzers']['seconds'])]
+        rows.append(('其他', report['unaccounted_seconds']))
+        for label, seconds in rows:
+            print(f"  {label}: {seconds:.3f} 秒 ({seconds / total:.1%})")
+        for name, result in report['strategies'].items():
+            lat = result['next']
+            if lat['calls']:
+                print(f"  {name} next() 延迟: 均值 {lat['mean_us']:.1f}us, p50 {lat['p50_us']:.1f}us, "
+                      f"p99 {lat['p99_us']:.1f}us, 最大 {lat['max_us']:.1f}us")
@@ -0,0 +1,91 @@
+"""
+回测结果仓库
+每个回测任务一行，追加写入CSV；策略参数以JSON字符串保存，列集合固定，不同策略的结果可以写入同一个文件
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+# 任务信息列
+RUN_COLUMNS = ['run_at', 'name', 'strategy', 'mode', 'data', 'start', 'end', 'params',
+               'initial_cash', 'commission', 'status', 'error', 'seconds', 'report']
+
+# 指标列，与 analysis.metrics.full_metrics 的字段一致
+METRIC_COLUMNS = ['sharpe_ratio', 'sortino_ratio', 'calmar_ratio', 'total_return', 'annual_return',
+                  'max_drawdown', 'max_drawdown_len', 'final_value',
+                  'total_trades', 'won_trades', 'lost_trades', 'win_rate', 'profit_factor',
+                  'expectancy', 'exposure']
+
+COLUMNS = RUN_COLUMNS + METRIC_COLUMNS
+
+
+class ResultsStore:
+    """
+    追加写入的回测结果文件
+    """
+    def __init__(self, path: str):
+        """
+        Parameters:
+        -----------
+        path : str
+            CSV文件路径，不存在时在首次写入时创建并写表头
+        """
+        self.path = path
+
+    def append(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        追加结果
+
+        Parameters:
+        -----------
+        rows : Iterable[Dict[str, Any]]
+            每个任务的结果，params 为字典时转换为JSON，缺少的列留空，多余的键忽略
+
+        Returns:
+        --------
+        int
+            写入的行数
+        """
+        records = []
+        for row in rows:
+            row = dict(row)
+            if isinstance(row.get('params'), dict):
+                row['params'] = json.dumps(row['params'], sort_keys=True, ensure_ascii=False)
+            records.append(row)
+        if not records:
+            return 0
+        df = pd.DataFrame.from_records(records).reindex(columns=COLUMNS)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        df.to_csv(self.path, mode='a', header=not os.path.exists(self.path), index=False)
+        return len(df)
+
+    def read(self, name: Optional[str] = None) -> pd.DataFrame:
+        """
+        读取全部结果
+
+        Parameters:
+        -----------
+        name : str, optional
+            只返回该任务名称的结果
+
+        Returns:
+        --------
+        pd.DataFrame
+            run_at 为 datetime64，params 保持JSON字符串
+        """
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=COLUMNS)
+        df = pd.read_csv(self.path, parse_dates=['run_at'])
+        if name is not None:
+            df = df[df['name'] == name]
+        return df
+
+    @staticmethod
+    def parse_params(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        将结果中的 params 列解析回字典
+        """
+        return [json.loads(text) for text in df['params']]
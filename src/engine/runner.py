@@ -0,0 +1,185 @@
+"""
+按配置批量运行回测
+每个任务按配置加载数据、运行指定引擎并计算指标，任务在多个工作进程中并行执行，
+结果按完成顺序追加到结果仓库，单个任务失败只记录错误，不中断整批任务
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import backtrader as bt
+import pandas as pd
+
+from analysis.backtest_analyzer import BacktestAnalyzer
+from config.config import RunConfig
+from data.data_loader import DataLoader
+from data.market_store import MarketStore
+from engine.backtest_engine import BacktestEngine
+from engine.results_store import ResultsStore, COLUMNS
+from strategies.strategy_logging import StrategyLogMixin, WARNING
+
+# 工作进程内已加载的数据：数据源键 -> DataFrame，同一进程中的任务共用
+_frames: Dict[tuple, pd.DataFrame] = {}
+
+
+def _load_frame(config: RunConfig) -> pd.DataFrame:
+    """
+    加载任务的数据并截取时间范围
+    """
+    data = config.data
+    if 'path' in data:
+        key = ('path', data['path'])
+        if key not in _frames:
+            _frames[key] = DataLoader().load_bars(data['path']).to_frame()
+        return _frames[key].loc[config.start:config.end]
+
+    # 行情仓库按区间映射，不需要缓存
+    store = MarketStore(data['store']) if data.get('store') else None
+    return DataLoader(use_cache=False, store=store).load_store(
+        data['symbol'], data['timeframe'], config.start, config.end)
+
+
+def _feed(df: pd.DataFrame) -> bt.feeds.PandasData:
+    return bt.feeds.PandasData(dataname=df, datetime=None, open='open', high='high', low='low',
+                               close='close', volume='volume', openinterest=-1)
+
+
+def run_config(config: RunConfig) -> Dict[str, Any]:
+    """
+    运行单个回测任务
+
+    Parameters:
+    -----------
+    config : RunConfig
+        回测任务
+
+    Returns:
+    --------
+    Dict[str, Any]
+        任务信息和指标，字段见 engine.results_store.COLUMNS；失败时 status 为 'error'，指标为空
+    """
+    row = {
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'name': config.name,
+        'strategy': config.strategy,
+        'mode': config.mode,
+        'data': config.data_label,
+        'start': config.start,
+        'end': config.end,
+        'params': config.params,
+        'initial_cash': config.initial_cash,
+        'commission': config.commission,
+        'report': config.report,
+    }
+    t0 = time.perf_counter()
+    try:
+        strategy_class = config.strategy_class()
+        df = _load_frame(config)
+        if len(df) == 0:
+            raise ValueError(f"{config.start} ~ {config.end} 区间内没有数据")
+        engine = BacktestEngine(config.initial_cash, config.commission, analyzers=False)
+
+        if config.mode == 'vectorized':
+            result = engine.run_vectorized(df, strategy_class, config.params)
+            analyzer = BacktestAnalyzer.from_arrays(result.equity, result.index, config.initial_cash)
+        else:
+            if config.mode == 'feed':
+                feed = engine.add_indicator_data(df, strategy_class, config.params)
+            else:
+                feed = _feed(df)
+                engine.add_data(feed)
+                engine.add_strategy(strategy_class, config.params)
+            cerebro, results = engine.run()
+            analyzer = BacktestAnalyzer(cerebro, results, feed)
+
+        row.update(analyzer.vectorized_metrics())
+        if config.report and analyzer.plot_results(config.report) is None:
+            raise RuntimeError(f"报告渲染失败: {config.report}")
+        row['status'] = 'ok'
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = f'{type(e).__name__}: {e}'
+    row['seconds'] = time.perf_counter() - t0
+    return row
+
+
+def _init_worker():
+    """
+    工作进程初始化：提高策略日志级别并屏蔽标准输出
+    """
+    StrategyLogMixin.default_level = WARNING
+    sys.stdout = open(os.devnull, 'w')
+
+
+def _print_row(row: Dict[str, Any]):
+    if row['status'] == 'ok':
+        print(f"[完成] {row['name']}: 收益率 {row['total_return']:.2f}%，夏普 {row['sharpe_ratio']:.3f}，"
+              f"最大回撤 {row['max_drawdown']:.2f}%，耗时 {row['seconds']:.1f} 秒")
+    else:
+        print(f"[失败] {row['name']}: {row['error']}")
+
+
+def run_batch(configs: List[RunConfig],
+              max_workers: Optional[int] = None,
+              store: Optional[ResultsStore] = None,
+              verbose: bool = True) -> pd.DataFrame:
+    """
+    并行运行一批回测任务
+
+    Parameters:
+    -----------
+    configs : List[RunConfig]
+        回测任务
+    max_workers : int, optional
+        工作进程数，默认等于CPU核数；为1时在当前进程内串行运行
+    store : ResultsStore, optional
+        结果仓库，每个任务完成后立即追加，中途退出时已完成的结果不会丢失
+    verbose : bool
+        是否逐个打印任务结果
+
+    Returns:
+    --------
+    pd.DataFrame
+        每个任务一行，顺序与 configs 一致
+    """
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(configs), 1))
+    rows: List[Optional[Dict[str, Any]]] = [None] * len(configs)
+
+    def collect(i: int, row: Dict[str, Any]):
+        rows[i] = row
+        if store is not None:
+            store.append([row])
+        if verbose:
+            _print_row(row)
+
+    if max_workers == 1:
+        stdout = sys.stdout
+        log_level = StrategyLogMixin.default_level
+        StrategyLogMixin.default_level = WARNING
+        devnull = open(os.devnull, 'w')
+        try:
+            for i, config in enumerate(configs):
+                sys.stdout = devnull
+                try:
+                    row = run_config(config)
+                finally:
+                    sys.stdout = stdout
+                collect(i, row)
+        finally:
+            devnull.close()
+            StrategyLogMixin.default_level = log_level
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+            futures = {executor.submit(run_config, config): i for i, config in enumerate(configs)}
+            for future in as_completed(futures):
+                collect(futures[future], future.result())
+
+    df = pd.DataFrame.from_records(rows)
+    if verbose:
+        failed = int((df['status'] != 'ok').sum()) if len(df) else 0
+        print(f"共 {len(df)} 个任务，失败 {failed} 个")
+    return df.reindex(columns=COLUMNS + [column for column in df.columns if column not in COLUMNS])
@@ -0,0 +1,251 @@
+"""
+向量化回测引擎
+以OHLCV数组和目标持仓数组为输入，一次性计算成交、手续费、资金曲线和交易列表
+成交规则与 bt.Cerebro 默认经纪商一致：信号bar收盘下市价单，下一根bar开盘价成交
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Optional, Union, Dict
+
+
+class VectorizedResult:
+    """
+    向量化回测结果
+    """
+    def __init__(self, index, equity, cash, position, trades, initial_cash):
+        """
+        Parameters:
+        -----------
+        index : pd.Index
+            bar时间索引
+        equity : np.ndarray
+            每根bar收盘后的账户总值
+        cash : np.ndarray
+            每根bar收盘后的现金
+        position : np.ndarray
+            每根bar收盘后的持仓数量
+        trades : pd.DataFrame
+            交易列表
+        initial_cash : float
+            初始资金
+        """
+        self.index = index
+        self.equity = equity
+        self.cash = cash
+        self.position = position
+        self.trades = trades
+        self.initial_cash = initial_cash
+
+    @property
+    def final_value(self) -> float:
+        """最终账户总值"""
+        return float(self.equity[-1]) if len(self.equity) else self.initial_cash
+
+    @property
+    def total_commission(self) -> float:
+        """累计手续费"""
+        return float(self.trades['commission'].sum())
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        以DataFrame形式返回逐bar的资金曲线
+
+        Returns:
+        --------
+        pd.DataFrame
+            包含 value、cash、position 三列
+        """
+        return pd.DataFrame({
+            'value': self.equity,
+            'cash': self.cash,
+            'position': self.position,
+        }, index=self.index)
+
+
+class VectorizedBacktestEngine:
+    """
+    向量化回测引擎
+    仅支持多头/空仓两种状态的信号驱动策略
+    """
+    def __init__(self,
+                 initial_cash: float = 1000000.0,
+                 commission: float = 0.001):
+        """
+        初始化回测引擎
+
+        Parameters:
+        -----------
+        initial_cash : float
+            初始资金
+        commission : float
+            交易手续费率，与 broker.setcommission(commission=...) 含义相同
+        """
+        self.initial_cash = initial_cash
+        self.commission = commission
+
+    @staticmethod
+    def _as_arrays(data: Union[pd.DataFrame, Dict[str, np.ndarray]]):
+        """
+        提取开盘价、收盘价数组和时间索引
+        """
+        if isinstance(data, pd.DataFrame):
+            index = data.index
+            open_ = data['open'].to_numpy(dtype=np.float64)
+            close = data['close'].to_numpy(dtype=np.float64)
+        else:
+            open_ = np.asarray(data['open'], dtype=np.float64)
+            close = np.asarray(data['close'], dtype=np.float64)
+            index = pd.RangeIndex(len(close))
+        return index, open_, close
+
+    @staticmethod
+    def _signal_bars(positions: np.ndarray):
+        """
+        由目标持仓数组得到开仓、平仓信号所在的bar
+
+        最后一根bar上发出的订单不会成交，因此忽略该bar的变化
+        """
+        target = np.nan_to_num(np.asarray(positions, dtype=np.float64)) > 0
+        n = len(target)
+        change = np.diff(target.astype(np.int8), prepend=0)
+        if n:
+            change[-1] = 0
+        entries = np.flatnonzero(change > 0)
+        exits = np.flatnonzero(change < 0)
+        return entries, exits
+
+    def run(self,
+            data: Union[pd.DataFrame, Dict[str, np.ndarray]],
+            positions: np.ndarray,
+            size_pct: Optional[float] = None,
+            size_fixed: Optional[float] = None) -> VectorizedResult:
+        """
+        运行向量化回测
+
+        Parameters:
+        -----------
+        data : pd.DataFrame or dict
+            至少包含 open、close 列的行情数据
+        positions : np.ndarray
+            目标持仓数组，>0 表示持有多头，其余表示空仓；
+            第 t 根bar的值在该bar收盘时决策，于第 t+1 根bar开盘成交
+        size_pct : float, optional
+            开仓数量 = 当前现金 * size_pct / 信号bar收盘价
+        size_fixed : float, optional
+            固定开仓数量，与 size_pct 二选一，均未指定时为1（backtrader默认）
+
+        Returns:
+        --------
+        VectorizedResult
+            回测结果
+        """
+        index, open_, close = self._as_arrays(data)
+        n = len(close)
+        if len(positions) != n:
+            raise ValueError(f"持仓数组长度 {len(positions)} 与数据长度 {n} 不一致")
+        if size_pct is None and size_fixed is None:
+            size_fixed = 1.0
+
+        entries, exits = self._signal_bars(positions)
+        comm = self.commission
+
+        # 成交发生在信号的下一根bar开盘
+        entry_fill = entries + 1
+        exit_fill = exits + 1
+        entry_price = open_[entry_fill]
+        exit_price = open_[exit_fill]
+        n_closed = len(exits)
+
+        if size_pct is not None:
+            # 提交订单时按信号bar收盘价做资金检查，比例仓位下结果与资金无关
+            if size_pct * (1.0 + comm) > 1.0:
+                entries = entries[:0]
+                entry_fill, entry_price = entry_fill[:0], entry_price[:0]
+                exits, exit_fill, exit_price = exits[:0], exit_fill[:0], exit_price[:0]
+                n_closed = 0
+
+            # 每笔交易结束后现金按固定倍数变化，可用累乘一次得到
+            k = size_pct / close[entries]
+            growth = (1.0 - k[:n_closed] * entry_price[:n_closed] * (1.0 + comm)
+                      + k[:n_closed] * exit_price * (1.0 - comm))
+            cash_before = self.initial_cash * np.concatenate(([1.0], np.cumprod(growth)))[:len(entries)]
+            size = cash_before * k
+        else:
+            size = np.full(len(entries), float(size_fixed))
+            pnl = size[:n_closed] * (exit_price * (1.0 - comm) - entry_price[:n_closed] * (1.0 + comm))
+            cash_before = self.initial_cash + np.concatenate(([0.0], np.cumsum(pnl)))[:len(entries)]
+            rejected = size * close[entries] * (1.0 + comm) > cash_before
+            if rejected.any():
+                keep = self._replay_fixed(size, close[entries], entry_price, exit_price, n_closed)
+                entries, entry_fill, entry_price, size = (
+                    entries[keep], entry_fill[keep], entry_price[keep], size[keep])
+                keep_closed = keep[:n_closed]
+                exits, exit_fill, exit_price = exits[keep_closed], exit_fill[keep_closed], exit_price[keep_closed]
+                n_closed = len(exits)
+
+        # 逐bar的持仓与现金变化
+        pos_delta = np.zeros(n + 1)
+        cash_delta = np.zeros(n + 1)
+        entry_comm = size * entry_price * comm
+        exit_comm = size[:n_closed] * exit_price * comm
+        np.add.at(pos_delta, entry_fill, size)
+        np.add.at(pos_delta, exit_fill, -size[:n_closed])
+        np.add.at(cash_delta, entry_fill, -(size * entry_price + entry_comm))
+        np.add.at(cash_delta, exit_fill, size[:n_closed] * exit_price - exit_comm)
+
+        position = np.cumsum(pos_delta[:n])
+        cash = self.initial_cash + np.cumsum(cash_delta[:n])
+        equity = cash + position * close
+
+        trades = self._build_trades(index, size, entry_fill, entry_price, entry_comm,
+                                    exit_fill, exit_price, exit_comm)
+
+        return VectorizedResult(index, equity, cash, position, trades, self.initial_cash)
+
+    def _replay_fixed(self, size, signal_close, entry_price, exit_price, n_closed):
+        """
+        固定数量开仓时存在资金不足被拒的订单，逐笔交易重放资金以确定保留哪些交易
+        循环次数为交易笔数而非bar数
+        """
+        comm = self.commission
+        keep = np.zeros(len(size), dtype=bool)
+        cash = self.initial_cash
+        for i in range(len(size)):
+            if size[i] * signal_close[i] * (1.0 + comm) > cash:
+                continue
+            keep[i] = True
+            if i < n_closed:
+                cash += size[i] * (exit_price[i] * (1.0 - comm) - entry_price[i] * (1.0 + comm))
+        return keep
+
+    @staticmethod
+    def _build_trades(index, size, entry_fill, entry_price, entry_comm,
+                      exit_fill, exit_price, exit_comm) -> pd.DataFrame:
+        """
+        组装交易列表，未平仓交易的平仓字段为NaN
+        """
+        n_trades = len(size)
+        n_closed = len(exit_fill)
+        pad = np.full(n_trades - n_closed, np.nan)
+
+        exit_bar = np.concatenate((exit_fill.astype(np.float64), pad))
+        exit_px = np.concatenate((exit_price, pad))
+        exit_cm = np.concatenate((exit_comm, np.zeros(n_trades - n_closed)))
+        pnl = size * (exit_px - entry_price)
+        commission = entry_comm + exit_cm
+
+        trades = pd.DataFrame({
+            'entry_bar': entry_fill,
+            'entry_time': index[entry_fill],
+            'entry_price': entry_price,
+            'exit_bar': exit_bar,
+            'exit_time': pd.Series(index[exit_fill]).reindex(range(n_trades)).to_numpy(),
+            'exit_price': exit_px,
+            'size': size,
+            'commission': commission,
+            'pnl': pnl,
+            'pnlcomm': pnl - commission,
+            'isclosed': np.arange(n_trades) < n_closed,
+        })
+        return trades
@@ -0,0 +1,191 @@
+"""
+滚动前推（walk-forward）优化
+将历史数据划分为连续的训练/测试窗口，在每个训练窗口上并行优化参数，
+用最优参数在随后的测试窗口上回测，并把各测试窗口的资金曲线拼接为样本外资金曲线
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Union, Dict, Iterable, List, Optional, Tuple
+
+from analysis.metrics import compute_metrics
+from data.data_loader import DataLoader
+from engine import optimizer
+from engine.vectorized_engine import VectorizedBacktestEngine
+
+
+def walk_forward_windows(n: int,
+                         train_size: int,
+                         test_size: int,
+                         step: Optional[int] = None,
+                         anchored: bool = False) -> List[Tuple[int, int, int, int]]:
+    """
+    生成训练/测试窗口的位置边界
+
+    Parameters:
+    -----------
+    n : int
+        数据长度（bar数）
+    train_size : int
+        训练窗口长度
+    test_size : int
+        测试窗口长度，最后一个测试窗口可能不足该长度
+    step : int, optional
+        窗口每次前移的bar数，默认等于 test_size；不能小于 test_size，以免测试窗口重叠
+    anchored : bool
+        为True时训练窗口起点固定为0，窗口逐步扩大
+
+    Returns:
+    --------
+    List[Tuple[int, int, int, int]]
+        每个窗口的 (train_start, train_stop, test_start, test_stop)，均为左闭右开
+    """
+    step = step or test_size
+    if train_size <= 0 or test_size <= 0:
+        raise ValueError("训练和测试窗口长度必须为正数")
+    if step < test_size:
+        raise ValueError(f"步长 {step} 小于测试窗口长度 {test_size}，测试窗口会重叠")
+
+    windows = []
+    train_stop = train_size
+    while train_stop < n:
+        train_start = 0 if anchored else train_stop - train_size
+        test_stop = min(train_stop + test_size, n)
+        windows.append((train_start, train_stop, train_stop, test_stop))
+        train_stop += step
+    return windows
+
+
+class WalkForwardResult:
+    """
+    滚动前推优化结果
+    """
+    def __init__(self, folds: pd.DataFrame, equity: pd.Series, metrics: Dict[str, float]):
+        """
+        Parameters:
+        -----------
+        folds : pd.DataFrame
+            每个窗口一行：窗口边界、最优参数、训练集指标和测试集指标
+        equity : pd.Series
+            拼接后的样本外资金曲线
+        metrics : Dict[str, float]
+            样本外资金曲线的整体指标
+        """
+        self.folds = folds
+        self.equity = equity
+        self.metrics = metrics
+
+
+def _run_test_window(data: pd.DataFrame, window, strategy_class, params,
+                     initial_cash: float, commission: float):
+    """
+    在测试窗口上回测
+
+    信号在训练窗口起点到测试窗口终点的数据上计算，使指标有足够的预热期，
+    但只在测试窗口内成交
+    """
+    train_start, _, test_start, test_stop = window
+    history = data.iloc[train_start:test_stop]
+    signals = strategy_class.vectorized_signals(history, **params)
+    offset = test_start - train_start
+    signals['positions'] = np.asarray(signals['positions'])[offset:]
+    engine = VectorizedBacktestEngine(initial_cash, commission)
+    return engine.run(data.iloc[test_start:test_stop], **signals)
+
+
+def walk_forward(strategy_class,
+                 param_grid: Dict[str, Iterable],
+                 data_source: Union[str, pd.DataFrame],
+                 train_size: int,
+                 test_size: int,
+                 step: Optional[int] = None,
+                 anchored: bool = False,
+                 initial_cash: float = 1000000.0,
+                 commission: float = 0.001,
+                 max_workers: Optional[int] = None,
+                 sort_by: str = 'sharpe_ratio',
+                 ascending: bool = False) -> WalkForwardResult:
+    """
+    运行滚动前推优化
+
+    所有窗口的所有参数组合作为一批任务并行执行，各工作进程只加载一次数据，
+    窗口通过位置切片取得，不复制数据。策略需实现 vectorized_signals
+
+    Parameters:
+    -----------
+    strategy_class : Type[bt.Strategy]
+        策略类
+    param_grid : Dict[str, Iterable]
+        参数网格
+    data_source : str or pd.DataFrame
+        数据文件路径或DataFrame
+    train_size : int
+        训练窗口长度（bar数）
+    test_size : int
+        测试窗口长度（bar数）
+    step : int, optional
+        窗口前移步长，默认等于 test_size
+    anchored : bool
+        是否固定训练窗口起点
+    initial_cash : float
+        初始资金，第一个测试窗口以此开始，之后每个窗口接续上一个窗口的期末资金
+    commission : float
+        交易手续费率
+    max_workers : int, optional
+        工作进程数，默认等于CPU核数
+    sort_by : str
+        选择最优参数所用的训练集指标
+    ascending : bool
+        是否以较小的指标值为优
+
+    Returns:
+    --------
+    WalkForwardResult
+        各窗口结果和样本外资金曲线
+    """
+    if not hasattr(strategy_class, 'vectorized_signals'):
+        raise TypeError(f"{strategy_class.__name__} 不支持向量化回测")
+
+    data = data_source if isinstance(data_source, pd.DataFrame) else DataLoader().load_bars(data_source).to_frame()
+    windows = walk_forward_windows(len(data), train_size, test_size, step, anchored)
+    if not windows:
+        raise ValueError(f"数据长度 {len(data)} 不足以划分训练窗口 {train_size}")
+
+    combos = optimizer.expand_grid(param_grid)
+    tasks = [(strategy_class, params, initial_cash, commission, 'vectorized', window[:2])
+             for window in windows for params in combos]
+    rows = optimizer.run_tasks(tasks, data_source, max_workers)
+
+    fold_rows = []
+    curves = []
+    capital = initial_cash
+    for k, window in enumerate(windows):
+        train = pd.DataFrame(rows[k * len(combos):(k + 1) * len(combos)],
+                             columns=list(param_grid) + optimizer.METRIC_COLUMNS)
+        train.sort_values(sort_by, ascending=ascending, inplace=True, na_position='last')
+        best = train.iloc[0]
+        # 行号与参数组合一一对应，直接取原始参数，避免DataFrame中整数被转为浮点
+        params = combos[train.index[0]]
+
+        result = _run_test_window(data, window, strategy_class, params, capital, commission)
+        test = compute_metrics(result.equity, result.index, capital)
+        curves.append(pd.Series(result.equity, index=result.index))
+        # 下一窗口从空仓开始，测试窗口结束时的持仓按最后收盘价平仓并扣除手续费
+        capital = result.final_value - abs(result.equity[-1] - result.cash[-1]) * commission
+
+        fold_rows.append({
+            'fold': k,
+            'train_start': data.index[window[0]],
+            'train_end': data.index[window[1] - 1],
+            'test_start': data.index[window[2]],
+            'test_end': data.index[window[3] - 1],
+            **params,
+            **{f'train_{key}': best[key] for key in optimizer.METRIC_COLUMNS},
+            **{f'test_{key}': value for key, value in test.items()},
+        })
+
+    equity = pd.concat(curves)
+    equity.name = 'value'
+    metrics = compute_metrics(equity.to_numpy(), equity.index, initial_cash)
+    folds = pd.DataFrame(fold_rows).set_index('fold')
+    return WalkForwardResult(folds, equity, metrics)
@@ -10,15 +10,37 @@ sys.path.append(project_root)
 
 from src.strategies.ema_crossover_strategy import EMACrossoverStrategy
 from src.data.data_loader import DataLoader
+from src.data.data_cache import ColumnarCache
 from src.analysis.backtest_analyzer import BacktestAnalyzer
 
-def main():
+def main(data_path=None, plot=True, cache_dir=None):
+    """
+    运行EMA交叉策略回测
+    
+    Parameters:
+    -----------
+    data_path : str, optional
+        数据文件路径，默认使用 DataLoader 的默认数据
+    plot : bool
+        是否绘制回测结果
+    cache_dir : str, optional
+        列式缓存目录，默认为 DataLoader 的缓存目录
+
+    Returns:
+    --------
+    float or None
+        最终资金，回测出错时为 None
+    """
     try:
         # 创建回测引擎
         cerebro = bt.Cerebro()
         
         # 加载数据
         data_loader = DataLoader()
+        if data_path:
+            data_loader.data_path = data_path
+        if cache_dir:
+            data_loader.cache = ColumnarCache(cache_dir)
         data = data_loader.load_data()
         cerebro.adddata(data)
         
@@ -56,7 +78,9 @@ def main():
         print('最终资金: %.2f' % final_cash)
         
         # 绘制结果
-        analyzer.plot_results()
+        if plot:
+            analyzer.plot_results()
+        return final_cash
     except Exception as e:
         print(f"回测过程出错: {str(e)}")
         import traceback
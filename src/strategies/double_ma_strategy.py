@@ -1,30 +1,83 @@
 import backtrader as bt
 import datetime
+import numpy as np
 import pandas as pd
+from utils.indicator_kernels import sma, crossover
+from strategies.strategy_logging import StrategyLogMixin
 
-class DoubleMAStrategy(bt.Strategy):
+class DoubleMAStrategy(StrategyLogMixin, bt.Strategy):
     params = (
         ('fast_period', 20),
         ('slow_period', 50),
+        ('use_feed_indicators', False),  # 直接读取数据源中预计算的指标线，见 feed_indicators
     )
 
     def __init__(self):
-        self.fast_ma = bt.ind.SMA(self.datas[0].close, period=self.params.fast_period)
-        self.slow_ma = bt.ind.SMA(self.datas[0].close, period=self.params.slow_period)
-        self.crossover = bt.ind.CrossOver(self.fast_ma, self.slow_ma)
+        self.warmup = 0
+        if self.params.use_feed_indicators:
+            self.fast_ma = self.datas[0].fast_ma
+            self.slow_ma = self.datas[0].slow_ma
+            self.crossover = self.datas[0].crossover
+            self.warmup = self.datas[0].p.warmup
+        else:
+            self.fast_ma = bt.ind.SMA(self.datas[0].close, period=self.params.fast_period)
+            self.slow_ma = bt.ind.SMA(self.datas[0].close, period=self.params.slow_period)
+            self.crossover = bt.ind.CrossOver(self.fast_ma, self.slow_ma)
 
     def next(self):
+        if len(self) < self.warmup:
+            return
 
         # print(f"当前日期: {self.datas[0].datetime.date(0)}, 收盘价: {self.datas[0].close[0]}")
 
         if not self.position:
             if self.crossover[0] > 0:
-                print(f"BUY SIGNAL! Date: {self.datas[0].datetime.date(0)}, Cash: {self.broker.get_cash()}, Price: {self.datas[0].close[0]}")
+                self.log_signal('BUY')
                 self.buy()
         else:
             if self.crossover[0] < 0:
                 self.sell()
-                print(f"SELL SIGNAL! Date: {self.datas[0].datetime.date(0)}, Cash: {self.broker.get_cash()}, Price: {self.datas[0].close[0]}")
+                self.log_signal('SELL')
+
+    def log_signal(self, side):
+        # 保持原有的输出格式，日志级别关闭时不做格式化
+        if self.log_enabled():
+            print(f"{side} SIGNAL! Date: {self.datas[0].datetime.date(0)}, Cash: {self.broker.get_cash()}, Price: {self.datas[0].close[0]}")
+
+    def notify_order(self, order):
+        if order.status not in [order.Submitted, order.Accepted]:
+            self.record_order(order)
+
+    def notify_trade(self, trade):
+        if trade.isclosed:
+            self.record_trade(trade)
+
+    @classmethod
+    def feed_indicators(cls, **kwargs):
+        """
+        use_feed_indicators=True 时数据源需提供的指标线
+        """
+        p = dict(cls.params._getpairs())
+        p.update(kwargs)
+        return {
+            'fast_ma': ('sma', {'period': p['fast_period']}),
+            'slow_ma': ('sma', {'period': p['slow_period']}),
+            'crossover': ('crossover', {'fast': 'fast_ma', 'slow': 'slow_ma'}),
+        }
+
+    @classmethod
+    def vectorized_signals(cls, df, **kwargs):
+        """
+        生成向量化引擎所需的目标持仓，使用backtrader默认的1单位仓位
+        """
+        p = dict(cls.params._getpairs())
+        p.update(kwargs)
+
+        close = df['close'].to_numpy(dtype=np.float64)
+        cross = crossover(sma(close, p['fast_period']), sma(close, p['slow_period']))
+        events = np.where(cross > 0, 1.0, np.where(cross < 0, 0.0, np.nan))
+        positions = pd.Series(events).ffill().fillna(0.0).to_numpy()
+        return {'positions': positions, 'size_fixed': 1.0}
 
 
 def run_backtest():
@@ -1,6 +1,11 @@
 import backtrader as bt
+import numpy as np
+import pandas as pd
+from utils.indicator_kernels import ema
+from utils.indicator_cache import cached_indicator
+from strategies.strategy_logging import StrategyLogMixin, WARNING
 
-class EMACrossoverStrategy(bt.Strategy):
+class EMACrossoverStrategy(StrategyLogMixin, bt.Strategy):
     """
     EMA交叉策略
     """
@@ -9,6 +14,8 @@ class EMACrossoverStrategy(bt.Strategy):
         ('ema2_period', 26),  # 长期EMA周期
         ('volume_period', 20),  # 成交量均线周期
         ('position_size', 0.95),  # 仓位大小比例
+        ('use_indicator_cache', False),  # 使用指标缓存，参数优化时复用相同的指标结果
+        ('use_feed_indicators', False),  # 直接读取数据源中预计算的指标线，见 feed_indicators
     )
 
     def __init__(self):
@@ -16,15 +23,29 @@ class EMACrossoverStrategy(bt.Strategy):
         初始化策略
         """
         # 计算技术指标
-        self.ema1 = bt.indicators.EMA(self.data.close, period=self.params.ema1_period)
-        self.ema2 = bt.indicators.EMA(self.data.close, period=self.params.ema2_period)
-        
-        # 将成交量均线添加到成交量子图
-        self.volume_ma = bt.indicators.SMA(self.data.volume, period=self.params.volume_period,
-                                         subplot=True)  # 添加subplot=True参数
+        # 数据源带有预计算指标线时不创建任何backtrader指标，预热期内由 next() 自行跳过
+        self.warmup = 0
+        if self.params.use_feed_indicators:
+            self.ema1 = self.data.ema1
+            self.ema2 = self.data.ema2
+            self.volume_ma = self.data.volume_ma
+            self.crossover = self.data.crossover
+            self.warmup = self.data.p.warmup
+        elif self.params.use_indicator_cache:
+            self.ema1 = cached_indicator(self.data, 'ema', period=self.params.ema1_period)
+            self.ema2 = cached_indicator(self.data, 'ema', period=self.params.ema2_period)
+            self.volume_ma = cached_indicator(self.data, 'volume_sma', period=self.params.volume_period)
+        else:
+            self.ema1 = bt.indicators.EMA(self.data.close, period=self.params.ema1_period)
+            self.ema2 = bt.indicators.EMA(self.data.close, period=self.params.ema2_period)
+            
+            # 将成交量均线添加到成交量子图
+            self.volume_ma = bt.indicators.SMA(self.data.volume, period=self.params.volume_period,
+                                             subplot=True)  # 添加subplot=True参数
         
         # 交叉信号
-        self.crossover = bt.indicators.CrossOver(self.ema1, self.ema2)
+        if not self.params.use_feed_indicators:
+            self.crossover = bt.indicators.CrossOver(self.ema1, self.ema2)
         
         # 记录交易状态
         self.order = None
@@ -33,17 +54,14 @@ class EMACrossoverStrategy(bt.Strategy):
         self.buycomm = 0
         self.bar_executed = 0
         
-    def log(self, txt, dt=None):
-        """
-        日志函数
-        """
-        dt = dt or self.data.datetime.date(0)
-        print(f'{dt.isoformat()} {txt}')
-        
     def next(self):
         """
         策略核心逻辑
         """
+        # 指标线尚在预热期
+        if len(self) < self.warmup:
+            return
+            
         # 如果已经有订单，不执行新的交易
         if self.order:
             return
@@ -67,13 +85,13 @@ class EMACrossoverStrategy(bt.Strategy):
         if not position_size and ema12 > ema26 and self.ema1[-1] <= self.ema2[-1]:
             # 计算可买入的数量（考虑手续费和保证金）
             max_size = (available_cash / margin_requirement) / (current_price * (1 + commission_rate))
-            size = max_size * 0.95  # 留5%的缓冲
-            self.log(f'买入信号: 价格: {current_price:.2f}, 数量: {size:.3f}, 可用资金: {available_cash:.2f}')
+            size = max_size * self.params.position_size  # 仓位比例，默认留5%的缓冲
+            self.log('买入信号: 价格: %.2f, 数量: %.3f, 可用资金: %.2f', current_price, size, available_cash)
             self.order = self.buy(size=size)
             
         # 卖出信号：EMA12下穿EMA26
         elif position_size > 0 and ema12 < ema26 and self.ema1[-1] >= self.ema2[-1]:
-            self.log(f'卖出信号: 价格: {current_price:.2f}, 持仓: {position_size:.3f}')
+            self.log('卖出信号: 价格: %.2f, 持仓: %.3f', current_price, position_size)
             self.order = self.sell(size=position_size)  # 卖出全部持仓
         
     def notify_order(self, order):
@@ -84,17 +102,15 @@ class EMACrossoverStrategy(bt.Strategy):
             # 订单已提交或已接受，等待执行
             return
             
+        self.record_order(order)
         # 检查订单是否已完成
         if order.status in [order.Completed]:
             if order.isbuy():
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
-                self.log(
-                    f'买入执行: 价格: {order.executed.price:.2f}, '
-                    f'数量: {order.executed.size:.3f}, '
-                    f'成本: {order.executed.value:.2f}, '
-                    f'手续费: {order.executed.comm:.2f}'
-                )
+                self.log('买入执行: 价格: %.2f, 数量: %.3f, 成本: %.2f, 手续费: %.2f',
+                         order.executed.price, order.executed.size,
+                         order.executed.value, order.executed.comm)
                 self.bar_executed = len(self)
                 
             else:  # 卖出
@@ -102,17 +118,13 @@ class EMACrossoverStrategy(bt.Strategy):
                 profit_gross = order.executed.price * order.executed.size - cost
                 profit_net = profit_gross - order.executed.comm - self.buycomm
                 
-                self.log(
-                    f'卖出执行: 价格: {order.executed.price:.2f}, '
-                    f'数量: {order.executed.size:.3f}, '
-                    f'成本: {cost:.2f}, '
-                    f'手续费: {order.executed.comm:.2f}'
-                )
+                self.log('卖出执行: 价格: %.2f, 数量: %.3f, 成本: %.2f, 手续费: %.2f',
+                         order.executed.price, order.executed.size, cost, order.executed.comm)
                 
-                self.log(f'交易利润: 毛利润 {profit_gross:.2f}, 净利润 {profit_net:.2f}')
+                self.log('交易利润: 毛利润 %.2f, 净利润 %.2f', profit_gross, profit_net)
                 
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
-            self.log(f'订单取消/拒绝/资金不足: {order.status}')
+            self.log('订单取消/拒绝/资金不足: %s', order.status, level=WARNING)
             
         # 重置订单
         self.order = None
@@ -124,4 +136,68 @@ class EMACrossoverStrategy(bt.Strategy):
         if not trade.isclosed:
             return
             
-        self.log(f'交易利润: 毛利润 {trade.pnl:.2f}, 净利润 {trade.pnlcomm:.2f}') 
\ No newline at end of file
+        self.record_trade(trade)
+        self.log('交易利润: 毛利润 %.2f, 净利润 %.2f', trade.pnl, trade.pnlcomm) 
+
+    @classmethod
+    def feed_indicators(cls, **kwargs):
+        """
+        use_feed_indicators=True 时数据源需提供的指标线，供 data.indicator_feed.strategy_feed 使用
+        
+        Parameters:
+        -----------
+        **kwargs
+            覆盖默认的策略参数
+            
+        Returns:
+        --------
+        dict
+            线名到 (指标名, 参数) 的映射
+        """
+        p = dict(cls.params._getpairs())
+        p.update(kwargs)
+        return {
+            'ema1': ('ema', {'period': p['ema1_period']}),
+            'ema2': ('ema', {'period': p['ema2_period']}),
+            'volume_ma': ('volume_sma', {'period': p['volume_period']}),
+            'crossover': ('crossover', {'fast': 'ema1', 'slow': 'ema2'}),
+        }
+        
+    @classmethod
+    def vectorized_signals(cls, df: pd.DataFrame, **kwargs):
+        """
+        生成向量化引擎所需的目标持仓和仓位参数，信号口径与 next() 一致
+        
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            包含 close 列的行情数据
+        **kwargs
+            覆盖默认的策略参数
+            
+        Returns:
+        --------
+        dict
+            可直接传给 VectorizedBacktestEngine.run 的 positions、size_pct 参数
+        """
+        p = dict(cls.params._getpairs())
+        p.update(kwargs)
+        
+        close = df['close'].to_numpy(dtype=np.float64)
+        ema1 = ema(close, p['ema1_period'])
+        ema2 = ema(close, p['ema2_period'])
+        prev1 = np.roll(ema1, 1)
+        prev2 = np.roll(ema2, 1)
+        
+        # 与backtrader的最小周期一致：交叉指标需要多一根bar
+        start = max(p['ema1_period'], p['ema2_period'], p['volume_period'] - 1)
+        valid = np.arange(len(close)) >= start
+        cross_up = valid & (ema1 > ema2) & (prev1 <= prev2)
+        cross_down = valid & (ema1 < ema2) & (prev1 >= prev2)
+        
+        events = np.where(cross_up, 1.0, np.where(cross_down, 0.0, np.nan))
+        positions = pd.Series(events).ffill().fillna(0.0).to_numpy()
+        
+        # 与 next() 中的仓位计算相同：保证金1.1倍、手续费0.1%
+        size_pct = p['position_size'] / (1.1 * (1 + 0.001))
+        return {'positions': positions, 'size_pct': size_pct}
@@ -1,7 +1,9 @@
 import backtrader as bt
 import numpy as np
+from utils.indicator_cache import cached_indicator
+from strategies.strategy_logging import StrategyLogMixin
 
-class EmaRsiStrategy(bt.Strategy):
+class EmaRsiStrategy(StrategyLogMixin, bt.Strategy):
     """
     EMA交叉结合RSI的交易策略
     增加了成交量过滤和资金管理
@@ -14,6 +16,8 @@ class EmaRsiStrategy(bt.Strategy):
         ('volume_period', 20),   # 成交量均线周期
         ('risk_ratio', 0.02),    # 单次交易风险比例
         ('atr_period', 14),      # ATR周期
+        ('use_indicator_cache', False),  # 使用指标缓存，参数优化时复用相同的指标结果
+        ('use_feed_indicators', False),  # 直接读取数据源中预计算的指标线，见 feed_indicators
     )
 
     def __init__(self):
@@ -22,26 +26,44 @@ class EmaRsiStrategy(bt.Strategy):
         self.datavolume = self.datas[0].volume
         
         # 创建技术指标
-        # EMA指标
-        self.ema1 = bt.indicators.ExponentialMovingAverage(
-            self.dataclose, period=self.params.ema1_period)
-        self.ema2 = bt.indicators.ExponentialMovingAverage(
-            self.dataclose, period=self.params.ema2_period)
-        
-        # RSI指标
-        self.rsi = bt.indicators.RSI(
-            self.dataclose, period=self.params.rsi_period)
-        
-        # 成交量指标
-        self.volume_ma = bt.indicators.SMA(
-            self.datavolume, period=self.params.volume_period)
-        
-        # ATR指标用于计算止损
-        self.atr = bt.indicators.ATR(
-            self.data, period=self.params.atr_period)
+        # 数据源带有预计算指标线时不创建任何backtrader指标，预热期内由 next() 自行跳过
+        self.warmup = 0
+        if self.params.use_feed_indicators:
+            self.ema1 = self.data.ema1
+            self.ema2 = self.data.ema2
+            self.rsi = self.data.rsi
+            self.volume_ma = self.data.volume_ma
+            self.atr = self.data.atr
+            self.crossover = self.data.crossover
+            self.warmup = self.data.p.warmup
+        elif self.params.use_indicator_cache:
+            self.ema1 = cached_indicator(self.data, 'ema', period=self.params.ema1_period)
+            self.ema2 = cached_indicator(self.data, 'ema', period=self.params.ema2_period)
+            self.rsi = cached_indicator(self.data, 'rsi', period=self.params.rsi_period)
+            self.volume_ma = cached_indicator(self.data, 'volume_sma', period=self.params.volume_period)
+            self.atr = cached_indicator(self.data, 'atr', period=self.params.atr_period)
+        else:
+            # EMA指标
+            self.ema1 = bt.indicators.ExponentialMovingAverage(
+                self.dataclose, period=self.params.ema1_period)
+            self.ema2 = bt.indicators.ExponentialMovingAverage(
+                self.dataclose, period=self.params.ema2_period)
+            
+            # RSI指标
+            self.rsi = bt.indicators.RSI(
+                self.dataclose, period=self.params.rsi_period)
+            
+            # 成交量指标
+            self.volume_ma = bt.indicators.SMA(
+                self.datavolume, period=self.params.volume_period)
+            
+            # ATR指标用于计算止损
+            self.atr = bt.indicators.ATR(
+                self.data, period=self.params.atr_period)
         
         # 创建交叉信号
-        self.crossover = bt.indicators.CrossOver(self.ema1, self.ema2)
+        if not self.params.use_feed_indicators:
+            self.crossover = bt.indicators.CrossOver(self.ema1, self.ema2)
         
         # 用于跟踪订单和止损
         self.order = None
@@ -52,20 +74,47 @@ class EmaRsiStrategy(bt.Strategy):
         self.trades = []
         self.trade_dates = []
 
+    @classmethod
+    def feed_indicators(cls, **kwargs):
+        """
+        use_feed_indicators=True 时数据源需提供的指标线，供 data.indicator_feed.strategy_feed 使用
+        
+        Parameters:
+        -----------
+        **kwargs
+            覆盖默认的策略参数
+            
+        Returns:
+        --------
+        dict
+            线名到 (指标名, 参数) 的映射
+        """
+        p = dict(cls.params._getpairs())
+        p.update(kwargs)
+        return {
+            'ema1': ('ema', {'period': p['ema1_period']}),
+            'ema2': ('ema', {'period': p['ema2_period']}),
+            'rsi': ('rsi', {'period': p['rsi_period']}),
+            'volume_ma': ('volume_sma', {'period': p['volume_period']}),
+            'atr': ('atr', {'period': p['atr_period']}),
+            'crossover': ('crossover', {'fast': 'ema1', 'slow': 'ema2'}),
+        }
+
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
             return
 
+        self.record_order(order)
         if order.status in [order.Completed]:
             if order.isbuy():
-                self.log(f'买入执行: 价格: {order.executed.price:.2f}, 数量: {order.executed.size:.3f}, '
-                      f'成本: {order.executed.value:.2f}, 手续费: {order.executed.comm:.2f}')
+                self.log('买入执行: 价格: %.2f, 数量: %.3f, 成本: %.2f, 手续费: %.2f',
+                         order.executed.price, order.executed.size, order.executed.value, order.executed.comm)
                 # 设置止损价格
                 self.stop_price = order.executed.price - self.atr[0] * 2
                 self.position_size = order.executed.size
             else:
-                self.log(f'卖出执行: 价格: {order.executed.price:.2f}, 数量: {order.executed.size:.3f}, '
-                      f'成本: {order.executed.value:.2f}, 手续费: {order.executed.comm:.2f}')
+                self.log('卖出执行: 价格: %.2f, 数量: %.3f, 成本: %.2f, 手续费: %.2f',
+                         order.executed.price, order.executed.size, order.executed.value, order.executed.comm)
                 # 清除止损价格
                 self.stop_price = None
                 self.position_size = 0
@@ -78,11 +127,8 @@ class EmaRsiStrategy(bt.Strategy):
 
         self.trades.append(trade.pnl)
         self.trade_dates.append(self.data.datetime.date(0))
-        self.log(f'交易利润: 毛利润 {trade.pnl:.2f}, 净利润 {trade.pnlcomm:.2f}')
-
-    def log(self, txt, dt=None):
-        dt = dt or self.datas[0].datetime.date(0)
-        print(f'{dt.isoformat()} {txt}')
+        self.record_trade(trade)
+        self.log('交易利润: 毛利润 %.2f, 净利润 %.2f', trade.pnl, trade.pnlcomm)
 
     def get_position_size(self):
         """计算基于风险的仓位大小"""
@@ -99,6 +145,10 @@ class EmaRsiStrategy(bt.Strategy):
         return 0.001
 
     def next(self):
+        # 指标线尚在预热期
+        if len(self) < self.warmup:
+            return
+
         # 如果有待处理的订单，不执行任何操作
         if self.order:
             return
@@ -120,7 +170,7 @@ class EmaRsiStrategy(bt.Strategy):
                 size = self.get_position_size()
                 
                 # 记录买入信号
-                self.log(f'买入信号: 价格: {self.dataclose[0]:.2f}, 数量: {size:.3f}')
+                self.log('买入信号: 价格: %.2f, 数量: %.3f', self.dataclose[0], size)
                 
                 # 执行买入
                 self.order = self.buy(size=size)
@@ -137,6 +187,6 @@ class EmaRsiStrategy(bt.Strategy):
                  self.rsi < self.params.rsi_threshold and 
                  volume_filter) or hit_stop_loss):
                 
-                self.log(f'卖出信号: {self.dataclose[0]:.2f}')
+                self.log('卖出信号: %.2f', self.dataclose[0])
                 # 确保卖出数量与持仓数量相同
                 self.order = self.sell(size=self.position_size) 
\ No newline at end of file
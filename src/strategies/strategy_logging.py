@@ -0,0 +1,202 @@
+"""
+策略日志
+分级的文本日志在级别关闭时直接返回，不做任何格式化；
+订单、交易以结构化记录缓存在内存中，回测结束后批量写出为 CSV 或 Parquet
+"""
+
+import logging
+import os
+from typing import List, Optional, Union
+
+import backtrader as bt
+import pandas as pd
+from backtrader.metabase import MetaParams
+from backtrader.utils.py3 import with_metaclass
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+ORDER_FIELDS = ['datetime', 'strategy', 'ref', 'side', 'status', 'size', 'price', 'value', 'commission']
+TRADE_FIELDS = ['datetime', 'strategy', 'ref', 'price', 'pnl', 'pnlcomm', 'barlen']
+
+
+def parse_level(level: Union[int, str, None]) -> Optional[int]:
+    """
+    将 'INFO'、'warning' 等级别名称转换为 logging 的整数级别
+    """
+    if level is None or isinstance(level, int):
+        return level
+    value = logging.getLevelName(level.upper())
+    if not isinstance(value, int):
+        raise ValueError(f"未知的日志级别: {level}")
+    return value
+
+
+class EventBuffer:
+    """
+    订单和交易记录的内存缓冲
+
+    每条记录为一个元组，时间保存为backtrader的数值时间，转换和格式化推迟到写出时进行；
+    多次回测可共用同一个缓冲，最后一次性写出
+    """
+    def __init__(self):
+        self.orders: List[tuple] = []
+        self.trades: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self.orders) + len(self.trades)
+
+    def clear(self):
+        self.orders.clear()
+        self.trades.clear()
+
+    def to_frame(self, kind: str = 'orders') -> pd.DataFrame:
+        """
+        转换为DataFrame
+
+        Parameters:
+        -----------
+        kind : str
+            'orders' 或 'trades'
+
+        Returns:
+        --------
+        pd.DataFrame
+            每行一条记录，datetime 列为 datetime64
+        """
+        if kind == 'orders':
+            rows, fields = self.orders, ORDER_FIELDS
+        elif kind == 'trades':
+            rows, fields = self.trades, TRADE_FIELDS
+        else:
+            raise ValueError(f"未知的记录类型: {kind}")
+        df = pd.DataFrame.from_records(rows, columns=fields)
+        df['datetime'] = pd.to_datetime([bt.num2date(x) for x in df['datetime']])
+        return df
+
+    def flush(self, path: str, kind: str = 'orders') -> int:
+        """
+        写出并清空一类记录
+
+        .csv 文件追加写入（文件不存在时写表头）；.parquet 文件整体写入，需安装 pyarrow 或 fastparquet
+
+        Parameters:
+        -----------
+        path : str
+            输出路径，按扩展名选择格式
+        kind : str
+            'orders' 或 'trades'
+
+        Returns:
+        --------
+        int
+            写出的记录数
+        """
+        df = self.to_frame(kind)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if path.endswith('.parquet'):
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+        getattr(self, kind).clear()
+        return len(df)
+
+
+class StrategyLogMixin(with_metaclass(MetaParams, object)):
+    """
+    策略日志混入类，放在 bt.Strategy 之前继承：
+
+        class MyStrategy(StrategyLogMixin, bt.Strategy): ...
+
+    log() 使用 %-格式的参数，级别低于 log_level 时不做格式化；
+    record_order()、record_trade() 把订单和交易追加到 events 缓冲
+    """
+    params = (
+        ('log_level', None),  # 日志级别，None 时使用 StrategyLogMixin.default_level
+        ('events', None),     # 共用的 EventBuffer，None 时每个策略实例使用自己的缓冲
+    )
+
+    # 全局默认级别，参数优化的工作进程中设为 WARNING 以跳过逐笔日志
+    default_level = INFO
+    # 日志行前缀
+    log_prefix = ''
+
+    def log_enabled(self, level: int = INFO) -> bool:
+        """
+        该级别的日志是否输出，调用方可据此跳过开销较大的参数计算
+        """
+        configured = self.p.log_level
+        if configured is None:
+            configured = StrategyLogMixin.default_level
+        return level >= parse_level(configured)
+
+    def log(self, msg: str, *args, dt=None, level: int = INFO):
+        """
+        输出一行日志
+
+        Parameters:
+        -----------
+        msg : str
+            日志内容，可含 %-格式占位符
+        *args
+            占位符对应的参数，只在日志输出时才格式化
+        dt : date, optional
+            日志日期，默认为当前bar的日期
+        level : int
+            日志级别
+        """
+        if not self.log_enabled(level):
+            return
+        if args:
+            msg = msg % args
+        dt = dt or self.datas[0].datetime.date(0)
+        print(f'{self.log_prefix}{dt.isoformat()} {msg}')
+
+    @property
+    def events(self) -> EventBuffer:
+        """订单和交易记录的缓冲"""
+        if self.p.events is not None:
+            return self.p.events
+        buffer = self.__dict__.get('_events')
+        if buffer is None:
+            buffer = self._events = EventBuffer()
+        return buffer
+
+    def record_order(self, order: bt.Order):
+        """
+        记录一个已结束（成交、取消、拒绝、保证金不足）的订单
+        """
+        self.events.orders.append((
+            self.datas[0].datetime[0],
+            type(self).__name__,
+            order.ref,
+            'buy' if order.isbuy() else 'sell',
+            order.getstatusname(),
+            order.executed.size,
+            order.executed.price,
+            order.executed.value,
+            order.executed.comm,
+        ))
+
+    def record_trade(self, trade: bt.Trade):
+        """
+        记录一笔已平仓的交易
+        """
+        self.events.trades.append((
+            self.datas[0].datetime[0],
+            type(self).__name__,
+            trade.ref,
+            trade.price,
+            trade.pnl,
+            trade.pnlcomm,
+            trade.barlen,
+        ))
+
+    def flush_events(self, path: str, kind: str = 'orders') -> int:
+        """
+        写出并清空记录，见 EventBuffer.flush
+        """
+        return self.events.flush(path, kind)
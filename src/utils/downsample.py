@@ -0,0 +1,156 @@
+"""
+长序列抽稀
+绘图前把序列缩减到点数预算以内：折线可用LTTB（保留视觉形状）或桶内最小/最大值（保留极值），
+K线按桶合并为更粗周期的K线
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('lttb', 'minmax')
+
+
+def bucket_size(n: int, max_points: int) -> int:
+    """
+    每个桶包含的点数，使桶数不超过 max_points
+    """
+    return max(1, -(-n // max(1, max_points)))
+
+
+def minmax_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    最小/最大值抽稀，保留每个桶中最小值和最大值所在的位置
+
+    折线的尖峰和谷底在抽稀后保持不变，首尾两点总是保留
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        一维序列，不含NaN
+    max_points : int
+        保留的最多点数（约数）
+
+    Returns:
+    --------
+    np.ndarray
+        升序、不重复的位置
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+    size = bucket_size(n, max_points // 2)
+    rows = -(-n // size)
+    pad = rows * size - n
+    low = np.concatenate([values, np.full(pad, np.inf)]).reshape(rows, size)
+    high = np.concatenate([values, np.full(pad, -np.inf)]).reshape(rows, size)
+    starts = np.arange(rows) * size
+    indices = np.concatenate([starts + low.argmin(axis=1), starts + high.argmax(axis=1), [0, n - 1]])
+    return np.unique(indices)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 抽稀
+
+    首尾两点之外的点均分到 max_points - 2 个桶中，每个桶保留与上一个保留点、
+    下一个桶均值构成三角形面积最大的点
+
+    Parameters:
+    -----------
+    x : np.ndarray
+        横坐标（升序），不含NaN
+    y : np.ndarray
+        纵坐标，不含NaN
+    max_points : int
+        保留的点数
+
+    Returns:
+    --------
+    np.ndarray
+        升序的位置
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    buckets = max_points - 2
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(buckets):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+def downsample_indices(index: pd.Index, values: np.ndarray,
+                       max_points: Optional[int], method: str = 'lttb') -> np.ndarray:
+    """
+    按点数预算选取要绘制的位置，NaN（如指标预热期）不参与抽稀也不保留
+
+    Parameters:
+    -----------
+    index : pd.Index
+        横坐标索引，时间索引按实际时间间隔计算LTTB面积
+    values : np.ndarray
+        纵坐标
+    max_points : int, optional
+        点数预算，None 表示不抽稀
+    method : str
+        'lttb' 或 'minmax'
+
+    Returns:
+    --------
+    np.ndarray
+        升序的位置
+    """
+    if method not in METHODS:
+        raise ValueError(f"不支持的抽稀方法: {method}，可选 {METHODS}")
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.flatnonzero(np.isfinite(values))
+    if max_points is None or len(finite) <= max_points:
+        return finite
+    if method == 'minmax':
+        return finite[minmax_indices(values[finite], max_points)]
+    if isinstance(index, pd.DatetimeIndex):
+        x = index.asi8[finite]
+    else:
+        x = finite
+    return finite[lttb_indices(x, values[finite], max_points)]
+
+
+def decimate_ohlc(index: np.ndarray,
+                  open_: np.ndarray,
+                  high: np.ndarray,
+                  low: np.ndarray,
+                  close: np.ndarray,
+                  max_points: int) -> Tuple[np.ndarray, ...]:
+    """
+    把连续的bar合并为不超过 max_points 根K线：开盘取桶内第一根，收盘取最后一根，最高、最低取极值
+
+    Returns:
+    --------
+    tuple
+        (index, open, high, low, close, starts)，index 为每个桶第一根bar的时间，
+        starts 为各桶起始位置，可用 np.add.reduceat 对成交量等列做同样的合并
+    """
+    n = len(close)
+    starts = np.arange(0, n, bucket_size(n, max_points))
+    if len(starts) == n:
+        return index, open_, high, low, close, starts
+    ends = np.append(starts[1:], n) - 1
+    return (index[starts], np.asarray(open_)[starts],
+            np.maximum.reduceat(np.asarray(high), starts), np.minimum.reduceat(np.asarray(low), starts),
+            np.asarray(close)[ends], starts)
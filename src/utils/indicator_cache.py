@@ -0,0 +1,315 @@
+"""
+指标缓存
+以（数据指纹, 指标名, 参数）为键缓存指标计算结果，进程内共享，
+内存超出上限时按LRU淘汰，可选将淘汰的结果落盘
+"""
+
+import array
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from utils import indicator_kernels
+
+
+def fingerprint(*arrays) -> str:
+    """
+    计算数据指纹
+
+    Parameters:
+    -----------
+    *arrays : np.ndarray or pd.Series
+        参与计算的数据列
+
+    Returns:
+    --------
+    str
+        内容哈希
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for values in arrays:
+        values = np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+        h.update(str(values.shape).encode())
+        h.update(memoryview(values).cast('B'))
+    return h.hexdigest()
+
+
+class IndicatorCache:
+    """
+    指标结果的LRU缓存
+    """
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, spill_dir: Optional[str] = None):
+        """
+        Parameters:
+        -----------
+        max_bytes : int
+            内存中缓存结果的总字节数上限
+        spill_dir : str, optional
+            淘汰结果的落盘目录，为None时直接丢弃
+        """
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self._entries = OrderedDict()
+        self._spilled = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(data_key: str, name: str, params: Dict) -> Tuple:
+        """
+        构造缓存键
+        """
+        return (data_key, name, tuple(sorted(params.items())))
+
+    def _spill_path(self, key: Tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.spill_dir, f'{digest}.npy')
+
+    def get(self, key: Tuple) -> Optional[np.ndarray]:
+        """
+        查询缓存，命中时返回结果（只读），未命中返回None
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            path = self._spilled.pop(key, None)
+        if path is not None and os.path.exists(path):
+            value = np.load(path)
+            os.remove(path)
+            value.setflags(write=False)
+            with self._lock:
+                self.disk_hits += 1
+            self.put(key, value)
+            return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: Tuple, value: np.ndarray):
+        """
+        写入缓存，超出上限时淘汰最久未使用的结果
+        """
+        value = np.asarray(value)
+        value.setflags(write=False)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = value
+            self._bytes += value.nbytes
+
+            evicted = []
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._bytes -= old_value.nbytes
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+
+        if self.spill_dir is not None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            for old_key, old_value in evicted:
+                path = self._spill_path(old_key)
+                np.save(path, old_value, allow_pickle=False)
+                with self._lock:
+                    self._spilled[old_key] = path
+
+    def get_or_compute(self, data_key: str, name: str, params: Dict,
+                       compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        查询缓存，未命中时计算并写入
+
+        Parameters:
+        -----------
+        data_key : str
+            数据指纹
+        name : str
+            指标名
+        params : dict
+            指标参数
+        compute : Callable
+            计算函数，返回 np.ndarray
+
+        Returns:
+        --------
+        np.ndarray
+            指标结果（只读）
+        """
+        key = self.make_key(data_key, name, params)
+        value = self.get(key)
+        if value is None:
+            value = np.asarray(compute(), dtype=np.float64)
+            self.put(key, value)
+        return value
+
+    def stats(self) -> Dict:
+        """
+        缓存命中统计
+
+        Returns:
+        --------
+        dict
+            hits、disk_hits、misses、hit_rate、evictions、entries、bytes
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def clear(self):
+        """
+        清空缓存和统计
+        """
+        with self._lock:
+            for path in self._spilled.values():
+                if os.path.exists(path):
+                    os.remove(path)
+            self._entries.clear()
+            self._spilled.clear()
+            self._bytes = 0
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+
+# 进程内共享的默认缓存
+indicator_cache = IndicatorCache()
+
+
+class PrecomputedLine(bt.Indicator):
+    """
+    将预先计算好的数组包装成backtrader指标线，
+    在策略 __init__ 中代替逐bar计算的内置指标
+    """
+    lines = ('value',)
+    params = (
+        ('values', None),   # 与数据源逐bar对齐的数组
+        ('period', 1),      # 预热周期，与对应内置指标的最小周期一致
+    )
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+
+    def next(self):
+        self.lines.value[0] = self.p.values[len(self) - 1]
+
+    def once(self, start, end):
+        if len(self.p.values) < end:
+            raise ValueError(f"预计算数组长度 {len(self.p.values)} 小于数据长度 {end}")
+        dst = self.lines.value.array
+        chunk = array.array('d')
+        chunk.frombytes(np.ascontiguousarray(self.p.values[start:end], dtype=np.float64).tobytes())
+        dst[start:end] = chunk
+
+
+def _feed_column(data, field: str) -> np.ndarray:
+    """
+    从 PandasData 数据源取出某个字段对应的原始列
+    """
+    df = data.p.dataname
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("仅支持基于 DataFrame 的数据源")
+    col = getattr(data.p, field)
+    if isinstance(col, str):
+        return df[col].to_numpy(dtype=np.float64)
+    if isinstance(col, int) and col >= 0:
+        return df.iloc[:, col].to_numpy(dtype=np.float64)
+    if field in df.columns:
+        return df[field].to_numpy(dtype=np.float64)
+    raise KeyError(f"数据源中找不到字段: {field}")
+
+
+# 指标名 -> (所需字段, 计算函数, 最小周期)，计算口径与backtrader内置指标一致
+_BT_INDICATORS = {
+    'ema': (('close',), lambda close, period: indicator_kernels.ema(close, period),
+            lambda period: period),
+    'sma': (('close',), lambda close, period: indicator_kernels.sma(close, period),
+            lambda period: period),
+    'volume_sma': (('volume',), lambda volume, period: indicator_kernels.sma(volume, period),
+                   lambda period: period),
+    'rsi': (('close',),
+            lambda close, period, smoothing='wilder': indicator_kernels.rsi(close, period, smoothing),
+            lambda period, smoothing='wilder': period + 1),
+    'atr': (('high', 'low', 'close'),
+            lambda high, low, close, period, smoothing='wilder':
+                indicator_kernels.atr(high, low, close, period, smoothing),
+            lambda period, smoothing='wilder': period + 1),
+}
+
+
+def bt_indicator(column: Callable[[str], np.ndarray], name: str,
+                 cache: Optional[IndicatorCache] = None, **params) -> Tuple[np.ndarray, int]:
+    """
+    按backtrader内置指标的口径计算指标，结果经缓存复用
+
+    Parameters:
+    -----------
+    column : Callable
+        column(field) 返回 open、high、low、close、volume 等字段的float64数组
+    name : str
+        指标名：ema、sma、volume_sma、rsi、atr
+    cache : IndicatorCache, optional
+        使用的缓存，默认为进程内共享缓存
+    **params
+        指标参数，如 period=12；rsi、atr 另可指定 smoothing='wilder'/'sma'/'ema'
+
+    Returns:
+    --------
+    tuple
+        (指标数组（只读）, 对应内置指标的最小周期)
+    """
+    if name not in _BT_INDICATORS:
+        raise ValueError(f"不支持的指标: {name}")
+    cache = cache or indicator_cache
+    fields, compute, minperiod = _BT_INDICATORS[name]
+
+    columns = [column(field) for field in fields]
+    data_key = fingerprint(*columns)
+    values = cache.get_or_compute(data_key, f'bt_{name}', params,
+                                  lambda: compute(*columns, **params))
+    return values, minperiod(**params)
+
+
+def cached_indicator(data, name: str, cache: Optional[IndicatorCache] = None, **params):
+    """
+    在策略 __init__ 中获取带缓存的指标线
+
+    同一份数据、同一组参数的指标只计算一次，后续回测直接复用
+
+    Parameters:
+    -----------
+    data : bt.feeds.PandasData
+        数据源
+    name : str
+        指标名：ema、sma、volume_sma、rsi、atr
+    cache : IndicatorCache, optional
+        使用的缓存，默认为进程内共享缓存
+    **params
+        指标参数，如 period=12；rsi、atr 另可指定 smoothing='wilder'/'sma'/'ema'
+
+    Returns:
+    --------
+    PrecomputedLine
+        可像内置指标一样使用的指标线
+    """
+    values, period = bt_indicator(lambda field: _feed_column(data, field), name, cache, **params)
+    return PrecomputedLine(data, values=values, period=period)
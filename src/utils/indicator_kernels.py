@@ -0,0 +1,448 @@
+"""
+指标计算内核
+基于NumPy数组的指标实现，数值口径与backtrader内置指标保持一致；
+安装了 numba 时，RSI/ATR 的平滑改用编译后的单趟循环
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# 可选的平滑方式，对应backtrader的 SmoothedMovingAverage、SMA、EMA
+SMOOTHINGS = {'wilder': 2, 'sma': 0, 'ema': 1}
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    简单移动平均，前 period-1 个值为NaN
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        输入序列
+    period : int
+        均线周期
+
+    Returns:
+    --------
+    np.ndarray
+        均线序列
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return pd.Series(values).rolling(window=period).mean().to_numpy()
+
+
+def ema(values: np.ndarray, period: int, alpha: float = None) -> np.ndarray:
+    """
+    指数移动平均，与 bt.indicators.EMA 一致：
+    以前 period 个值的算术平均作为种子，之后按 alpha 递推
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        输入序列
+    period : int
+        均线周期
+    alpha : float, optional
+        平滑系数，默认 2 / (period + 1)
+
+    Returns:
+    --------
+    np.ndarray
+        均线序列，前 period-1 个值为NaN
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if alpha is None:
+        alpha = 2.0 / (1.0 + period)
+
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+
+    # 种子值之后的递推交给pandas的C实现完成
+    seeded = values[period - 1:].copy()
+    seeded[0] = values[:period].mean()
+    out[period - 1:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
+def _smooth_loop(values, period, method):
+    """
+    单趟平滑循环，method：0 为SMA，1 为EMA，2 为Wilder平滑
+
+    与backtrader一致：从第一个非NaN值开始，以前 period 个值的均值为种子，
+    EMA类按 prev * (1 - alpha) + x * alpha 递推；SMA的滚动和做Kahan补偿
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    first = 0
+    while first < n and np.isnan(values[first]):
+        first += 1
+    if n - first < period:
+        return out
+
+    if method == 1:
+        alpha = 2.0 / (period + 1.0)
+    else:
+        alpha = 1.0 / period
+    alpha1 = 1.0 - alpha
+
+    total = 0.0
+    for i in range(first, first + period):
+        total += values[i]
+    value = total / period
+    out[first + period - 1] = value
+
+    compensation = 0.0
+    for i in range(first + period, n):
+        if method == 0:
+            y = values[i] - values[i - period] - compensation
+            t = total + y
+            compensation = (t - total) - y
+            total = t
+            value = total / period
+        else:
+            value = value * alpha1 + values[i] * alpha
+        out[i] = value
+    return out
+
+
+def _true_range_loop(high, low, close):
+    """
+    单趟计算真实波幅，不生成中间数组
+    """
+    n = len(close)
+    tr = np.empty(n)
+    if n:
+        tr[0] = np.nan
+    for i in range(1, n):
+        prev = close[i - 1]
+        tr[i] = max(high[i], prev) - min(low[i], prev)
+    return tr
+
+
+if numba is not None:
+    _smooth_kernel = numba.njit(cache=True, nogil=True)(_smooth_loop)
+    _true_range_kernel = numba.njit(cache=True, nogil=True)(_true_range_loop)
+else:
+    _smooth_kernel = _true_range_kernel = None
+
+
+def smooth(values: np.ndarray, period: int, smoothing: str = 'wilder') -> np.ndarray:
+    """
+    按指定方式平滑序列，开头的NaN视为尚未开始
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        输入序列
+    period : int
+        平滑周期
+    smoothing : str
+        'wilder'（bt.indicators.SmoothedMovingAverage）、'sma' 或 'ema'（均与backtrader一致）
+
+    Returns:
+    --------
+    np.ndarray
+        平滑序列
+    """
+    if smoothing not in SMOOTHINGS:
+        raise ValueError(f"不支持的平滑方式: {smoothing}，可选 {', '.join(SMOOTHINGS)}")
+    values = np.asarray(values, dtype=np.float64)
+    if _smooth_kernel is not None:
+        return _smooth_kernel(values, period, SMOOTHINGS[smoothing])
+
+    valid = np.flatnonzero(~np.isnan(values))
+    out = np.full(len(values), np.nan)
+    if len(valid) == 0:
+        return out
+    first = valid[0]
+    if smoothing == 'sma':
+        out[first:] = sma(values[first:], period)
+    else:
+        out[first:] = ema(values[first:], period, alpha=1.0 / period if smoothing == 'wilder' else None)
+    return out
+
+
+def smma(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder平滑移动平均，与 bt.indicators.SmoothedMovingAverage 一致
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        输入序列，开头的NaN视为尚未开始
+    period : int
+        平滑周期
+
+    Returns:
+    --------
+    np.ndarray
+        平滑序列
+    """
+    return smooth(values, period, 'wilder')
+
+
+def rsi(close: np.ndarray, period: int = 14, smoothing: str = 'wilder') -> np.ndarray:
+    """
+    RSI，与 bt.indicators.RSI 一致，默认Wilder平滑，
+    smoothing='sma'/'ema' 对应 bt.indicators.RSI(movav=bt.indicators.SMA/EMA)
+
+    Parameters:
+    -----------
+    close : np.ndarray
+        收盘价
+    period : int
+        RSI周期
+    smoothing : str
+        平滑方式，见 smooth
+
+    Returns:
+    --------
+    np.ndarray
+        RSI序列，前 period 个值为NaN
+    """
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.full(len(close), np.nan)
+    delta[1:] = np.diff(close)
+    # NaN与0比较取最大值时保留NaN，涨跌序列的首个值仍为NaN
+    up = smooth(np.maximum(delta, 0.0), period, smoothing)
+    down = smooth(np.maximum(-delta, 0.0), period, smoothing)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100.0 - 100.0 / (1.0 + up / down)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """
+    真实波幅，与 bt.indicators.TrueRange 一致，首根bar为NaN
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    if _true_range_kernel is not None:
+        return _true_range_kernel(high, low, close)
+    tr = np.full(len(close), np.nan)
+    prev = close[:-1]
+    tr[1:] = np.maximum(high[1:], prev)
+    tr[1:] -= np.minimum(low[1:], prev)
+    return tr
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14,
+        smoothing: str = 'wilder') -> np.ndarray:
+    """
+    ATR，与 bt.indicators.ATR 一致，默认Wilder平滑，
+    smoothing='sma'/'ema' 对应 bt.indicators.ATR(movav=bt.indicators.SMA/EMA)
+
+    Returns:
+    --------
+    np.ndarray
+        ATR序列，前 period 个值为NaN
+    """
+    return smooth(true_range(high, low, close), period, smoothing)
+
+
+def crossover(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    """
+    交叉信号，与 bt.indicators.CrossOver 一致：
+    差值为0时沿用上一个非零差值判断方向
+
+    Parameters:
+    -----------
+    fast : np.ndarray
+        快线
+    slow : np.ndarray
+        慢线
+
+    Returns:
+    --------
+    np.ndarray
+        1 表示上穿，-1 表示下穿，0 表示无交叉
+    """
+    diff = np.asarray(fast, dtype=np.float64) - np.asarray(slow, dtype=np.float64)
+    nzd = pd.Series(np.where(diff == 0, np.nan, diff)).ffill().to_numpy()
+
+    prev = np.empty_like(nzd)
+    prev[0] = np.nan
+    prev[1:] = nzd[:-1]
+
+    cross = np.zeros(len(diff), dtype=np.int8)
+    cross[(prev < 0) & (diff > 0)] = 1
+    cross[(prev > 0) & (diff < 0)] = -1
+    return cross
+
+
+def _prefix_sums(values: np.ndarray):
+    """
+    去中心化后的前缀和，减小长序列累加时的舍入误差
+
+    Returns:
+    --------
+    tuple
+        (前缀和, 中心值)
+    """
+    offset = float(np.mean(values)) if len(values) else 0.0
+    s1 = np.zeros(len(values) + 1)
+    np.cumsum(values - offset, out=s1[1:])
+    return s1, offset
+
+
+def sma_matrix(values: np.ndarray, periods) -> np.ndarray:
+    """
+    一次前缀和计算多个周期的简单移动平均
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        输入序列
+    periods : Iterable[int]
+        均线周期列表
+
+    Returns:
+    --------
+    np.ndarray
+        形状为 (len(values), len(periods)) 的矩阵，第 j 列为 periods[j] 的SMA
+    """
+    values = np.asarray(values, dtype=np.float64)
+    periods = list(periods)
+    n = len(values)
+    # 按周期逐行写入连续内存，返回转置视图
+    out = np.full((len(periods), n), np.nan)
+
+    # 含NaN时前缀和会一直传播NaN，退回逐周期的滚动计算
+    if np.isnan(values).any():
+        series = pd.Series(values)
+        for j, period in enumerate(periods):
+            out[j] = series.rolling(window=period).mean().to_numpy()
+        return out.T
+
+    s1, offset = _prefix_sums(values)
+    for j, period in enumerate(periods):
+        if period <= n:
+            row = out[j, period - 1:]
+            np.subtract(s1[period:], s1[:-period], out=row)
+            row /= period
+            row += offset
+    return out.T
+
+
+def rolling_std_matrix(values: np.ndarray, periods, ddof: int = 1) -> np.ndarray:
+    """
+    一次分段前缀和计算多个周期的滚动标准差，默认为样本标准差（与pandas一致）
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        输入序列
+    periods : Iterable[int]
+        窗口周期列表
+    ddof : int
+        自由度修正
+
+    Returns:
+    --------
+    np.ndarray
+        形状为 (len(values), len(periods)) 的矩阵
+    """
+    values = np.asarray(values, dtype=np.float64)
+    periods = list(periods)
+    n = len(values)
+    out = np.full((len(periods), n), np.nan)
+
+    if np.isnan(values).any():
+        series = pd.Series(values)
+        for j, period in enumerate(periods):
+            out[j] = series.rolling(window=period).std(ddof=ddof).to_numpy()
+        return out.T
+
+    # 分段前缀和：每段以段内均值去中心化，累加量只与段长有关，避免长序列平方和的精度损失
+    max_period = max(periods) if periods else 1
+    block = max(256, max_period)
+    n_blocks = -(-n // block) if n else 0
+    seg = np.arange(n) // block
+    centers = np.array([values[b * block:(b + 1) * block].mean() for b in range(n_blocks)])
+    centered = values - centers[seg] if n else values
+    local1 = _segment_cumsum(centered, block)
+    local2 = _segment_cumsum(centered * centered, block)
+    excl1 = local1 - centered
+    excl2 = local2 - centered * centered
+    seg_end = np.minimum((np.arange(n_blocks) + 1) * block, n) - 1
+    total1 = local1[seg_end]
+    total2 = local2[seg_end]
+
+    for j, period in enumerate(periods):
+        if period > n or period <= ddof:
+            continue
+        w1 = local1[period - 1:] - excl1[:n - period + 1]
+        w2 = local2[period - 1:] - excl2[:n - period + 1]
+
+        # 窗口跨越段边界时，把左段部分换算到右段的中心再相加
+        starts = np.arange(1, n_blocks) * block
+        t = (starts[:, None] + np.arange(period - 1)).ravel()
+        t = t[(t >= period - 1) & (t < n)]
+        if len(t):
+            i0 = t - period + 1
+            sl, st = seg[i0], seg[t]
+            left1 = total1[sl] - excl1[i0]
+            left2 = total2[sl] - excl2[i0]
+            count = (sl + 1) * block - i0
+            d = centers[sl] - centers[st]
+            w1[i0] = left1 + count * d + local1[t]
+            w2[i0] = left2 + 2 * d * left1 + count * d * d + local2[t]
+
+        w1 *= w1
+        w1 /= period
+        w2 -= w1
+        w2 /= period - ddof
+        np.maximum(w2, 0.0, out=w2)
+        np.sqrt(w2, out=out[j, period - 1:])
+    return out.T
+
+
+def _segment_cumsum(values: np.ndarray, block: int) -> np.ndarray:
+    """
+    每 block 个元素重新开始的累加和
+    """
+    n = len(values)
+    pad = (-n) % block
+    padded = np.concatenate((values, np.zeros(pad))).reshape(-1, block)
+    return np.cumsum(padded, axis=1).ravel()[:n]
+
+
+def ema_matrix(values: np.ndarray, periods, seed: str = 'first') -> np.ndarray:
+    """
+    计算多个周期的指数移动平均，结果写入同一个矩阵
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        输入序列
+    periods : Iterable[int]
+        均线周期列表
+    seed : str
+        'first' 以首个值为种子（与 TechnicalIndicators.add_ema 一致），
+        'sma' 以前 period 个值的均值为种子（与 bt.indicators.EMA 一致）
+
+    Returns:
+    --------
+    np.ndarray
+        形状为 (len(values), len(periods)) 的矩阵
+    """
+    values = np.asarray(values, dtype=np.float64)
+    periods = list(periods)
+    out = np.empty((len(periods), len(values)))
+
+    if seed == 'sma':
+        for j, period in enumerate(periods):
+            out[j] = ema(values, period)
+    elif seed == 'first':
+        series = pd.Series(values)
+        for j, period in enumerate(periods):
+            out[j] = series.ewm(span=period, adjust=False).mean().to_numpy()
+    else:
+        raise ValueError(f"不支持的种子方式: {seed}")
+    return out.T
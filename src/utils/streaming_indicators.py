@@ -0,0 +1,342 @@
+"""
+增量指标计算器
+逐根bar更新的有状态指标，每次更新为O(1)，
+计算口径与 TechnicalIndicators 中的批量函数一致，用于实盘追加K线
+"""
+
+import math
+from collections import deque
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+NAN = float('nan')
+
+
+class _RollingSum:
+    """
+    固定窗口滚动求和，加入和移出时做Kahan补偿，与pandas rolling的累加方式一致
+    """
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self.compensation = 0.0
+        self.negatives = 0
+
+    def _add(self, value: float):
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = t - self.total - y
+        self.total = t
+
+    def push(self, value: float):
+        if len(self.window) == self.period:
+            old = self.window.popleft()
+            self.negatives -= old < 0
+            self._add(-old)
+        self.window.append(value)
+        self.negatives += value < 0
+        self._add(value)
+
+    @property
+    def full(self) -> bool:
+        return len(self.window) == self.period
+
+    @property
+    def mean(self) -> float:
+        if not self.full:
+            return NAN
+        result = self.total / self.period
+        # 窗口内全为非负数时，消除舍入误差造成的负值
+        if self.negatives == 0 and result < 0:
+            result = 0.0
+        return result
+
+
+class _Smoother:
+    """
+    增量平滑，口径与 indicator_kernels.smooth 一致：
+    'sma' 为滚动均值；'wilder'/'ema' 以前 period 个值的均值为种子再递推
+    """
+    def __init__(self, period: int, smoothing: str = 'wilder'):
+        if smoothing not in ('wilder', 'sma', 'ema'):
+            raise ValueError(f"不支持的平滑方式: {smoothing}")
+        self.smoothing = smoothing
+        self.alpha = 2.0 / (period + 1.0) if smoothing == 'ema' else 1.0 / period
+        self._sum = _RollingSum(period)
+        self.value = NAN
+
+    def push(self, x: float) -> float:
+        if self.smoothing == 'sma' or not self._sum.full:
+            self._sum.push(x)
+            self.value = self._sum.mean
+        else:
+            self.value = self.value * (1.0 - self.alpha) + x * self.alpha
+        return self.value
+
+
+class StreamingSMA:
+    """
+    增量简单移动平均，对应 TechnicalIndicators.add_sma
+    """
+    def __init__(self, period: int = 20):
+        """
+        Parameters:
+        -----------
+        period : int
+            移动平均周期
+        """
+        self._sum = _RollingSum(period)
+        self.value = NAN
+
+    def update(self, price: float) -> float:
+        """
+        输入一根bar的价格，返回最新SMA，窗口未满时为NaN
+        """
+        self._sum.push(price)
+        self.value = self._sum.mean
+        return self.value
+
+
+class StreamingEMA:
+    """
+    增量指数移动平均，对应 TechnicalIndicators.add_ema（ewm(span, adjust=False)）
+    """
+    def __init__(self, period: int = 12):
+        """
+        Parameters:
+        -----------
+        period : int
+            移动平均周期
+        """
+        self.alpha = 2.0 / (period + 1.0)
+        self.value = NAN
+
+    def update(self, price: float) -> float:
+        """
+        输入一根bar的价格，返回最新EMA，首根bar即为价格本身
+        """
+        if math.isnan(self.value):
+            self.value = price
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * price
+        return self.value
+
+
+class StreamingRSI:
+    """
+    增量RSI，对应 TechnicalIndicators.add_rsi
+    """
+    def __init__(self, period: int = 14, smoothing: str = 'wilder'):
+        """
+        Parameters:
+        -----------
+        period : int
+            RSI周期
+        smoothing : str
+            涨跌幅的平滑方式：'wilder'、'sma' 或 'ema'
+        """
+        self._gain = _Smoother(period, smoothing)
+        self._loss = _Smoother(period, smoothing)
+        self._prev = None
+        self.value = NAN
+
+    def update(self, price: float) -> float:
+        """
+        输入一根bar的价格，返回最新RSI
+        """
+        # 与backtrader一致：首根bar没有涨跌幅
+        if self._prev is None:
+            self._prev = price
+            return self.value
+        delta = price - self._prev
+        self._prev = price
+        gain = self._gain.push(delta if delta > 0 else 0.0)
+        loss = self._loss.push(-delta if delta < 0 else 0.0)
+
+        if math.isnan(gain) or (gain == 0 and loss == 0):
+            self.value = NAN
+        elif loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + gain / loss)
+        return self.value
+
+
+class StreamingMACD:
+    """
+    增量MACD，对应 TechnicalIndicators.add_macd
+    """
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        """
+        Parameters:
+        -----------
+        fast_period : int
+            快线周期
+        slow_period : int
+            慢线周期
+        signal_period : int
+            信号线周期
+        """
+        self._fast = StreamingEMA(fast_period)
+        self._slow = StreamingEMA(slow_period)
+        self._signal = StreamingEMA(signal_period)
+        self.macd = self.signal = self.hist = NAN
+
+    def update(self, price: float) -> Dict[str, float]:
+        """
+        输入一根bar的价格，返回 macd、macd_signal、macd_hist
+        """
+        self.macd = self._fast.update(price) - self._slow.update(price)
+        self.signal = self._signal.update(self.macd)
+        self.hist = self.macd - self.signal
+        return {'macd': self.macd, 'macd_signal': self.signal, 'macd_hist': self.hist}
+
+
+class StreamingBollingerBands:
+    """
+    增量布林带，对应 TechnicalIndicators.add_bollinger_bands（样本标准差）
+    """
+    def __init__(self, period: int = 20, std_dev: float = 2.0):
+        """
+        Parameters:
+        -----------
+        period : int
+            移动平均周期
+        std_dev : float
+            标准差倍数
+        """
+        self.period = period
+        self.std_dev = std_dev
+        self._window = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.middle = self.upper = self.lower = NAN
+
+    def _add(self, x: float):
+        n = len(self._window)
+        delta = x - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x: float):
+        n = len(self._window)
+        if n == 0:
+            self._mean = self._m2 = 0.0
+            return
+        delta = x - self._mean
+        self._mean -= delta / n
+        self._m2 -= delta * (x - self._mean)
+
+    def update(self, price: float) -> Dict[str, float]:
+        """
+        输入一根bar的价格，返回 bb_middle、bb_upper、bb_lower
+        """
+        # Welford算法的加入/移出形式，避免平方和相减带来的精度损失
+        if len(self._window) == self.period:
+            self._remove(self._window.popleft())
+        self._window.append(price)
+        self._add(price)
+
+        if len(self._window) == self.period:
+            std = math.sqrt(max(self._m2, 0.0) / (self.period - 1)) if self.period > 1 else NAN
+            self.middle = self._mean
+            self.upper = self.middle + std * self.std_dev
+            self.lower = self.middle - std * self.std_dev
+        return {'bb_middle': self.middle, 'bb_upper': self.upper, 'bb_lower': self.lower}
+
+
+class StreamingATR:
+    """
+    增量ATR，对应 TechnicalIndicators.add_atr
+    """
+    def __init__(self, period: int = 14, smoothing: str = 'wilder'):
+        """
+        Parameters:
+        -----------
+        period : int
+            ATR周期
+        smoothing : str
+            真实波幅的平滑方式：'wilder'、'sma' 或 'ema'
+        """
+        self._tr = _Smoother(period, smoothing)
+        self._prev_close = None
+        self.value = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        """
+        输入一根bar的最高价、最低价、收盘价，返回最新ATR
+        """
+        # 与backtrader一致：首根bar没有真实波幅
+        if self._prev_close is not None:
+            tr = max(high, self._prev_close) - min(low, self._prev_close)
+            self.value = self._tr.push(tr)
+        self._prev_close = close
+        return self.value
+
+
+class IndicatorStream:
+    """
+    一组增量指标，输出列名与 TechnicalIndicators 的默认参数一致
+    """
+    def __init__(self,
+                 sma_periods: List[int] = [20, 50, 200],
+                 ema_periods: List[int] = [12, 26],
+                 rsi_period: int = 14,
+                 macd_periods: tuple = (12, 26, 9),
+                 bb_period: int = 20,
+                 bb_std_dev: float = 2.0,
+                 atr_period: int = 14,
+                 smoothing: str = 'wilder'):
+        self.smas = {f'sma_{p}': StreamingSMA(p) for p in sma_periods}
+        self.emas = {f'ema_{p}': StreamingEMA(p) for p in ema_periods}
+        self.rsi = StreamingRSI(rsi_period, smoothing)
+        self.macd = StreamingMACD(*macd_periods)
+        self.bbands = StreamingBollingerBands(bb_period, bb_std_dev)
+        self.atr = StreamingATR(atr_period, smoothing)
+
+    def update(self, high: float, low: float, close: float) -> Dict[str, float]:
+        """
+        输入一根bar，返回所有指标的最新值
+
+        Parameters:
+        -----------
+        high : float
+            最高价
+        low : float
+            最低价
+        close : float
+            收盘价
+
+        Returns:
+        --------
+        dict
+            指标列名到最新值的映射
+        """
+        row = {name: ind.update(close) for name, ind in self.smas.items()}
+        row.update({name: ind.update(close) for name, ind in self.emas.items()})
+        row['rsi'] = self.rsi.update(close)
+        row.update(self.macd.update(close))
+        row.update(self.bbands.update(close))
+        row['atr'] = self.atr.update(high, low, close)
+        return row
+
+    def warmup(self, df: pd.DataFrame) -> Optional[Dict[str, float]]:
+        """
+        用历史数据初始化状态，之后即可逐根追加新bar
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            包含 high、low、close 列的历史数据
+
+        Returns:
+        --------
+        dict or None
+            最后一根历史bar的指标值
+        """
+        row = None
+        for high, low, close in zip(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy()):
+            row = self.update(high, low, close)
+        return row
@@ -6,8 +6,24 @@
 import pandas as pd
 import numpy as np
 from typing import Optional, Union, List
+from utils import indicator_kernels
+from utils.indicator_kernels import sma_matrix, ema_matrix, rolling_std_matrix
+from utils.indicator_cache import indicator_cache, fingerprint
 
 class TechnicalIndicators:
+    # 指标结果缓存，设为None可关闭
+    cache = indicator_cache
+    
+    @classmethod
+    def _memo(cls, df: pd.DataFrame, cols: List[str], name: str, params: dict, compute):
+        """
+        按（数据指纹, 指标名, 参数）复用已计算的指标结果
+        """
+        if cls.cache is None:
+            return np.asarray(compute())
+        data_key = fingerprint(*(df[col].to_numpy(dtype=np.float64) for col in cols))
+        return cls.cache.get_or_compute(data_key, name, params, compute)
+        
     @staticmethod
     def add_sma(df: pd.DataFrame, 
                 price_col: str = 'close',
@@ -30,7 +46,9 @@ class TechnicalIndicators:
             添加了SMA的数据
         """
         for period in periods:
-            df[f'sma_{period}'] = df[price_col].rolling(window=period).mean()
+            df[f'sma_{period}'] = TechnicalIndicators._memo(
+                df, [price_col], 'sma', {'period': period},
+                lambda: df[price_col].rolling(window=period).mean().to_numpy())
         return df
         
     @staticmethod
@@ -55,16 +73,68 @@ class TechnicalIndicators:
             添加了EMA的数据
         """
         for period in periods:
-            df[f'ema_{period}'] = df[price_col].ewm(span=period, adjust=False).mean()
+            df[f'ema_{period}'] = TechnicalIndicators._memo(
+                df, [price_col], 'ema', {'period': period},
+                lambda: df[price_col].ewm(span=period, adjust=False).mean().to_numpy())
         return df
         
+    @staticmethod
+    def moving_average_block(df: pd.DataFrame,
+                             price_col: str = 'close',
+                             sma_periods: List[int] = (),
+                             ema_periods: List[int] = (),
+                             std_periods: List[int] = ()) -> pd.DataFrame:
+        """
+        批量计算多个周期的SMA、EMA和滚动标准差
+        
+        SMA和标准差共用一次前缀和计算，结果整体拼成一个DataFrame，
+        不逐列插入原数据，适合参数扫描时一次性计算大量周期
+        
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            价格数据
+        price_col : str
+            价格列名
+        sma_periods : List[int]
+            SMA周期列表
+        ema_periods : List[int]
+            EMA周期列表
+        std_periods : List[int]
+            滚动标准差周期列表
+            
+        Returns:
+        --------
+        pd.DataFrame
+            列名为 sma_{p}、ema_{p}、std_{p}，索引与df相同
+        """
+        prices = df[price_col].to_numpy(dtype=np.float64)
+        blocks = []
+        names = []
+        if sma_periods:
+            blocks.append(sma_matrix(prices, sma_periods))
+            names += [f'sma_{p}' for p in sma_periods]
+        if ema_periods:
+            blocks.append(ema_matrix(prices, ema_periods))
+            names += [f'ema_{p}' for p in ema_periods]
+        if std_periods:
+            blocks.append(rolling_std_matrix(prices, std_periods))
+            names += [f'std_{p}' for p in std_periods]
+            
+        # 各矩阵为转置视图，按列拼接后交给pandas时无需再次转置
+        values = np.vstack([b.T for b in blocks]).T if blocks else np.empty((len(df), 0))
+        return pd.DataFrame(values, index=df.index, columns=names)
+        
     @staticmethod
     def add_rsi(df: pd.DataFrame,
                 price_col: str = 'close',
-                period: int = 14) -> pd.DataFrame:
+                period: int = 14,
+                smoothing: str = 'wilder') -> pd.DataFrame:
         """
         添加相对强弱指标(RSI)
         
+        数值与 bt.indicators.RSI 一致，研究结果可直接对照回测
+        
         Parameters:
         -----------
         df : pd.DataFrame
@@ -73,18 +143,17 @@ class TechnicalIndicators:
             价格列名
         period : int
             RSI周期
+        smoothing : str
+            涨跌幅的平滑方式：'wilder'（默认，与backtrader默认一致）、'sma' 或 'ema'
             
         Returns:
         --------
         pd.DataFrame
             添加了RSI的数据
         """
-        delta = df[price_col].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
+        df['rsi'] = TechnicalIndicators._memo(
+            df, [price_col], 'rsi', {'period': period, 'smoothing': smoothing},
+            lambda: indicator_kernels.rsi(df[price_col].to_numpy(dtype=np.float64), period, smoothing))
         return df
         
     @staticmethod
@@ -114,18 +183,25 @@ class TechnicalIndicators:
         pd.DataFrame
             添加了MACD的数据
         """
-        # 计算快线和慢线的EMA
-        fast_ema = df[price_col].ewm(span=fast_period, adjust=False).mean()
-        slow_ema = df[price_col].ewm(span=slow_period, adjust=False).mean()
-        
-        # 计算MACD线
-        df['macd'] = fast_ema - slow_ema
-        
-        # 计算信号线
-        df['macd_signal'] = df['macd'].ewm(span=signal_period, adjust=False).mean()
-        
-        # 计算MACD柱状图
-        df['macd_hist'] = df['macd'] - df['macd_signal']
+        def compute():
+            # 计算快线和慢线的EMA
+            fast_ema = df[price_col].ewm(span=fast_period, adjust=False).mean()
+            slow_ema = df[price_col].ewm(span=slow_period, adjust=False).mean()
+            
+            # 计算MACD线
+            macd = fast_ema - slow_ema
+            
+            # 计算信号线
+            signal = macd.ewm(span=signal_period, adjust=False).mean()
+            
+            # 计算MACD柱状图
+            return np.vstack([macd, signal, macd - signal])
+            
+        result = TechnicalIndicators._memo(
+            df, [price_col], 'macd',
+            {'fast_period': fast_period, 'slow_period': slow_period, 'signal_period': signal_period},
+            compute)
+        df['macd'], df['macd_signal'], df['macd_hist'] = result
         
         return df
         
@@ -153,48 +229,50 @@ class TechnicalIndicators:
         pd.DataFrame
             添加了布林带的数据
         """
-        # 计算中轨（简单移动平均线）
-        df['bb_middle'] = df[price_col].rolling(window=period).mean()
-        
-        # 计算标准差
-        rolling_std = df[price_col].rolling(window=period).std()
-        
-        # 计算上轨和下轨
-        df['bb_upper'] = df['bb_middle'] + (rolling_std * std_dev)
-        df['bb_lower'] = df['bb_middle'] - (rolling_std * std_dev)
+        def compute():
+            # 计算中轨（简单移动平均线）
+            middle = df[price_col].rolling(window=period).mean()
+            
+            # 计算标准差
+            rolling_std = df[price_col].rolling(window=period).std()
+            
+            # 计算上轨和下轨
+            return np.vstack([middle, middle + (rolling_std * std_dev), middle - (rolling_std * std_dev)])
+            
+        result = TechnicalIndicators._memo(
+            df, [price_col], 'bollinger_bands', {'period': period, 'std_dev': std_dev}, compute)
+        df['bb_middle'], df['bb_upper'], df['bb_lower'] = result
         
         return df
         
     @staticmethod
     def add_atr(df: pd.DataFrame,
-                period: int = 14) -> pd.DataFrame:
+                period: int = 14,
+                smoothing: str = 'wilder') -> pd.DataFrame:
         """
         添加平均真实波幅(ATR)
         
+        数值与 bt.indicators.ATR 一致，真实波幅直接在数组上计算，不生成中间DataFrame
+        
         Parameters:
         -----------
         df : pd.DataFrame
             价格数据
         period : int
             ATR周期
+        smoothing : str
+            真实波幅的平滑方式：'wilder'（默认，与backtrader默认一致）、'sma' 或 'ema'
             
         Returns:
         --------
         pd.DataFrame
             添加了ATR的数据
         """
-        high = df['high']
-        low = df['low']
-        close = df['close']
-        
-        # 计算真实波幅
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        
-        # 计算ATR
-        df['atr'] = tr.rolling(window=period).mean()
+        df['atr'] = TechnicalIndicators._memo(
+            df, ['high', 'low', 'close'], 'atr', {'period': period, 'smoothing': smoothing},
+            lambda: indicator_kernels.atr(df['high'].to_numpy(dtype=np.float64),
+                                          df['low'].to_numpy(dtype=np.float64),
+                                          df['close'].to_numpy(dtype=np.float64),
+                                          period, smoothing))
         
-        return df 
\ No newline at end of file
+        return df 
@@ -10,11 +10,42 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from typing import Optional, List, Dict
 
+from utils.downsample import decimate_ohlc, downsample_indices
+
+# Plotly 图表每条曲线默认最多保留的点数
+DEFAULT_MAX_POINTS = 5000
+
+
+def _candles(df: pd.DataFrame, max_points: Optional[int]) -> Dict[str, np.ndarray]:
+    """
+    取出K线各列，超过点数预算时按桶合并；成交量按桶求和
+    """
+    columns = {field: df[field].to_numpy() for field in ('open', 'high', 'low', 'close')}
+    x, o, h, l, c, starts = decimate_ohlc(df.index, columns['open'], columns['high'], columns['low'],
+                                          columns['close'], max_points or len(df))
+    candles = {'x': x, 'open': o, 'high': h, 'low': l, 'close': c}
+    if 'volume' in df.columns:
+        volume = df['volume'].to_numpy()
+        candles['volume'] = volume if len(starts) == len(df) else np.add.reduceat(volume, starts)
+    return candles
+
+
+def _line(df: pd.DataFrame, column: str, name: str,
+          max_points: Optional[int], downsample: str, webgl: bool):
+    """
+    创建一条抽稀后的折线
+    """
+    keep = downsample_indices(df.index, df[column].to_numpy(), max_points, downsample)
+    trace = go.Scattergl if webgl else go.Scatter
+    return trace(x=df.index[keep], y=df[column].to_numpy()[keep], name=name, line=dict(width=1))
+
+
 class DataVisualizer:
     @staticmethod
     def plot_price_and_volume(df: pd.DataFrame,
                              title: str = 'BTC/USDT Price and Volume',
-                             save_path: Optional[str] = None) -> None:
+                             save_path: Optional[str] = None,
+                             max_points: Optional[int] = DEFAULT_MAX_POINTS) -> None:
         """
         绘制价格和成交量图表
         
@@ -26,27 +57,29 @@ class DataVisualizer:
             图表标题
         save_path : str, optional
             保存路径
+        max_points : int, optional
+            K线根数上限，超过时按桶合并为更粗周期的K线，成交量按桶求和；None 表示不合并
         """
+        candles = _candles(df, max_points)
         fig = make_subplots(rows=2, cols=1, 
                            shared_xaxes=True,
                            vertical_spacing=0.03,
                            row_heights=[0.7, 0.3])
 
         # 添加K线图
-        fig.add_trace(go.Candlestick(x=df.index,
-                                    open=df['open'],
-                                    high=df['high'],
-                                    low=df['low'],
-                                    close=df['close'],
+        fig.add_trace(go.Candlestick(x=candles['x'],
+                                    open=candles['open'],
+                                    high=candles['high'],
+                                    low=candles['low'],
+                                    close=candles['close'],
                                     name='OHLC'),
                      row=1, col=1)
 
         # 添加成交量
-        colors = ['red' if row['close'] >= row['open'] else 'green' 
-                 for _, row in df.iterrows()]
+        colors = np.where(candles['close'] >= candles['open'], 'red', 'green')
         
-        fig.add_trace(go.Bar(x=df.index,
-                           y=df['volume'],
+        fig.add_trace(go.Bar(x=candles['x'],
+                           y=candles['volume'],
                            name='Volume',
                            marker_color=colors),
                      row=2, col=1)
@@ -68,7 +101,10 @@ class DataVisualizer:
     def plot_technical_indicators(df: pd.DataFrame,
                                 indicators: List[str],
                                 title: str = 'Technical Indicators',
-                                save_path: Optional[str] = None) -> None:
+                                save_path: Optional[str] = None,
+                                max_points: Optional[int] = DEFAULT_MAX_POINTS,
+                                downsample: str = 'lttb',
+                                webgl: bool = True) -> None:
         """
         绘制技术指标图表
         
@@ -82,7 +118,14 @@ class DataVisualizer:
             图表标题
         save_path : str, optional
             保存路径
+        max_points : int, optional
+            每条曲线最多保留的点数，K线按桶合并，指标曲线按 downsample 抽稀；None 表示不抽稀
+        downsample : str
+            指标曲线的抽稀方法：'lttb' 保留视觉形状，'minmax' 保留每个桶的极值
+        webgl : bool
+            指标曲线是否使用 WebGL 渲染（Scattergl），点数较多时浏览器中更流畅
         """
+        candles = _candles(df, max_points)
         n_indicators = len(indicators)
         fig = make_subplots(rows=n_indicators + 1, cols=1,
                            shared_xaxes=True,
@@ -90,69 +133,49 @@ class DataVisualizer:
                            row_heights=[0.4] + [0.6/n_indicators] * n_indicators)
 
         # 添加价格
-        fig.add_trace(go.Candlestick(x=df.index,
-                                    open=df['open'],
-                                    high=df['high'],
-                                    low=df['low'],
-                                    close=df['close'],
+        fig.add_trace(go.Candlestick(x=candles['x'],
+                                    open=candles['open'],
+                                    high=candles['high'],
+                                    low=candles['low'],
+                                    close=candles['close'],
                                     name='OHLC'),
                      row=1, col=1)
 
+        def line(column, name):
+            return _line(df, column, name, max_points, downsample, webgl)
+
         # 添加技术指标
         for i, indicator in enumerate(indicators, 2):
             if indicator.startswith('sma_'):
                 period = indicator.split('_')[1]
-                fig.add_trace(go.Scatter(x=df.index,
-                                       y=df[indicator],
-                                       name=f'SMA {period}',
-                                       line=dict(width=1)),
+                fig.add_trace(line(indicator, f'SMA {period}'),
                             row=i, col=1)
             elif indicator.startswith('ema_'):
                 period = indicator.split('_')[1]
-                fig.add_trace(go.Scatter(x=df.index,
-                                       y=df[indicator],
-                                       name=f'EMA {period}',
-                                       line=dict(width=1)),
+                fig.add_trace(line(indicator, f'EMA {period}'),
                             row=i, col=1)
             elif indicator == 'rsi':
-                fig.add_trace(go.Scatter(x=df.index,
-                                       y=df['rsi'],
-                                       name='RSI',
-                                       line=dict(width=1)),
+                fig.add_trace(line('rsi', 'RSI'),
                             row=i, col=1)
                 # 添加RSI的超买超卖线
                 fig.add_hline(y=70, line_dash="dash", line_color="red", row=i, col=1)
                 fig.add_hline(y=30, line_dash="dash", line_color="green", row=i, col=1)
             elif indicator == 'macd':
-                fig.add_trace(go.Scatter(x=df.index,
-                                       y=df['macd'],
-                                       name='MACD',
-                                       line=dict(width=1)),
+                fig.add_trace(line('macd', 'MACD'),
                             row=i, col=1)
-                fig.add_trace(go.Scatter(x=df.index,
-                                       y=df['macd_signal'],
-                                       name='Signal',
-                                       line=dict(width=1)),
+                fig.add_trace(line('macd_signal', 'Signal'),
                             row=i, col=1)
-                fig.add_trace(go.Bar(x=df.index,
-                                   y=df['macd_hist'],
+                keep = downsample_indices(df.index, df['macd_hist'].to_numpy(), max_points, 'minmax')
+                fig.add_trace(go.Bar(x=df.index[keep],
+                                   y=df['macd_hist'].to_numpy()[keep],
                                    name='Histogram'),
                             row=i, col=1)
             elif indicator == 'bollinger_bands':
-                fig.add_trace(go.Scatter(x=df.index,
-                                       y=df['bb_upper'],
-                                       name='Upper Band',
-                                       line=dict(width=1)),
+                fig.add_trace(line('bb_upper', 'Upper Band'),
                             row=i, col=1)
-                fig.add_trace(go.Scatter(x=df.index,
-                                       y=df['bb_middle'],
-                                       name='Middle Band',
-                                       line=dict(width=1)),
+                fig.add_trace(line('bb_middle', 'Middle Band'),
                             row=i, col=1)
-                fig.add_trace(go.Scatter(x=df.index,
-                                       y=df['bb_lower'],
-                                       name='Lower Band',
-                                       line=dict(width=1)),
+                fig.add_trace(line('bb_lower', 'Lower Band'),
                             row=i, col=1)
 
         # 更新布局